@@ -0,0 +1,100 @@
+"""
+Semantic answer cache for /chat.
+
+Stores (query embedding, answer, sources). A new question whose embedding is
+within `max_distance` cosine distance of a stored one gets the stored answer
+back, skipping retrieval and the Gemini call. Embeddings are already
+L2-normalized (see ai.embeddings), so similarity is a single mat-vec product
+over the live rows.
+"""
+import threading
+import time
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    def __init__(self, max_entries: int, ttl: float, max_distance: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._reset()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _reset(self):
+        self._vectors: np.ndarray | None = None     # (max_entries, dim) float32
+        self._created = np.zeros(self.max_entries)  # monotonic time, 0 = empty slot
+        self._used = np.zeros(self.max_entries)
+        self._entries: list[dict | None] = [None] * self.max_entries
+
+    def _live(self, now: float) -> np.ndarray:
+        live = self._created > 0
+        if self.ttl:
+            live &= (now - self._created) <= self.ttl
+        return live
+
+    def lookup(self, embedding: list[float]) -> dict | None:
+        """Return {"response", "sources", "distance"} for the closest fresh entry, or None."""
+        now = time.monotonic()
+        with self._lock:
+            if self._vectors is None or len(embedding) != self._vectors.shape[1]:
+                self.misses += 1
+                return None
+            live = self._live(now)
+            if not live.any():
+                self.misses += 1
+                return None
+            sims = self._vectors @ np.asarray(embedding, dtype=np.float32)
+            sims[~live] = -np.inf
+            i = int(np.argmax(sims))
+            distance = 1.0 - float(sims[i])
+            if distance > self.max_distance:
+                self.misses += 1
+                return None
+            self._used[i] = now
+            self.hits += 1
+            return {**self._entries[i], "distance": round(distance, 4)}
+
+    def store(self, embedding: list[float], response: str, sources: list[dict]):
+        now = time.monotonic()
+        with self._lock:
+            if self._vectors is None or len(embedding) != self._vectors.shape[1]:
+                self._reset()
+                self._vectors = np.zeros((self.max_entries, len(embedding)), dtype=np.float32)
+
+            live = self._live(now)
+            if not live.all():
+                i = int(np.argmin(live))                # first empty / expired slot
+            else:
+                i = int(np.argmin(self._used))          # least recently used
+                self.evictions += 1
+
+            self._vectors[i] = embedding
+            self._created[i] = now
+            self._used[i] = now
+            self._entries[i] = {"response": response, "sources": sources}
+
+    def clear(self):
+        """Drop every entry, e.g. after /admin/reindex changed the corpus."""
+        with self._lock:
+            self._reset()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": int(self._live(time.monotonic()).sum()),
+                "max_entries": self.max_entries,
+                "max_distance": self.max_distance,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
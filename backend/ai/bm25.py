@@ -0,0 +1,110 @@
+"""
+Compact BM25 inverted index over the handbook chunks, for exact-term questions
+(account codes like "3311", form names, "check request") that dense search
+ranks poorly.
+
+Built next to the local vector index (ai/local_index.py) with the same row
+order, stored as one bm25.npz:
+    vocab    (T,)   sorted terms
+    indptr   (T+1,) CSR offsets into doc_ids / tfs, one run per term
+    doc_ids  (P,)   int32 chunk rows
+    tfs      (P,)   float32 term frequency of the term in that chunk
+    doc_len  (N,)   float32 tokens per chunk
+"""
+import re
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from ai.settings import LOCAL_INDEX_DIR
+
+BM25_FILE = "bm25.npz"
+K1 = 1.2
+B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it my of on or "
+    "our passage query should that the their there this to was we what when where "
+    "which who will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, vocab: np.ndarray, indptr: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray, doc_len: np.ndarray):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self._term_ids = {t: i for i, t in enumerate(vocab.tolist())}
+        n = len(doc_len)
+        df = np.diff(indptr).astype(np.float32)
+        self.idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avg = float(doc_len.mean()) if n else 1.0
+        self._norm = (K1 * (1 - B + B * doc_len / (avg or 1.0))).astype(np.float32)
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    @classmethod
+    def build(cls, texts: list[str]) -> "BM25Index":
+        counts = [Counter(tokenize(t)) for t in texts]
+        vocab = sorted({term for c in counts for term in c})
+        term_ids = {t: i for i, t in enumerate(vocab)}
+
+        postings: list[list[tuple[int, int]]] = [[] for _ in vocab]
+        for doc, c in enumerate(counts):
+            for term, tf in c.items():
+                postings[term_ids[term]].append((doc, tf))
+
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(p) for p in postings])
+        flat = [pair for p in postings for pair in p]
+        doc_ids = np.array([d for d, _ in flat], dtype=np.int32)
+        tfs = np.array([tf for _, tf in flat], dtype=np.float32)
+        doc_len = np.array([sum(c.values()) for c in counts], dtype=np.float32)
+        return cls(np.array(vocab, dtype=str), indptr, doc_ids, tfs, doc_len)
+
+    def save(self, index_dir: Path = LOCAL_INDEX_DIR):
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        # np.savez appends ".npz" to names that lack it, so keep the suffix on the tmp file
+        tmp = index_dir / ("tmp-" + BM25_FILE)
+        np.savez(tmp, vocab=self.vocab, indptr=self.indptr, doc_ids=self.doc_ids, tfs=self.tfs, doc_len=self.doc_len)
+        tmp.replace(index_dir / BM25_FILE)
+
+    @classmethod
+    def load(cls, index_dir: Path = LOCAL_INDEX_DIR) -> "BM25Index":
+        with np.load(Path(index_dir) / BM25_FILE) as z:
+            return cls(z["vocab"], z["indptr"], z["doc_ids"], z["tfs"], z["doc_len"])
+
+    def search(self, query: str, k: int) -> list[tuple[int, float]]:
+        """Top-k (row, score) pairs; rows with no query term never appear."""
+        scores = np.zeros(len(self.doc_len), dtype=np.float32)
+        for term in set(tokenize(query)):
+            t = self._term_ids.get(term)
+            if t is None:
+                continue
+            lo, hi = self.indptr[t], self.indptr[t + 1]
+            docs, tf = self.doc_ids[lo:hi], self.tfs[lo:hi]
+            scores[docs] += self.idf[t] * tf * (K1 + 1) / (tf + self._norm[docs])
+
+        hit = np.flatnonzero(scores)
+        if len(hit) == 0 or k <= 0:
+            return []
+        if len(hit) > k:
+            hit = hit[np.argpartition(scores[hit], len(hit) - k)[len(hit) - k:]]
+        hit = hit[np.argsort(scores[hit])[::-1]]
+        return [(int(i), float(scores[i])) for i in hit]
+
+
+@lru_cache(maxsize=1)
+def get_bm25_index() -> BM25Index:
+    return BM25Index.load()
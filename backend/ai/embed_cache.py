@@ -0,0 +1,211 @@
+"""
+Cache for query embeddings (see ai.embeddings.embed_query).
+
+Two tiers:
+  memory  bounded LRU with a per-entry TTL
+  disk    optional, fixed number of slots in memory-mapped .npy files under
+          EMBED_CACHE_DIR, so hot questions survive restarts (workers sharing a
+          directory see each other's entries after a restart; last writer wins)
+
+Keys are the normalized query text (casefolded, whitespace collapsed) plus the
+model name; the model itself is always given the text as asked. e5-base-v2 is
+uncased and its tokenizer collapses whitespace, so questions that share a key
+embed to the same vector.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+class _DiskTier:
+    """
+    Three parallel memmapped arrays, one row per slot:
+        vectors.npy  (slots, dim) float32
+        keys.npy     (slots,)     S32   hex digest of the cache key, b"" if empty
+        stamps.npy   (slots,)     float64 unix time the slot was written
+    A new entry goes into the oldest slot.
+    """
+
+    def __init__(self, directory: Path, slots: int):
+        self.dir = Path(directory)
+        self.slots = slots
+        self.vectors = None
+        self.keys = None
+        self.stamps = None
+        self.index: dict[bytes, int] = {}
+        self.dir.mkdir(parents=True, exist_ok=True)
+        if (self.dir / "vectors.npy").exists():
+            self._open()
+
+    def _paths(self):
+        return self.dir / "vectors.npy", self.dir / "keys.npy", self.dir / "stamps.npy"
+
+    def _open(self):
+        vp, kp, sp = self._paths()
+        try:
+            vectors = np.load(vp, mmap_mode="r+")
+            keys = np.load(kp, mmap_mode="r+")
+            stamps = np.load(sp, mmap_mode="r+")
+        except (OSError, ValueError) as e:
+            print("[embed_cache] disk tier unreadable, starting fresh:", e)
+            return
+        if not (len(vectors) == len(keys) == len(stamps) == self.slots):
+            print("[embed_cache] disk tier size changed, starting fresh")
+            return
+        self.vectors, self.keys, self.stamps = vectors, keys, stamps
+        self.index = {k: i for i, k in enumerate(keys.tolist()) if k}
+
+    def _create(self, dim: int):
+        vp, kp, sp = self._paths()
+        # another worker may have created the files since we last looked
+        if vp.exists():
+            self._open()
+            if self.vectors is not None and self.vectors.shape[1] == dim:
+                return
+        # Build under temporary names and rename into place: opening the live
+        # files with "w+" would truncate them under workers that have them
+        # mapped. Keys go first, so a reader never pairs old keys with new vectors.
+        fmt = np.lib.format
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        arrays = []
+        for path, dtype, shape in ((kp, "S32", (self.slots,)), (sp, np.float64, (self.slots,)),
+                                   (vp, np.float32, (self.slots, dim))):
+            tmp = path.with_name(path.name + suffix)
+            arr = fmt.open_memmap(tmp, mode="w+", dtype=dtype, shape=shape)
+            arr.flush()
+            os.replace(tmp, path)
+            arrays.append(arr)
+        self.keys, self.stamps, self.vectors = arrays
+        self.index = {}
+
+    def get(self, digest: bytes, ttl: float):
+        i = self.index.get(digest)
+        if i is None or self.keys[i] != digest:
+            return None
+        age = time.time() - float(self.stamps[i])
+        if ttl and age > ttl:
+            return None
+        return self.vectors[i].tolist(), age
+
+    def put(self, digest: bytes, vector: list[float]):
+        if self.vectors is None or self.vectors.shape[1] != len(vector):
+            self._create(len(vector))
+        i = self.index.get(digest)
+        if i is None:
+            i = int(np.argmin(self.stamps))
+            old = bytes(self.keys[i])
+            if old:
+                self.index.pop(old, None)
+        self.vectors[i] = vector
+        self.keys[i] = digest
+        self.stamps[i] = time.time()
+        self.index[digest] = i
+        for arr in (self.vectors, self.keys, self.stamps):
+            arr.flush()
+
+    def clear(self):
+        if self.keys is not None:
+            self.keys[:] = b""
+            self.stamps[:] = 0
+            self.keys.flush()
+            self.stamps.flush()
+        self.index = {}
+
+
+class QueryEmbeddingCache:
+    def __init__(self, model: str, max_entries: int, ttl: float, disk_dir: str | None = None, disk_slots: int = 0):
+        self.model = model
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._mem: OrderedDict[bytes, tuple[float, list[float]]] = OrderedDict()
+        self._disk = _DiskTier(Path(disk_dir), disk_slots) if disk_dir and disk_slots > 0 else None
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.model_seconds = 0.0
+
+    def _digest(self, normalized: str) -> bytes:
+        return hashlib.blake2b(f"{self.model}\x00{normalized}".encode(), digest_size=16).hexdigest().encode()
+
+    def get_or_compute(self, text: str, compute) -> list[float]:
+        """
+        Return the cached embedding for `text`, or call `compute()` (which embeds
+        the original text) and remember the result under the normalized key.
+        """
+        normalized = normalize_query(text)
+        digest = self._digest(normalized)
+        now = time.monotonic()
+
+        with self._lock:
+            hit = self._mem.get(digest)
+            if hit is not None:
+                stamp, vector = hit
+                if not self.ttl or now - stamp <= self.ttl:
+                    self._mem.move_to_end(digest)
+                    self.memory_hits += 1
+                    return vector
+                del self._mem[digest]
+
+            if self._disk is not None:
+                found = self._disk.get(digest, self.ttl)
+                if found is not None:
+                    vector, age = found
+                    self.disk_hits += 1
+                    self._remember(digest, vector, now - age)
+                    return vector
+
+        # model call happens outside the lock so concurrent misses don't serialize
+        started = time.perf_counter()
+        vector = compute()
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.misses += 1
+            self.model_seconds += elapsed
+            self._remember(digest, vector, time.monotonic())
+            if self._disk is not None:
+                self._disk.put(digest, vector)
+        return vector
+
+    def _remember(self, digest: bytes, vector: list[float], stamp: float):
+        self._mem[digest] = (stamp, vector)
+        self._mem.move_to_end(digest)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            if self._disk is not None:
+                self._disk.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            avg_model = self.model_seconds / self.misses if self.misses else 0.0
+            return {
+                "entries": len(self._mem),
+                "max_entries": self.max_entries,
+                "disk_entries": len(self._disk.index) if self._disk is not None else None,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "avg_model_ms": round(avg_model * 1000, 2),
+                "model_seconds_saved": round(avg_model * hits, 3),
+            }
@@ -1,17 +1,37 @@
 from functools import lru_cache
-from langchain_huggingface import HuggingFaceEmbeddings
-from ai.settings import EMBED_MODEL
+from ai.settings import EMBED_MODEL, EMBED_BACKEND, EMBED_CACHE_SIZE, EMBED_CACHE_TTL, EMBED_CACHE_DIR, EMBED_CACHE_DISK_SLOTS
+from ai.embed_cache import QueryEmbeddingCache
 
 @lru_cache(maxsize=1)
 def get_embeddings():
+    if EMBED_BACKEND == "onnx":
+        # int8 onnxruntime export; same pooling + normalization, no torch at runtime
+        from ai.onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings()
+
+    from langchain_huggingface import HuggingFaceEmbeddings
     # normalize_embeddings=True is important for cosine search
     return HuggingFaceEmbeddings(
         model_name=EMBED_MODEL, 
         encode_kwargs={"normalize_embeddings": True}
     )
 
+@lru_cache(maxsize=1)
+def get_query_cache() -> QueryEmbeddingCache:
+    return QueryEmbeddingCache(
+        # backends agree closely but not bit-for-bit, so they don't share cache entries
+        model=EMBED_MODEL if EMBED_BACKEND == "torch" else f"{EMBED_MODEL}@{EMBED_BACKEND}",
+        max_entries=EMBED_CACHE_SIZE,
+        ttl=EMBED_CACHE_TTL,
+        disk_dir=EMBED_CACHE_DIR or None,
+        disk_slots=EMBED_CACHE_DISK_SLOTS,
+    )
+
 def embed_query(text: str) -> list[float]:
-    return get_embeddings().embed_query("query: " + text)
+    # repeated questions ("how do reimbursements work") skip the model entirely
+    return get_query_cache().get_or_compute(
+        text, lambda: get_embeddings().embed_query("query: " + text)
+    )
 
 def embed_documents(texts: list[str]) -> list[list[float]]:
     # used only if you manually embed docs; VectorStore will call embed_documents internally
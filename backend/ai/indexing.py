@@ -1,14 +1,20 @@
+import os
 import re
+import json
+import time
+import uuid
+import hashlib
 from typing import List
 from pathlib import Path
-from supabase import create_client
 from langchain_core.documents import Document
-from langchain_community.document_loaders import PyPDFDirectoryLoader
+from langchain_community.document_loaders import PyPDFDirectoryLoader, PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import SupabaseVectorStore
 
-from ai.settings import SUPABASE_URL, SUPABASE_KEY, SUPABASE_TABLE_NAME, DATA_PATH
+from ai.settings import SUPABASE_URL, SUPABASE_KEY, SUPABASE_TABLE_NAME, DATA_PATH, LOCAL_INDEX_DIR, EMBED_MODEL
 from ai.embeddings import get_embeddings
+from ai.local_index import LocalIndex, write_index
+from app.pool import get_client
 
 _CTRL = re.compile(r"[\x00-\x08\x0B\x0C\x0E-\x1F]")
 
@@ -42,23 +48,227 @@ def split_documents(documents: List[Document]) -> List[Document]:
     return splitter.split_documents(documents)
 
 
-# Index PDFs from data_dir into Supabase vector store
-def index_pdfs_to_supabase(data_dir: Path = DATA_PATH) -> int:
-    docs = load_documents(data_dir)
-    chunks = split_documents(docs)
-    sanitized = sanitize(chunks)
-    if not sanitized:
-        print("⚠️ No chunks to index.")
-        return 0
+# ---------------------------
+# Incremental reindex
+# ---------------------------
+# LOCAL_INDEX_DIR/manifest.json remembers, per PDF, its content hash and the ids
+# of the chunks it produced, and per chunk the hash of its text + metadata.
+# Unchanged files are skipped without being parsed; changed files are re-split
+# and only chunks whose hash moved are re-embedded and upserted; chunks whose
+# file (or position) disappeared are deleted.
+
+MANIFEST_FILE = "manifest.json"
+DELETE_BATCH = 200
+EMBED_BATCH = 64      # chunks per embed_documents call
+UPLOAD_BATCH = 200    # rows per upsert
+ID_PAGE = 1000        # ids per page when listing the table for a rebuild
+
+
+def _file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _chunk_hash(d: Document) -> str:
+    payload = d.page_content + "\x00" + json.dumps(d.metadata, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _chunk_ids(rel: str, chunks: List[Document]) -> List[str]:
+    # stable id = file + page + position on the page, so an edited page updates in place
+    ids, seen = [], {}
+    for d in chunks:
+        page = d.metadata.get("page", 0)
+        n = seen.get(page, 0)
+        seen[page] = n + 1
+        ids.append(str(uuid.uuid5(uuid.NAMESPACE_URL, f"{rel}#p{page}#c{n}")))
+    return ids
+
+def _load_manifest(index_dir: Path) -> dict | None:
+    path = index_dir / MANIFEST_FILE
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("model") != EMBED_MODEL:
+        print(f"⚠️ Manifest built with {manifest.get('model')!r}; re-embedding everything for {EMBED_MODEL!r}.")
+        return None
+    return manifest
+
+def _save_manifest(index_dir: Path, manifest: dict):
+    index_dir.mkdir(parents=True, exist_ok=True)
+    tmp = index_dir / (MANIFEST_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, index_dir / MANIFEST_FILE)
+
+def _existing_vectors(index_dir: Path) -> dict:
+    """id -> (vector, chunk) for rows already in the local index, if it exists."""
+    try:
+        ix = LocalIndex.load(index_dir)
+    except FileNotFoundError:
+        return {}
+    return {c["id"]: (ix.matrix[i], c) for i, c in enumerate(ix.chunks) if "id" in c}
+
+
+def _table_ids(table) -> List[str]:
+    """Every row id in the vector table, a page at a time."""
+    ids, last = [], None
+    while True:
+        query = table.select("id").order("id").limit(ID_PAGE)
+        if last is not None:
+            query = query.gt("id", last)
+        rows = query.execute().data or []
+        ids += [str(r["id"]) for r in rows]
+        if len(rows) < ID_PAGE:
+            return ids
+        last = rows[-1]["id"]
+
+
+def _no_progress(phase: str, done: int, total: int):
+    pass
+
+
+def index_pdfs_to_supabase(
+    data_dir: Path = DATA_PATH,
+    index_dir: Path = LOCAL_INDEX_DIR,
+    rebuild: bool | None = None,
+    progress=None,
+) -> dict:
+    """
+    Bring the Supabase vector table and the local index in line with the PDFs in
+    data_dir, touching only what changed. Returns counts:
+    {"added", "updated", "removed", "skipped", "files_changed", "files_removed", "errors", "seconds"}.
+
+    rebuild=None rebuilds from scratch only when there is no manifest yet (first
+    run, or the model changed); that also clears rows left by older full reindexes,
+    after the new rows are uploaded, so retrieval keeps working during the run.
+
+    progress(phase, done, total) is called as work moves through the phases
+    load (files) -> split (files) -> embed (chunks) -> upload (rows). It may raise
+    (e.g. ai.reindex_jobs.ReindexCancelled) to stop; Supabase is only written during
+    upload, and the manifest only at the very end, so a cancelled run is simply
+    redone next time.
+    A PDF that fails to load is reported in "errors" and keeps its previous chunks.
+    """
+    progress = progress or _no_progress
+    started = time.perf_counter()
+    report = {"added": 0, "updated": 0, "removed": 0, "skipped": 0, "files_changed": 0, "files_removed": 0, "errors": []}
+
     if not (SUPABASE_URL and SUPABASE_KEY):
         print("⚠️ Missing Supabase env vars; skipping index.")
-        return 0
+        return {**report, "seconds": 0.0}
+
+    manifest = None if rebuild else _load_manifest(index_dir)
+    rebuild = manifest is None
+    old_files = {} if rebuild else manifest["files"]
+    old_chunks = {} if rebuild else manifest["chunks"]
+    kept = {} if rebuild else _existing_vectors(index_dir)
+
+    pdfs = sorted(data_dir.rglob("*.pdf")) if data_dir.exists() else []
+    new_files, new_chunks = {}, {}
+
+    def keep_previous(rel: str, prev: dict):
+        new_files[rel] = prev
+        for cid in prev["chunks"]:
+            new_chunks[cid] = old_chunks[cid]
+        report["skipped"] += len(prev["chunks"])
+
+    # load: hash every PDF, parse only the ones that changed
+    loaded = []
+    progress("load", 0, len(pdfs))
+    for n, path in enumerate(pdfs, 1):
+        rel = path.relative_to(data_dir).as_posix()
+        prev = old_files.get(rel)
+        reusable = prev is not None and all(cid in kept for cid in prev["chunks"])
+        try:
+            digest = _file_hash(path)
+            if reusable and prev["sha256"] == digest:
+                keep_previous(rel, prev)
+            else:
+                loaded.append((rel, digest, PyPDFLoader(str(path)).load()))
+        except Exception as e:
+            print(f"⚠️ Could not load {rel}: {e}")
+            report["errors"].append({"file": rel, "error": str(e)})
+            if reusable:
+                keep_previous(rel, prev)
+        progress("load", n, len(pdfs))
+
+    # split: chunk the changed files and diff chunk hashes against the manifest
+    to_embed: List[Document] = []
+    to_embed_ids: List[str] = []
+    progress("split", 0, len(loaded))
+    for n, (rel, digest, pages) in enumerate(loaded, 1):
+        report["files_changed"] += 1
+        chunks = sanitize(split_documents(pages))
+        ids = _chunk_ids(rel, chunks)
+        new_files[rel] = {"sha256": digest, "chunks": ids}
+        for cid, d in zip(ids, chunks):
+            h = _chunk_hash(d)
+            new_chunks[cid] = {"hash": h, "file": rel}
+            if cid in old_chunks and old_chunks[cid]["hash"] == h and cid in kept:
+                report["skipped"] += 1
+                continue
+            report["updated" if cid in old_chunks else "added"] += 1
+            to_embed.append(d)
+            to_embed_ids.append(cid)
+        progress("split", n, len(loaded))
+    loaded.clear()
+
+    removed_ids = [cid for cid in old_chunks if cid not in new_chunks]
+    report["files_removed"] = sum(1 for rel in old_files if rel not in new_files)
+
+    # embed: in batches, so progress moves and a cancel lands quickly
+    vectors: list = []
+    progress("embed", 0, len(to_embed))
+    for i in range(0, len(to_embed), EMBED_BATCH):
+        batch = to_embed[i:i + EMBED_BATCH]
+        vectors.extend(get_embeddings().embed_documents([d.page_content for d in batch]))
+        progress("embed", len(vectors), len(to_embed))
+
+    # upload: upserts on id first, then deletes, so the table never goes empty
+    client = get_client(SUPABASE_URL, SUPABASE_KEY)
+    table = client.table(SUPABASE_TABLE_NAME)
+    if rebuild:
+        # unknown prior state (older runs appended duplicates with random ids):
+        # everything the new manifest doesn't list goes, once the new rows are in
+        removed_ids = [rid for rid in _table_ids(table) if rid not in new_chunks]
+    total_rows = len(to_embed) + len(removed_ids)
+    done = 0
+    progress("upload", 0, total_rows)
+    if to_embed:
+        store = SupabaseVectorStore(client=client, table_name=SUPABASE_TABLE_NAME, embedding=get_embeddings())
+        for i in range(0, len(to_embed), UPLOAD_BATCH):
+            store.add_vectors(vectors[i:i + UPLOAD_BATCH], to_embed[i:i + UPLOAD_BATCH], ids=to_embed_ids[i:i + UPLOAD_BATCH])
+            done += len(to_embed_ids[i:i + UPLOAD_BATCH])
+            progress("upload", done, total_rows)
+    for i in range(0, len(removed_ids), DELETE_BATCH):
+        batch = removed_ids[i:i + DELETE_BATCH]
+        table.delete().in_("id", batch).execute()
+        done += len(batch)
+        progress("upload", done, total_rows)
+    report["removed"] = len(removed_ids)
+
+    # local index (ai/local_index.py): reuse stored vectors for unchanged chunks
+    fresh = {
+        cid: (vec, {"id": cid, "content": d.page_content, "metadata": d.metadata})
+        for cid, vec, d in zip(to_embed_ids, vectors, to_embed)
+    }
+    changed = rebuild or to_embed or removed_ids or new_files.keys() != old_files.keys()
+    if changed:
+        order = [cid for rel in new_files for cid in new_files[rel]["chunks"]]
+        rows = [fresh.get(cid) or kept[cid] for cid in order]
+        write_index([v for v, _ in rows], [c for _, c in rows], index_dir)
+    if changed or new_files != old_files:
+        _save_manifest(index_dir, {"model": EMBED_MODEL, "files": new_files, "chunks": new_chunks})
 
-    client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    store = SupabaseVectorStore(client=client, table_name=SUPABASE_TABLE_NAME, embedding=get_embeddings())
-    store.add_documents(sanitized)
-    print(f"✅ Added {len(sanitized)} chunks to '{SUPABASE_TABLE_NAME}'")
-    return len(sanitized)
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    print(
+        f"✅ '{SUPABASE_TABLE_NAME}': +{report['added']} added, ~{report['updated']} updated, "
+        f"-{report['removed']} removed, {report['skipped']} unchanged ({report['seconds']}s)"
+    )
+    return report
 
 if __name__ == "__main__":
     from pathlib import Path
@@ -66,8 +276,9 @@ if __name__ == "__main__":
     from ai.settings import DATA_PATH
 
     data_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else DATA_PATH
+    rebuild = "--rebuild" in sys.argv
     print("🚀 Starting PDF indexing…", flush=True)
     print("📂 DATA_DIR:", data_dir, flush=True)
 
-    count = index_pdfs_to_supabase(data_dir)
-    print(f"🎯 Done. Indexed chunks: {count}", flush=True)
+    report = index_pdfs_to_supabase(data_dir, rebuild=rebuild or None)
+    print(f"🎯 Done. {report}", flush=True)
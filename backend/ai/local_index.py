@@ -0,0 +1,134 @@
+"""
+In-process vector index, an alternative to the match_banking_handbook RPC
+(RETRIEVAL_BACKEND=local in ai/settings.py).
+
+On disk (LOCAL_INDEX_DIR):
+    embeddings.npy  (N, dim) float32, rows L2-normalized
+    chunks.json     sidecar: model name + [{"id", "content", "metadata"}] in row order
+    bm25.npz        keyword index over the same rows (ai/bm25.py)
+
+The matrix is opened with mmap_mode="r", so every worker on the box shares one
+copy through the page cache. Search is one mat-vec product plus argpartition.
+
+Build it from the Supabase table for an existing deployment:
+    python -m ai.local_index
+(ai/indexing.py also writes it on every reindex.)
+"""
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from ai.settings import LOCAL_INDEX_DIR, EMBED_MODEL
+from ai.bm25 import BM25Index, get_bm25_index
+
+MATRIX_FILE = "embeddings.npy"
+SIDECAR_FILE = "chunks.json"
+
+
+class LocalIndex:
+    def __init__(self, matrix: np.ndarray, chunks: list[dict]):
+        if len(matrix) != len(chunks):
+            raise ValueError(f"index rows ({len(matrix)}) and sidecar chunks ({len(chunks)}) disagree")
+        self.matrix = matrix
+        self.chunks = chunks
+
+    def __len__(self):
+        return len(self.chunks)
+
+    @classmethod
+    def load(cls, index_dir: Path = LOCAL_INDEX_DIR) -> "LocalIndex":
+        index_dir = Path(index_dir)
+        matrix = np.load(index_dir / MATRIX_FILE, mmap_mode="r")
+        with open(index_dir / SIDECAR_FILE, "r", encoding="utf-8") as f:
+            sidecar = json.load(f)
+        if sidecar.get("model") != EMBED_MODEL:
+            print(f"[local_index] built with {sidecar.get('model')!r}, querying with {EMBED_MODEL!r}")
+        return cls(matrix, sidecar["chunks"])
+
+    def search(self, query_embedding: list[float], k: int) -> list[dict]:
+        """
+        Top-k rows by cosine similarity, shaped like the RPC rows:
+        {"content", "metadata", "similarity"}.
+        """
+        n = len(self.chunks)
+        if n == 0 or k <= 0:
+            return []
+        q = np.asarray(query_embedding, dtype=np.float32)
+        scores = self.matrix @ q
+        k = min(k, n)
+        top = np.argpartition(scores, n - k)[n - k:] if k < n else np.arange(n)
+        top = top[np.argsort(scores[top])[::-1]]
+        return [{**self.chunks[i], "similarity": float(scores[i])} for i in top]
+
+
+def write_index(vectors, chunks: list[dict], index_dir: Path = LOCAL_INDEX_DIR) -> int:
+    """
+    Persist vectors + {"content", "metadata"} chunks, and the BM25 index over
+    the same rows. Rows are re-normalized so search can use a plain dot product.
+    Files are swapped in atomically.
+    """
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+
+    matrix = np.array(vectors, dtype=np.float32).reshape(len(chunks), -1) if chunks else np.zeros((0, 0), np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms == 0, 1, norms)
+
+    tmp_matrix = index_dir / (MATRIX_FILE + ".tmp")
+    tmp_sidecar = index_dir / (SIDECAR_FILE + ".tmp")
+    with open(tmp_matrix, "wb") as f:
+        np.save(f, matrix)
+    with open(tmp_sidecar, "w", encoding="utf-8") as f:
+        json.dump({"model": EMBED_MODEL, "dim": int(matrix.shape[1]) if len(matrix) else 0, "chunks": chunks}, f)
+    os.replace(tmp_matrix, index_dir / MATRIX_FILE)
+    os.replace(tmp_sidecar, index_dir / SIDECAR_FILE)
+    BM25Index.build([c["content"] for c in chunks]).save(index_dir)
+
+    get_local_index.cache_clear()
+    get_bm25_index.cache_clear()
+    return len(chunks)
+
+
+@lru_cache(maxsize=1)
+def get_local_index() -> LocalIndex:
+    return LocalIndex.load()
+
+
+def export_from_supabase(index_dir: Path = LOCAL_INDEX_DIR, page_size: int = 500) -> int:
+    """Page the vector table out of Supabase and write it as a local index."""
+    from ai.settings import SUPABASE_URL, SUPABASE_KEY, SUPABASE_TABLE_NAME
+    from app.pool import get_client
+
+    table = get_client(SUPABASE_URL, SUPABASE_KEY).table(SUPABASE_TABLE_NAME)
+    vectors, chunks = [], []
+    start = 0
+    while True:
+        rows = (
+            table.select("id, content, metadata, embedding")
+            .order("id")
+            .range(start, start + page_size - 1)
+            .execute()
+            .data
+            or []
+        )
+        for r in rows:
+            emb = r["embedding"]
+            # pgvector columns come back as "[0.1,0.2,...]" strings over PostgREST
+            vectors.append(json.loads(emb) if isinstance(emb, str) else emb)
+            chunks.append({"id": r["id"], "content": r.get("content", ""), "metadata": r.get("metadata") or {}})
+        if len(rows) < page_size:
+            break
+        start += page_size
+
+    return write_index(vectors, chunks, index_dir)
+
+
+if __name__ == "__main__":
+    import sys
+
+    target = Path(sys.argv[1]) if len(sys.argv) > 1 else LOCAL_INDEX_DIR
+    print("📦 Exporting Supabase vectors to", target, flush=True)
+    print(f"🎯 Done. Rows: {export_from_supabase(target)}", flush=True)
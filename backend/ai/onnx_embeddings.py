@@ -0,0 +1,138 @@
+"""
+CPU embedding backend: e5-base-v2 exported to ONNX and dynamically quantized
+to int8, run with onnxruntime (EMBED_BACKEND=onnx in ai/settings.py).
+
+It is a drop-in for the HuggingFaceEmbeddings instance get_embeddings() returns
+otherwise: same mean pooling and L2 normalization as sentence-transformers, and
+callers still add the "query: " / "passage: " prefixes themselves. At query
+time only onnxruntime and tokenizers are needed, not torch.
+
+Export once (needs torch + transformers, i.e. the normal dev install, plus
+onnxruntime):
+    python -m ai.onnx_embeddings [out_dir]
+
+ONNX_MODEL_DIR then holds:
+    model.onnx        fp32 export (kept for reference / re-quantizing)
+    model.int8.onnx   what gets loaded
+    tokenizer.json    fast tokenizer
+    export.json       source model name
+
+Parity with the torch backend and speed/memory:
+    python -m benchmarks.embedding_backends
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from ai.settings import EMBED_MODEL, ONNX_MODEL_DIR, ONNX_THREADS
+
+QUANTIZED_FILE = "model.int8.onnx"
+FP32_FILE = "model.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+META_FILE = "export.json"
+MAX_LENGTH = 512     # e5-base-v2's max_seq_length in sentence-transformers
+
+
+class OnnxEmbeddings(Embeddings):
+    def __init__(self, model_dir: Path = ONNX_MODEL_DIR, threads: int = ONNX_THREADS, batch_size: int = 32):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise RuntimeError("EMBED_BACKEND=onnx needs `pip install onnxruntime tokenizers`") from e
+
+        model_dir = Path(model_dir)
+        if not (model_dir / QUANTIZED_FILE).exists():
+            raise FileNotFoundError(f"no {QUANTIZED_FILE} in {model_dir}; run python -m ai.onnx_embeddings")
+        meta_path = model_dir / META_FILE
+        if meta_path.exists():
+            exported = json.loads(meta_path.read_text()).get("model")
+            if exported != EMBED_MODEL:
+                print(f"[onnx_embeddings] exported from {exported!r}, EMBED_MODEL is {EMBED_MODEL!r}")
+
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(str(model_dir / TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(MAX_LENGTH)
+        self.tokenizer.no_padding()   # batches are padded by hand, after sorting by length
+
+        opts = ort.SessionOptions()
+        if threads:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(model_dir / QUANTIZED_FILE), opts, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def _run(self, texts: list[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        width = max(len(e.ids) for e in encodings)
+        ids = np.zeros((len(texts), width), dtype=np.int64)
+        mask = np.zeros((len(texts), width), dtype=np.int64)
+        for row, e in enumerate(encodings):
+            ids[row, :len(e.ids)] = e.ids
+            mask[row, :len(e.ids)] = 1
+
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+        hidden = self.session.run(None, feeds)[0]          # (batch, seq, dim)
+
+        # mean pooling over real tokens, then L2 normalize (what sentence-transformers does)
+        m = mask[..., None].astype(np.float32)
+        pooled = (hidden * m).sum(axis=1) / np.clip(m.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        # similar lengths share a batch, so little time goes into padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        out = np.zeros((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            rows = order[start:start + self.batch_size]
+            vectors = self._run([texts[i] for i in rows])
+            if out.shape[1] == 0:
+                out = np.zeros((len(texts), vectors.shape[1]), dtype=np.float32)
+            out[rows] = vectors
+        return out.tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._run([text])[0].tolist()
+
+
+def export(model_name: str = EMBED_MODEL, out_dir: Path = ONNX_MODEL_DIR) -> Path:
+    """Export `model_name` to ONNX, quantize weights to int8, save the tokenizer."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    sample = tokenizer(["query: how do reimbursements work"], return_tensors="pt")
+    dynamic = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            str(out_dir / FP32_FILE),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={"input_ids": dynamic, "attention_mask": dynamic, "last_hidden_state": dynamic},
+            opset_version=17,
+        )
+    quantize_dynamic(str(out_dir / FP32_FILE), str(out_dir / QUANTIZED_FILE), weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(str(out_dir))   # writes tokenizer.json for fast tokenizers
+    (out_dir / META_FILE).write_text(json.dumps({"model": model_name, "weights": "int8-dynamic"}))
+    return out_dir / QUANTIZED_FILE
+
+
+if __name__ == "__main__":
+    import sys
+
+    target = Path(sys.argv[1]) if len(sys.argv) > 1 else ONNX_MODEL_DIR
+    print(f"📦 Exporting {EMBED_MODEL} to {target}", flush=True)
+    print("🎯 Done:", export(EMBED_MODEL, target), flush=True)
@@ -0,0 +1,159 @@
+"""
+Background reindex jobs for /admin/reindex.
+
+index_pdfs_to_supabase() is fully blocking (PDF parsing, embedding, uploads),
+so it runs on a dedicated single-worker executor instead of the event loop.
+Only one job runs at a time; callers poll the job for its phase and progress
+and can ask it to stop, which takes effect at the next progress step.
+
+A thread rather than a process: the job must clear this process's caches
+(local index, BM25, answer cache) when it finishes, and a child process would
+load a second copy of the embedding model. Model inference and uploads
+release the GIL, so /chat keeps being served while a job runs.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+PHASES = ("load", "split", "embed", "upload")
+_UNITS = {"load": "files", "split": "files", "embed": "chunks", "upload": "rows"}
+
+
+class ReindexCancelled(Exception):
+    """Raised from a job's progress callback to stop the indexer between steps."""
+
+
+class ReindexBusy(Exception):
+    def __init__(self, job: "ReindexJob"):
+        super().__init__(f"reindex job {job.id} is still {job.status}")
+        self.job = job
+
+
+class ReindexJob:
+    def __init__(self, rebuild: bool | None):
+        self.id = uuid.uuid4().hex
+        self.rebuild = rebuild
+        self.status = "queued"        # queued | running | succeeded | failed | cancelled
+        self.phase: str | None = None
+        self.phases: dict[str, dict] = {}
+        self.errors: list[dict] = []
+        self.report: dict | None = None
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def cancel(self):
+        self._cancel.set()
+
+    def progress(self, phase: str, done: int, total: int):
+        """Callback handed to index_pdfs_to_supabase; also the cancellation point."""
+        if self._cancel.is_set():
+            raise ReindexCancelled()
+        now = time.monotonic()
+        with self._lock:
+            step = self.phases.get(phase)
+            if step is None:
+                step = self.phases[phase] = {"done": 0, "total": 0, "unit": _UNITS.get(phase), "_t0": now, "_t1": now}
+                self.phase = phase
+            step["done"], step["total"], step["_t1"] = done, total, now
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            phases = {}
+            for name, step in self.phases.items():
+                seconds = step["_t1"] - step["_t0"]
+                phases[name] = {
+                    "done": step["done"],
+                    "total": step["total"],
+                    "unit": step["unit"],
+                    "seconds": round(seconds, 2),
+                    "per_sec": round(step["done"] / seconds, 1) if seconds > 0 else None,
+                }
+            current = phases.get(self.phase) if self.phase else None
+            embed = phases.get("embed")
+            end = self.finished_at or time.time()
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "cancel_requested": self._cancel.is_set() and self.active,
+                "rebuild": self.rebuild,
+                "phase": self.phase,
+                "progress": {"done": current["done"], "total": current["total"], "unit": current["unit"]} if current else None,
+                "chunks_per_sec": embed["per_sec"] if embed else None,
+                "phases": phases,
+                "errors": list(self.errors),
+                "report": self.report,
+                "created_at": self.created_at,
+                "elapsed_seconds": round(end - self.started_at, 2) if self.started_at else None,
+            }
+
+
+class ReindexJobs:
+    """
+    Registry + single-worker executor. `run(rebuild=..., progress=...)` is the
+    indexing function; `on_success(report)` runs in the worker after a job
+    finishes without error (e.g. to drop cached answers).
+    """
+
+    def __init__(self, run, on_success=None, history: int = 20):
+        self._run = run
+        self._on_success = on_success
+        self._history = history
+        self._jobs: OrderedDict[str, ReindexJob] = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    def start(self, rebuild: bool | None = None) -> ReindexJob:
+        with self._lock:
+            for job in self._jobs.values():
+                if job.active:
+                    raise ReindexBusy(job)
+            job = ReindexJob(rebuild)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self._history:
+                self._jobs.popitem(last=False)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reindex")
+            self._executor.submit(self._execute, job)
+            return job
+
+    def _execute(self, job: ReindexJob):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.progress("load", 0, 0)   # honours a cancel that arrived while queued
+            job.report = self._run(rebuild=job.rebuild, progress=job.progress)
+            job.errors.extend(job.report.get("errors", []))
+            if self._on_success:
+                self._on_success(job.report)
+            job.status = "succeeded"
+        except ReindexCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            print(f"[reindex] job {job.id} failed: {e!r}")
+            job.errors.append({"phase": job.phase, "error": repr(e)})
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> ReindexJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> ReindexJob | None:
+        job = self.get(job_id)
+        if job is not None and job.active:
+            job.cancel()
+        return job
+
+    def list(self) -> list[ReindexJob]:
+        with self._lock:
+            return list(reversed(self._jobs.values()))
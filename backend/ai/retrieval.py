@@ -1,10 +1,18 @@
-from typing import List, Tuple
-from supabase import create_client
-from langchain_core.documents import Document
-from langchain_core.prompts import ChatPromptTemplate
+from __future__ import annotations
+
+from typing import List, Tuple, TYPE_CHECKING
 
 from ai.embeddings import embed_query, get_embeddings
-from ai.settings import SUPABASE_URL, SUPABASE_KEY, RPC_NAME
+from ai.settings import (
+    SUPABASE_URL, SUPABASE_KEY, RPC_NAME, RPC_TIMEOUT, RETRIEVAL_BACKEND,
+    RETRIEVAL_MODE, RRF_K, HYBRID_FANOUT,
+)
+from ai.local_index import get_local_index
+from ai.bm25 import get_bm25_index
+from app.pool import get_client, call_timeout
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
 
 PROMPT_TEMPLATE = """
 You are the SDSU Registered Student Organization (RSO) Assistant.
@@ -32,21 +40,67 @@ Answer:
 def _client():
     if not (SUPABASE_URL and SUPABASE_KEY):
         raise RuntimeError("Supabase not configured (SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY).")
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
+    return get_client(SUPABASE_URL, SUPABASE_KEY)
+
+def _search(emb: list[float], k: int) -> list[dict]:
+    # both engines return rows shaped {"content", "metadata", "similarity"}
+    if RETRIEVAL_BACKEND == "local":
+        return get_local_index().search(emb, k)
+    with call_timeout(RPC_TIMEOUT):
+        return _client().rpc(RPC_NAME, {"query_embedding": emb, "match_count": k}).execute().data or []
+
+_warned_no_bm25 = False
+
+def _keyword_search(query_text: str, k: int) -> list[dict] | None:
+    # BM25 rows line up with the local index's chunks.json
+    global _warned_no_bm25
+    try:
+        bm25, chunks = get_bm25_index(), get_local_index().chunks
+    except FileNotFoundError:
+        if not _warned_no_bm25:
+            print("[retrieval] no local BM25 index; falling back to dense only (run python -m ai.local_index)")
+            _warned_no_bm25 = True
+        return None
+    return [chunks[i] for i, _ in bm25.search(query_text, k)]
+
+def _rrf(rankings: list[list[dict]], k: int) -> list[dict]:
+    """Reciprocal-rank fusion; rows from different engines are matched on their content."""
+    scores, rows = {}, {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking):
+            key = row.get("content", "")
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+            rows.setdefault(key, row)
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [rows[key] for key in best]
+
+def retrieve_docs(query_text: str, k: int = 8) -> List[Document]:
+    from langchain_core.documents import Document   # langchain is slow to import; keep it off startup
 
-def retrieve_context(query_text: str, k: int =8, threshold: float = 0.0):
     emb = embed_query(query_text)
 
-    rows = _client().rpc(RPC_NAME, {"query_embedding": emb, "match_count": k}).execute().data or []
-    docs = [Document(page_content=r.get("content", ""), metadata=(r.get("metadata") or {})) for r in rows]
+    if RETRIEVAL_MODE == "hybrid":
+        depth = k * HYBRID_FANOUT
+        keyword = _keyword_search(query_text, depth)
+        rows = _rrf([_search(emb, depth), keyword], k) if keyword is not None else _search(emb, k)
+    else:
+        rows = _search(emb, k)
+    return [Document(page_content=r.get("content", ""), metadata=(r.get("metadata") or {})) for r in rows]
 
+def format_context(docs: List[Document]) -> str:
     parts = []
     for d in docs:
         src = d.metadata.get("source", "unknown")
         pg  = d.metadata.get("page", "–")
         parts.append(f"[source: {src} | page: {pg}]\n{d.page_content}")
-    context_text = "\n\n---\n\n".join(parts) if parts else "No matching context found."
+    return "\n\n---\n\n".join(parts) if parts else "No matching context found."
 
-    prompt = ChatPromptTemplate.from_template(PROMPT_TEMPLATE).format(context=context_text, question=query_text)
+def build_prompt(query_text: str, docs: List[Document]) -> str:
+    from langchain_core.prompts import ChatPromptTemplate
+    return ChatPromptTemplate.from_template(PROMPT_TEMPLATE).format(context=format_context(docs), question=query_text)
+
+def retrieve_context(query_text: str, k: int =8, threshold: float = 0.0):
+    docs = retrieve_docs(query_text, k)
+    prompt = build_prompt(query_text, docs)
     print(docs)
     return prompt, docs
@@ -13,4 +13,23 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 SUPABASE_TABLE_NAME = os.getenv("SUPABASE_TABLE_NAME", "banking_handbook")
 RPC_NAME = os.getenv("RPC_NAME", "match_banking_handbook")
+RPC_TIMEOUT = float(os.getenv("RPC_TIMEOUT", "5"))   # seconds, per match_* call
+
+# Retrieval engine: "rpc" (pgvector match_* RPC) or "local" (in-process index, ai/local_index.py)
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "rpc").lower()
+LOCAL_INDEX_DIR = Path(os.getenv("LOCAL_INDEX_DIR", BACKEND_ROOT / "index")).resolve()
+# "dense" (vectors only) or "hybrid" (vectors + BM25, reciprocal-rank fusion; needs the local index files)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+RRF_K = int(os.getenv("RRF_K", "60"))
+HYBRID_FANOUT = int(os.getenv("HYBRID_FANOUT", "4"))   # candidates per ranker = k * fanout
 EMBED_MODEL = os.getenv("EMBED_MODEL", "intfloat/e5-base-v2")
+# "torch" (sentence-transformers) or "onnx" (int8 onnxruntime export, ai/onnx_embeddings.py)
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch").lower()
+ONNX_MODEL_DIR = Path(os.getenv("ONNX_MODEL_DIR", BACKEND_ROOT / "models" / "e5-base-v2-int8")).resolve()
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))   # 0 = onnxruntime default
+
+# Query-embedding cache (ai/embed_cache.py); EMBED_CACHE_DIR empty -> memory only
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "2048"))
+EMBED_CACHE_TTL = float(os.getenv("EMBED_CACHE_TTL", "86400"))        # seconds, 0 = no expiry
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "")
+EMBED_CACHE_DISK_SLOTS = int(os.getenv("EMBED_CACHE_DISK_SLOTS", "8192"))
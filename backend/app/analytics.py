@@ -0,0 +1,278 @@
+"""
+Transaction rollups for the dashboard: totals per period x code x category x
+status, computed from the transactions table instead of the mutable summary
+rows.
+
+Only the five columns the rollup needs (plus id, for paging) are fetched (keyset pages), kept as
+flat column lists, and aggregated in one vectorized pass: amounts become
+int64 cents (exact), every (period, code, category, status) combination
+becomes one integer key, and np.bincount sums all groups at once.
+
+Results are cached per club and query, at most ANALYTICS_CACHE_SIZE of them
+(least recently used evicted first). A club's results are dropped when its
+transactions change or its period index is rebuilt (ANALYTICS_CACHE_TTL bounds
+other workers' writes).
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from starlette.concurrency import run_in_threadpool
+
+from app.crud.transactions import async_transactions_crud as transactions_crud
+from app.financial_codes import COUNTED_STATUSES
+from app.period_index import period_index, PeriodIndex
+from app.schemas.transactions import is_expense_category, is_revenue_category
+
+ROLLUP_COLUMNS = ("id", "date", "amount", "code", "category", "status")
+FETCH_PAGE_SIZE = 1000
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "60"))
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "1024"))
+
+STATUSES = ("completed", "approved", "pending")
+
+
+def _kind(code: str | None, category: str | None, code_fields: dict) -> str:
+    """revenue | expense | other, by code first, then by category name."""
+    field = code_fields.get(code or "")
+    if field:
+        return "revenue" if field.startswith("revenue_") else "expense"
+    if category and is_revenue_category(category):
+        return "revenue"
+    if category and is_expense_category(category):
+        return "expense"
+    return "other"
+
+
+def rollup(columns: dict[str, list], periods: PeriodIndex, code_fields: dict) -> dict:
+    """
+    columns: {"date": [...], "amount": [...], "code": [...], "category": [...], "status": [...]}
+    (parallel lists, as fetched). Returns the grouped totals; see GET /analytics.
+    """
+    import numpy as np
+
+    n = len(columns["date"])
+    if n == 0:
+        return {"transactions": 0, "periods": [], "categories": {}, "statuses": {}, "rows": []}
+
+    dates = np.array(columns["date"], dtype="datetime64[D]")
+    # float64 holds 12-digit amounts exactly enough that rint(x*100) is the true cent value
+    cents = np.rint(np.array(columns["amount"], dtype=np.float64) * 100).astype(np.int64)
+
+    # period of every transaction: bisect all dates at once; -1 = no period covers it
+    starts = np.array(periods.starts, dtype="datetime64[D]")
+    ends = np.array(periods.ends, dtype="datetime64[D]")
+    period = np.searchsorted(starts, dates, side="right") - 1
+    if len(starts):
+        outside = (period < 0) | (dates > ends[np.clip(period, 0, None)])
+        period[outside] = -1
+    else:
+        period[:] = -1
+
+    # strings -> small integer ids ("" stands for NULL)
+    codes, code_idx = np.unique(np.array([c or "" for c in columns["code"]], dtype=str), return_inverse=True)
+    cats, cat_idx = np.unique(np.array([c or "" for c in columns["category"]], dtype=str), return_inverse=True)
+    statuses, status_idx = np.unique(np.array([s or "" for s in columns["status"]], dtype=str), return_inverse=True)
+
+    # one integer per (period, code, category, status) group
+    sizes = (len(starts) + 1, len(codes), len(cats), len(statuses))
+    key = np.ravel_multi_index((period + 1, code_idx, cat_idx, status_idx), sizes)
+    groups, group_of = np.unique(key, return_inverse=True)
+    counts = np.bincount(group_of, minlength=len(groups))
+    # integer sums: bincount weights are float64, exact below 2**53 cents
+    totals = np.rint(np.bincount(group_of, weights=cents, minlength=len(groups))).astype(np.int64)
+
+    def period_info(p: int) -> dict:
+        if p < 0:
+            return {"period_id": None, "period_start": None, "period_end": None}
+        record = periods.records[p]
+        return {"period_id": str(record["id"]), "period_start": str(periods.starts[p]), "period_end": str(periods.ends[p])}
+
+    rows = []
+    per_period: dict[int, dict] = {}
+    by_category: dict[str, dict] = {}
+    by_status: dict[str, dict] = {}
+    p_of, c_of, k_of, s_of = np.unravel_index(groups, sizes)
+    for p1, ci, ki, si, count, total in zip(p_of, c_of, k_of, s_of, counts, totals):
+        p = int(p1) - 1
+        code, category, status = codes[ci] or None, cats[ki] or None, statuses[si] or None
+        kind = _kind(code, category, code_fields)
+        amount = int(total)
+        rows.append({
+            **period_info(p), "code": code, "category": category, "status": status,
+            "kind": kind, "count": int(count), "total": _money(amount),
+        })
+
+        summary = per_period.setdefault(p, {
+            **period_info(p),
+            "revenue": {s: 0 for s in STATUSES}, "expenses": {s: 0 for s in STATUSES}, "count": 0,
+        })
+        summary["count"] += int(count)
+        if kind != "other" and status in STATUSES:
+            summary["revenue" if kind == "revenue" else "expenses"][status] += amount
+
+        trend = by_category.setdefault(category or "", {})
+        trend[p] = trend.get(p, 0) + (amount if status in COUNTED_STATUSES else 0)
+
+        totals_for_status = by_status.setdefault(status or "", {"count": 0, "total": 0})
+        totals_for_status["count"] += int(count)
+        totals_for_status["total"] += amount
+
+    periods_out = []
+    for p in sorted(per_period):
+        summary = per_period[p]
+        revenue, expenses = summary["revenue"], summary["expenses"]
+        periods_out.append({
+            **{k: summary[k] for k in ("period_id", "period_start", "period_end", "count")},
+            "revenue_total": _money(revenue["completed"] + revenue["approved"]),
+            "expenses_total": _money(expenses["completed"] + expenses["approved"]),
+            "pending_revenue": _money(revenue["pending"]),
+            "pending_expenses": _money(expenses["pending"]),
+            "revenue": {s: _money(v) for s, v in revenue.items()},
+            "expenses": {s: _money(v) for s, v in expenses.items()},
+        })
+
+    order = sorted(per_period)
+    return {
+        "transactions": n,
+        "periods": periods_out,
+        "categories": {
+            category or "uncategorized": [
+                {**period_info(p), "total": _money(trend.get(p, 0))} for p in order
+            ]
+            for category, trend in sorted(by_category.items())
+        },
+        "statuses": {status or "unknown": {"count": v["count"], "total": _money(v["total"])} for status, v in by_status.items()},
+        "rows": rows,
+    }
+
+
+def _money(cents: int) -> str:
+    sign = "-" if cents < 0 else ""
+    cents = abs(cents)
+    return f"{sign}{cents // 100}.{cents % 100:02d}"
+
+
+async def fetch_columns(club_id: int, filters: list) -> dict[str, list]:
+    """The club's transactions as parallel column lists (no per-row dicts kept)."""
+    columns = {c: [] for c in ROLLUP_COLUMNS if c != "id"}
+    cursor = None
+    while True:
+        page = await transactions_crud.list_page(
+            FETCH_PAGE_SIZE, cursor, columns=ROLLUP_COLUMNS, order_by=("id",),
+            filters=[("eq", "club_id", club_id), *filters],
+        )
+        for row in page["items"]:
+            for c, values in columns.items():
+                values.append(row[c])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return columns
+
+
+class RollupCache:
+    """
+    Per-club rollups. A club's entries go when its transactions change
+    (invalidate) or when its period index is rebuilt: an entry is only valid
+    for the PeriodIndex object it was computed against. Holds at most
+    max_entries (club, query) results; the least recently used goes first.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # (club_id, key) -> (expires_at, periods, result), in last-used order
+        self._entries: OrderedDict[tuple[int, object], tuple] = OrderedDict()
+        self._versions: dict[int, int] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evicted = 0
+
+    def _lookup(self, club_id: int, key, periods: PeriodIndex):
+        entry = self._entries.get((club_id, key))
+        if entry is not None and entry[0] > time.monotonic() and entry[1] is periods:
+            self._entries.move_to_end((club_id, key))
+            self.hits += 1
+            return entry[2]
+        return None
+
+    async def get(self, club_id: int, key, periods: PeriodIndex, compute):
+        result = self._lookup(club_id, key, periods)
+        if result is not None:
+            return result
+
+        async with self._locks.setdefault(club_id, asyncio.Lock()):
+            result = self._lookup(club_id, key, periods)
+            if result is not None:
+                return result
+            self.misses += 1
+            version = self._versions.setdefault(club_id, 0)
+            result = await compute()
+            # a write landed while we were reading -> don't keep what may predate it
+            if version == self._versions.get(club_id, 0):
+                self._entries[club_id, key] = (time.monotonic() + self.ttl, periods, result)
+                self._entries.move_to_end((club_id, key))
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evicted += 1
+            return result
+
+    def invalidate(self, club_id: int | None = None):
+        """One club, or every club when club_id is None."""
+        if club_id is None:
+            for cid in self._versions:
+                self._versions[cid] += 1
+            self._entries.clear()
+        else:
+            self._versions[club_id] = self._versions.get(club_id, 0) + 1
+            for entry_key in [k for k in self._entries if k[0] == club_id]:
+                del self._entries[entry_key]
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "clubs": len({club_id for club_id, _ in self._entries}),
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "evicted": self.evicted,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+rollup_cache = RollupCache(ttl=ANALYTICS_CACHE_TTL, max_entries=ANALYTICS_CACHE_SIZE)
+
+
+async def club_rollup(club_id: int, code_fields: dict, date_from=None, date_to=None) -> dict:
+    """code_fields: transaction code -> financial field (decides revenue vs expense)."""
+    periods = await period_index.get(club_id)
+
+    async def compute():
+        filters = []
+        if date_from is not None:
+            filters.append(("gte", "date", date_from.isoformat()))
+        if date_to is not None:
+            filters.append(("lte", "date", date_to.isoformat()))
+        started = time.perf_counter()
+        columns = await fetch_columns(club_id, filters)
+        fetched = time.perf_counter()
+        # NumPy releases the GIL for most of this; keep it off the event loop anyway
+        result = await run_in_threadpool(rollup, columns, periods, code_fields)
+        done = time.perf_counter()
+        return {
+            "club_id": club_id,
+            "date_from": date_from.isoformat() if date_from else None,
+            "date_to": date_to.isoformat() if date_to else None,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "timings_ms": {"fetch": round((fetched - started) * 1000, 1), "rollup": round((done - fetched) * 1000, 1)},
+            **result,
+        }
+
+    return await rollup_cache.get(club_id, (date_from, date_to), periods, compute)
@@ -1,20 +1,37 @@
 # app/api.py
-from fastapi import FastAPI, HTTPException
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any
+from collections import deque
+from contextlib import aclosing
+from functools import lru_cache
 import os
+import json
 import asyncio
+import statistics
+import threading
 from dotenv import load_dotenv
-import google.generativeai as genai
 
 # ✅ RAG helpers from your ai/ package
-from ai.retrieval import retrieve_context
-from ai.embeddings import get_embeddings
-from ai.indexing import index_pdfs_to_supabase
+# (google.generativeai, langchain and torch are imported on first use, not here)
+from ai.retrieval import retrieve_docs, build_prompt, format_context
+from ai.embeddings import get_embeddings, get_query_cache, embed_query
+from ai.answer_cache import SemanticAnswerCache
+from ai.reindex_jobs import ReindexJobs, ReindexBusy
+from app.reconcile import ReconcileJobs, ReconcileBusy
 
 # Your existing routers
-from app.routers import clubs, transactions, financials
+from app.routers import clubs, transactions, financials, analytics
+from app.pool import pool_stats
+from app.cache import cache_stats
+from app.period_index import period_index
+from app.analytics import rollup_cache
+from app.chat_sessions import ChatSessionStore
+from app.warmup import Warmup
 
 # ---------------------------
 # App init & CORS
@@ -31,6 +48,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Cache", "ETag"],
 )
 
 # ---------------------------
@@ -40,11 +58,9 @@ load_dotenv()
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 if not GOOGLE_API_KEY:
-    raise RuntimeError("GOOGLE_API_KEY missing. Set it in .env")
+    print("[startup] GOOGLE_API_KEY missing; /chat answers 503 until it is set in .env")
 
-genai.configure(api_key=GOOGLE_API_KEY)
 MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
-_gemini_model = genai.GenerativeModel(MODEL_NAME)
 
 # Generation config (tunable via env)
 GEN_CFG = {
@@ -52,21 +68,49 @@ GEN_CFG = {
     "max_output_tokens": int(os.getenv("MAX_TOKENS", "1024")),
 }
 
-# simple in-memory chat sessions (good for dev)
-chats: Dict[str, Any] = {}
+# "turn": PREFACE is the model's system instruction and retrieved context rides only on the
+# current message, so history holds just questions + answers.
+# "history": the original behaviour, the whole wrapped prompt is sent and kept every turn.
+CHAT_PROMPT_MODE = os.getenv("CHAT_PROMPT_MODE", "turn").lower()
+
+# in-memory chat sessions, bounded in count, idle time and history size (tunable via env)
+_SEED_HISTORY = [
+    {"role": "user",  "parts": [{"text": "You are a helpful club assistant."}]},
+    {"role": "model", "parts": [{"text": "Hi! I'm your club assistant. Ask me about finance policies, action items, or type 'help' for options."}]},
+]
+chats = ChatSessionStore(
+    factory=lambda: _chat_model().start_chat(history=list(_SEED_HISTORY)),
+    max_sessions=int(os.getenv("CHAT_MAX_SESSIONS", "1000")),
+    idle_ttl=float(os.getenv("CHAT_SESSION_TTL", "1800")),
+    max_turns=int(os.getenv("CHAT_HISTORY_TURNS", "10")),
+    max_tokens=int(os.getenv("CHAT_HISTORY_TOKENS", "8000")),
+    seed=len(_SEED_HISTORY),
+)
+
+# semantic answer cache: paraphrased questions reuse a stored answer (tunable via env)
+answer_cache = SemanticAnswerCache(
+    max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+    max_distance=float(os.getenv("ANSWER_CACHE_MAX_DISTANCE", "0.05")),
+)
+
+# /chat/stream: max seconds to wait for the next Gemini chunk, and recent time-to-first-token samples
+STREAM_IDLE_TIMEOUT = float(os.getenv("STREAM_IDLE_TIMEOUT", "20"))
+_ttft_ms: deque = deque(maxlen=500)
 
 # ---------------------------
-# Startup warmups
+# Startup warmups (background; /ready flips when done)
 # ---------------------------
+warmup = Warmup()
+
 @app.on_event("startup")
 def _startup():
-    # Warm the embedding model so first request isn’t slow
-    _ = get_embeddings()
-    # Optional: warm the retrieval path once (non-fatal)
-    try:
-        retrieve_context("health check", k=1)
-    except Exception as e:
-        print("[startup] retrieval warmup failed:", e)
+    warmup.start([
+        # load the embedding model so the first request isn't slow
+        ("model_load", get_embeddings),
+        # first inference + one retrieval round trip (RPC connection / local index pages)
+        ("warmup", lambda: retrieve_docs("health check", k=1)),
+    ])
 
 # ---------------------------
 # Routers
@@ -74,6 +118,7 @@ def _startup():
 app.include_router(clubs.router)
 app.include_router(financials.router)
 app.include_router(transactions.router)
+app.include_router(analytics.router)
 
 # ---------------------------
 # Health/Version
@@ -84,7 +129,31 @@ async def root():
 
 @app.get("/health", tags=["health"])
 async def health():
-    return {"status": "ok", "model": MODEL_NAME}
+    return {
+        "status": "ok",
+        "model": MODEL_NAME,
+        "supabase_pool": pool_stats(),
+        "crud_cache": cache_stats(),
+        "period_index": period_index.stats(),
+        "analytics_cache": rollup_cache.stats(),
+        "embed_cache": get_query_cache().stats(),
+        "answer_cache": answer_cache.stats(),
+        "sessions": chats.stats(),
+        "stream": _ttft_stats(),
+    }
+
+def _ttft_stats() -> dict:
+    samples = list(_ttft_ms)
+    if len(samples) < 2:
+        return {"samples": len(samples), "ttft_p50_ms": samples[0] if samples else None, "ttft_p95_ms": None}
+    q = statistics.quantiles(samples, n=20, method="inclusive")
+    return {"samples": len(samples), "ttft_p50_ms": round(q[9], 1), "ttft_p95_ms": round(q[18], 1)}
+
+@app.get("/ready", tags=["health"])
+async def ready():
+    """Readiness: 200 once the embedding model and the retrieval backend are warm, else 503."""
+    report = {**warmup.report(), "chat_configured": bool(GOOGLE_API_KEY)}
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
 
 @app.get("/version", tags=["health"])
 async def version():
@@ -94,16 +163,85 @@ async def version():
     }
 
 # ---------------------------
-# Admin: reindex PDFs (kept simple)
+# Admin: reindex PDFs (background job)
 # ---------------------------
-@app.post("/admin/reindex", tags=["admin"])
-async def reindex():
+def _after_reindex(report: dict):
+    if report["added"] or report["updated"] or report["removed"]:
+        # corpus changed -> cached answers may cite stale chunks
+        answer_cache.clear()
+
+def _run_reindex(**kwargs) -> dict:
+    from ai.indexing import index_pdfs_to_supabase   # PDF loaders + vector store, only when reindexing
+    return index_pdfs_to_supabase(**kwargs)
+
+reindex_jobs = ReindexJobs(_run_reindex, on_success=_after_reindex)
+
+@app.post("/admin/reindex", tags=["admin"], status_code=202)
+async def reindex(rebuild: bool = False):
+    """Start a reindex in the background; poll GET /admin/reindex/{job_id}."""
     try:
-        count = index_pdfs_to_supabase()
-        return {"indexed_chunks": count}
-    except Exception as e:
-        print(f"[reindex] error: {e}")
-        raise HTTPException(status_code=500, detail="Failed to reindex PDFs.")
+        job = reindex_jobs.start(rebuild=rebuild or None)
+    except ReindexBusy as e:
+        raise HTTPException(status_code=409, detail={"message": "A reindex is already running.", "job_id": e.job.id})
+    return {"job_id": job.id, "status": job.status}
+
+@app.get("/admin/reindex", tags=["admin"])
+async def list_reindex_jobs():
+    return [job.to_dict() for job in reindex_jobs.list()]
+
+@app.get("/admin/reindex/{job_id}", tags=["admin"])
+async def reindex_status(job_id: str):
+    job = reindex_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Reindex job not found")
+    return job.to_dict()
+
+@app.delete("/admin/reindex/{job_id}", tags=["admin"])
+async def cancel_reindex(job_id: str):
+    """Ask a queued/running job to stop at its next progress step."""
+    job = reindex_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Reindex job not found")
+    return job.to_dict()
+
+
+# ---------------------------
+# Admin: reconcile financial summaries with the transactions ledger (background job)
+# ---------------------------
+reconcile_jobs = ReconcileJobs()
+
+@app.post("/admin/reconcile", tags=["admin"], status_code=202)
+async def reconcile_financials(club_id: int | None = None, dry_run: bool = True, include_statements: bool = False):
+    """
+    Start recomputing summary totals from transactions (one club, or every
+    club) in the background; poll GET /admin/reconcile/{job_id} for the drift
+    report. With dry_run=false the corrections are written too; summaries
+    loaded from statements are skipped unless include_statements=true.
+    """
+    try:
+        job = reconcile_jobs.start(club_id, dry_run=dry_run, include_statements=include_statements)
+    except ReconcileBusy as e:
+        raise HTTPException(status_code=409, detail={"message": "A reconcile is already running.", "job_id": e.job.id})
+    return {"job_id": job.id, "status": job.status}
+
+@app.get("/admin/reconcile", tags=["admin"])
+async def list_reconcile_jobs():
+    return [job.to_dict() for job in reconcile_jobs.list()]
+
+@app.get("/admin/reconcile/{job_id}", tags=["admin"])
+async def reconcile_status(job_id: str):
+    job = reconcile_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Reconcile job not found")
+    return job.to_dict()
+
+@app.delete("/admin/reconcile/{job_id}", tags=["admin"])
+async def cancel_reconcile(job_id: str):
+    """Stop a running job; clubs already reconciled stay reconciled."""
+    job = reconcile_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Reconcile job not found")
+    return job.to_dict()
 
 # ---------------------------
 # Chat
@@ -168,53 +306,120 @@ Follow-ups:
 
 
 
+@lru_cache(maxsize=1)
+def _chat_model():
+    import google.generativeai as genai
+
+    genai.configure(api_key=GOOGLE_API_KEY)
+    if CHAT_PROMPT_MODE == "turn":
+        # PREFACE is sent once per request as the system instruction instead of inside every message
+        return genai.GenerativeModel(MODEL_NAME, system_instruction=PREFACE)
+    return genai.GenerativeModel(MODEL_NAME)
+
+def _require_chat():
+    if not GOOGLE_API_KEY:
+        raise HTTPException(status_code=503, detail="Chat is not configured (GOOGLE_API_KEY missing).")
+
+def _wrap_prompt(base_prompt: str) -> str:
+    # Wrap with preface and delimiters so the model knows when to use/ignore context.
+    # `base_prompt` already contains "Context: ... Question: ...", so we just encapsulate it.
+    return (
+        PREFACE
+        + "\n\n[KNOWLEDGE CONTEXT START]\n"
+        + base_prompt
+        + "\n[KNOWLEDGE CONTEXT END]\n"
+    )
+
+def _turn_prompt(user_message: str, docs, mode: str | None = None) -> str:
+    """The message sent to Gemini for this turn."""
+    if (mode or CHAT_PROMPT_MODE) == "history":
+        return _wrap_prompt(build_prompt(user_message, docs))
+    return (
+        "[KNOWLEDGE CONTEXT START]\n"
+        + format_context(docs)
+        + "\n[KNOWLEDGE CONTEXT END]\n\nQuestion:\n"
+        + user_message
+    )
+
+def _finish_turn(session, user_message: str, mode: str | None = None):
+    """After a reply: keep only the bare question in history, then apply the history budget."""
+    if (mode or CHAT_PROMPT_MODE) != "history":
+        history = list(session.history)
+        last_user = history[-2] if len(history) >= 2 else None
+        role = last_user.get("role") if isinstance(last_user, dict) else getattr(last_user, "role", None)
+        if role == "user":
+            history[-2] = {"role": "user", "parts": [{"text": user_message}]}
+            session.history = history
+    chats.trim(session)
+
+def _get_session(session_id: str):
+    return chats.get(session_id)
+
+def _cacheable(session) -> bool:
+    """
+    The answer cache is keyed on the question alone, so it only serves and
+    stores first turns: a later answer may lean on this session's history.
+    """
+    return len(session.history) <= chats.seed
+
+def _record_cached_turn(session, user_message: str, answer: str):
+    """A cache hit is still a turn of this conversation."""
+    session.history = list(session.history) + [
+        {"role": "user", "parts": [{"text": user_message}]},
+        {"role": "model", "parts": [{"text": answer}]},
+    ]
+    chats.trim(session)
+
+def _sources(docs) -> list[dict]:
+    # concise citations
+    return [
+        {k: v for k, v in d.metadata.items() if k in ("source", "page", "title")}
+        for d in docs
+    ]
+
+
 @app.post("/chat", tags=["chat"])
-async def chat(payload: ChatInput):
+async def chat(payload: ChatInput, response: Response):
     session_id = payload.session_id
     user_message = (payload.user_message or "").strip()
     if not user_message:
         raise HTTPException(status_code=400, detail="user_message is empty")
+    _require_chat()
 
     try:
-        # 1) Retrieve RAG context + build prompt (with timeout)
-        base_prompt, docs = await asyncio.wait_for(
-            asyncio.to_thread(retrieve_context, user_message, 5),
+        # 0) Get/create a chat session
+        session = _get_session(session_id)
+        cacheable = _cacheable(session)
+
+        # 1) Semantic answer cache: a close paraphrase of an answered first question skips RAG + Gemini
+        query_emb = await asyncio.wait_for(asyncio.to_thread(embed_query, user_message), timeout=8)
+        cached = answer_cache.lookup(query_emb) if cacheable else None
+        if cached is not None:
+            _record_cached_turn(session, user_message, cached["response"])
+            response.headers["X-Cache"] = "HIT"
+            return {"response": cached["response"], "sources": cached["sources"]}
+        response.headers["X-Cache"] = "MISS"
+
+        # 2) Retrieve RAG context (with timeout)
+        docs = await asyncio.wait_for(
+            asyncio.to_thread(retrieve_docs, user_message, 5),
             timeout=8,
         )
 
-        # 2) Wrap with preface and delimiters so the model knows when to use/ignore context
-        #    `base_prompt` already contains "Context: ... Question: ...", so we just encapsulate it.
-        wrapped_prompt = (
-            PREFACE
-            + "\n\n[KNOWLEDGE CONTEXT START]\n"
-            + base_prompt
-            + "\n[KNOWLEDGE CONTEXT END]\n"
-        )
-
-        # 3) Get/create a chat session
-        if session_id not in chats:
-            chats[session_id] = _gemini_model.start_chat(
-                history=[
-                    {"role": "user",  "parts": [{"text": "You are a helpful club assistant."}]},
-                    {"role": "model", "parts": [{"text": "Hi! I'm your club assistant. Ask me about finance policies, action items, or type 'help' for options."}]},
-                ]
-            )
-        session = chats[session_id]
-
-        # 4) Send the wrapped prompt to Gemini (with timeout)
+        # 3) Send this turn's prompt to Gemini (with timeout)
         resp = await asyncio.wait_for(
-            asyncio.to_thread(session.send_message, wrapped_prompt, generation_config=GEN_CFG),
+            asyncio.to_thread(session.send_message, _turn_prompt(user_message, docs), generation_config=GEN_CFG),
             timeout=20,
         )
+        _finish_turn(session, user_message)
 
         # Return answer + concise citations
-        return {
-            "response": getattr(resp, "text", str(resp)),
-            "sources": [
-                {k: v for k, v in d.metadata.items() if k in ("source", "page", "title")}
-                for d in docs
-            ],
-        }
+        answer = getattr(resp, "text", str(resp))
+        sources = _sources(docs)
+        # only answers grounded in retrieved context, given without prior history
+        if cacheable and docs:
+            answer_cache.store(query_emb, answer, sources)
+        return {"response": answer, "sources": sources}
 
     except asyncio.TimeoutError:
         raise HTTPException(status_code=504, detail="Request timed out. Please try again.")
@@ -223,3 +428,147 @@ async def chat(payload: ChatInput):
     except Exception as e:
         print(f"[chat] session={session_id} error:", repr(e))
         raise HTTPException(status_code=500, detail="Error generating response.")
+
+
+# ---------------------------
+# Chat (streaming, Server-Sent Events)
+# ---------------------------
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _iterate_in_thread(make_iter):
+    """
+    Drive a blocking iterator (Gemini's stream=True response) in a worker thread
+    and yield its items on the event loop as they arrive. When the consumer stops
+    early (idle timeout, client disconnect, error) the worker stops reading and
+    closes the iterator at the next item instead of draining the whole stream.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+    stop = threading.Event()
+
+    def worker():
+        items = None
+        try:
+            items = make_iter()
+            for item in items:
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            if stop.is_set() and hasattr(items, "close"):
+                items.close()   # a generator: runs its cleanup, dropping the upstream stream
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    task = loop.run_in_executor(None, worker)
+    try:
+        while True:
+            item = await asyncio.wait_for(queue.get(), timeout=STREAM_IDLE_TIMEOUT)
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # don't leave the worker's future unobserved
+        task.add_done_callback(lambda f: f.exception())
+
+
+@app.post("/chat/stream", tags=["chat"])
+async def chat_stream(payload: ChatInput):
+    """
+    Same turn as /chat, streamed as SSE:
+      event: sources  {"sources": [...], "cached": bool}   right after retrieval
+      event: delta    {"text": "..."}                      one per Gemini chunk
+      event: done     {"response": full text, "ttft_ms": ..., "total_ms": ...}
+      event: error    {"detail": "..."}                    instead of done, on failure
+    """
+    session_id = payload.session_id
+    user_message = (payload.user_message or "").strip()
+    if not user_message:
+        raise HTTPException(status_code=400, detail="user_message is empty")
+    _require_chat()
+
+    started = time.perf_counter()
+
+    async def events():
+        try:
+            session = _get_session(session_id)
+            cacheable = _cacheable(session)
+            query_emb = await asyncio.wait_for(asyncio.to_thread(embed_query, user_message), timeout=8)
+            cached = answer_cache.lookup(query_emb) if cacheable else None
+            if cached is not None:
+                _record_cached_turn(session, user_message, cached["response"])
+                yield _sse("sources", {"sources": cached["sources"], "cached": True})
+                yield _sse("delta", {"text": cached["response"]})
+                ms = round((time.perf_counter() - started) * 1000, 1)
+                _ttft_ms.append(ms)
+                yield _sse("done", {"response": cached["response"], "ttft_ms": ms, "total_ms": ms})
+                return
+
+            docs = await asyncio.wait_for(
+                asyncio.to_thread(retrieve_docs, user_message, 5),
+                timeout=8,
+            )
+            sources = _sources(docs)
+            yield _sse("sources", {"sources": sources, "cached": False})
+
+            prompt = _turn_prompt(user_message, docs)
+            # what the history goes back to if the turn doesn't finish
+            before, abandoned = list(session.history), threading.Event()
+
+            def gemini_chunks():
+                try:
+                    for chunk in session.send_message(prompt, generation_config=GEN_CFG, stream=True):
+                        text = getattr(chunk, "text", "")
+                        if text:
+                            yield text
+                finally:
+                    # a send_message still in flight when the consumer left re-adds the turn
+                    if abandoned.is_set():
+                        session.history = before
+
+            parts, ttft_ms, finished = [], None, False
+            try:
+                async with aclosing(_iterate_in_thread(gemini_chunks)) as chunks:
+                    async for text in chunks:
+                        if ttft_ms is None:
+                            ttft_ms = round((time.perf_counter() - started) * 1000, 1)
+                            _ttft_ms.append(ttft_ms)
+                        parts.append(text)
+                        yield _sse("delta", {"text": text})
+                _finish_turn(session, user_message)
+                finished = True
+            finally:
+                if not finished:
+                    # disconnect, cancellation, idle timeout or a broken stream: drop
+                    # the turn, or the RAG prompt would stay in the session's history
+                    abandoned.set()
+                    session.history = before
+
+            answer = "".join(parts)
+            if cacheable and docs:
+                answer_cache.store(query_emb, answer, sources)
+            yield _sse("done", {
+                "response": answer,
+                "ttft_ms": ttft_ms,
+                "total_ms": round((time.perf_counter() - started) * 1000, 1),
+            })
+
+        except asyncio.TimeoutError:
+            yield _sse("error", {"detail": "Request timed out. Please try again."})
+        except Exception as e:
+            print(f"[chat/stream] session={session_id} error:", repr(e))
+            yield _sse("error", {"detail": "Error generating response."})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+warmup.record("import", time.perf_counter() - _IMPORT_STARTED)
@@ -0,0 +1,171 @@
+"""
+Read-through cache for CRUD reads, plus ETag'd JSON responses built on it.
+
+Each cached table has one TableCache. AsyncCRUDBase routes its reads through
+it (see app/crud/crud_base.py) and drops the whole table's entries on any
+write it makes, so a create/update/delete is visible to the next read in this
+process. Writes from other processes show up after CRUD_CACHE_TTL seconds.
+Concurrent misses for the same key share one upstream call.
+
+etag_json() serializes a GET response once per table version and answers
+If-None-Match with 304, so a dashboard re-mount costs neither a Supabase
+round trip nor a pydantic pass.
+
+Tunable via env:
+    CRUD_CACHE_TTL    seconds a cached read stays valid (default 30, 0 disables)
+    CRUD_CACHE_SIZE   max cached reads/responses per table (default 1024)
+"""
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+CRUD_CACHE_TTL = float(os.getenv("CRUD_CACHE_TTL", "30"))
+CRUD_CACHE_SIZE = int(os.getenv("CRUD_CACHE_SIZE", "1024"))
+
+
+class TableCache:
+    def __init__(self, table: str, ttl: float = CRUD_CACHE_TTL, max_entries: int = CRUD_CACHE_SIZE):
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version = 0                      # bumped by every write to the table
+        self._entries: OrderedDict = OrderedDict()   # key -> (expires_at, value)
+        self._inflight: dict = {}                    # key -> task loading it
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    async def read(self, key, load):
+        """
+        Cached value for key, else `await load()`. Values are shared between
+        callers: treat them as read-only.
+        """
+        if self.ttl <= 0:
+            self.misses += 1
+            return await load()
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.misses += 1
+        version = self.version
+        task = asyncio.ensure_future(load())
+        self._inflight[key] = task
+        try:
+            value = await asyncio.shield(task)
+        finally:
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+
+        # a write landed while we were reading -> the value may predate it
+        if version == self.version:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self):
+        self.version += 1
+        self._entries.clear()
+        self._inflight.clear()
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        saved = self.hits + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "saved_upstream_calls": saved,
+            "hit_ratio": round(saved / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+_TABLES: dict[str, TableCache] = {}
+
+
+def table_cache(table: str) -> TableCache:
+    if table not in _TABLES:
+        _TABLES[table] = TableCache(table)
+    return _TABLES[table]
+
+
+# ---------------------------
+# ETag'd responses
+# ---------------------------
+_responses: OrderedDict = OrderedDict()   # url -> (versions, expires_at, body, etag)
+_response_stats = {"served": 0, "body_hits": 0, "not_modified": 0}
+
+
+@lru_cache(maxsize=None)
+def _adapter(response_model) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    return header.strip() == "*" or etag in (t.strip() for t in header.split(","))
+
+
+async def etag_json(request: Request, response_model, tables: tuple[str, ...], produce) -> Response:
+    """
+    JSON response for a GET whose payload depends only on `tables`.
+    `produce()` is awaited only when this URL has no body for the current
+    table versions; HTTPExceptions it raises pass through uncached.
+    The ETag is a hash of the exact body bytes (strong validator).
+    """
+    key = str(request.url)
+    versions = tuple(table_cache(t).version for t in tables)
+    hit = _responses.get(key)
+
+    if hit is not None and hit[0] == versions and hit[1] > time.monotonic():
+        _responses.move_to_end(key)
+        body, etag = hit[2], hit[3]
+        _response_stats["body_hits"] += 1
+    else:
+        payload = await produce()
+        adapter = _adapter(response_model)
+        body = adapter.dump_json(adapter.validate_python(payload))
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        if CRUD_CACHE_TTL > 0 and versions == tuple(table_cache(t).version for t in tables):
+            _responses[key] = (versions, time.monotonic() + CRUD_CACHE_TTL, body, etag)
+            _responses.move_to_end(key)
+            while len(_responses) > CRUD_CACHE_SIZE:
+                _responses.popitem(last=False)
+
+    _response_stats["served"] += 1
+    # no-cache: browsers keep the body but revalidate with If-None-Match every time
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        _response_stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cache_stats() -> dict:
+    return {
+        "ttl": CRUD_CACHE_TTL,
+        "tables": {name: c.stats() for name, c in _TABLES.items()},
+        "responses": {**_response_stats, "entries": len(_responses)},
+    }
@@ -0,0 +1,117 @@
+"""
+Bounded store for Gemini ChatSessions, keyed by the frontend's session_id.
+
+- at most `max_sessions` live sessions; the least recently used one goes first
+- sessions idle longer than `idle_ttl` seconds are dropped
+- after every turn the history is trimmed to the last `max_turns` exchanges
+  and to roughly `max_tokens` tokens, keeping the `seed` messages it started with
+
+Token counts are estimated from text length (~4 chars/token) rather than with
+count_tokens(), which would be a network call per turn.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+CHARS_PER_TOKEN = 4
+
+
+def _text_len(message) -> int:
+    parts = message.get("parts", []) if isinstance(message, dict) else getattr(message, "parts", [])
+    return sum(len(p.get("text", "") if isinstance(p, dict) else getattr(p, "text", "") or "") for p in parts)
+
+
+def estimate_tokens(messages) -> int:
+    return sum(_text_len(m) for m in messages) // CHARS_PER_TOKEN
+
+
+class ChatSessionStore:
+    def __init__(self, factory, max_sessions: int, idle_ttl: float, max_turns: int, max_tokens: int, seed: int = 0):
+        """
+        factory() -> new ChatSession. `seed` is how many leading history messages
+        the factory puts there (they are never trimmed).
+        """
+        self._factory = factory
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.seed = seed
+        self._sessions: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.created = 0
+        self.evicted_idle = 0
+        self.evicted_capacity = 0
+        self.trimmed_messages = 0
+
+    def get(self, session_id: str):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                session = self._factory()
+                self.created += 1
+            else:
+                session = entry[1]
+            self._sessions[session_id] = (now, session)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted_capacity += 1
+            return session
+
+    def _expire(self, now: float):
+        # OrderedDict is in last-used order, so expired sessions are at the front
+        while self._sessions and self.idle_ttl:
+            sid, (used, _) = next(iter(self._sessions.items()))
+            if now - used <= self.idle_ttl:
+                break
+            del self._sessions[sid]
+            self.evicted_idle += 1
+
+    def trim(self, session):
+        """Apply the history budget; call after a turn has completed."""
+        history = list(session.history)
+        seed, turns = history[:self.seed], history[self.seed:]
+        drop = 0
+        # whole exchanges (user + model) only, oldest first
+        if self.max_turns and len(turns) > 2 * self.max_turns:
+            drop = len(turns) - 2 * self.max_turns
+        budget = self.max_tokens * CHARS_PER_TOKEN if self.max_tokens else None
+        if budget is not None:
+            size = sum(_text_len(m) for m in turns[drop:])
+            # always keep the latest exchange, even if it alone is over budget
+            while size > budget and len(turns) - drop > 2:
+                size -= _text_len(turns[drop]) + _text_len(turns[drop + 1])
+                drop += 2
+        if drop:
+            session.history = seed + turns[drop:]
+            with self._lock:
+                self.trimmed_messages += drop
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._expire(time.monotonic())
+            sessions = [s for _, s in self._sessions.values()]
+            created, idle, capacity, trimmed = self.created, self.evicted_idle, self.evicted_capacity, self.trimmed_messages
+        sizes = [len(s.history) for s in sessions]
+        tokens = [estimate_tokens(s.history) for s in sessions]
+        return {
+            "live_sessions": len(sessions),
+            "max_sessions": self.max_sessions,
+            "created": created,
+            "evicted_idle": idle,
+            "evicted_capacity": capacity,
+            "trimmed_messages": trimmed,
+            "avg_history_messages": round(sum(sizes) / len(sizes), 1) if sizes else 0.0,
+            "avg_history_tokens": round(sum(tokens) / len(tokens), 1) if tokens else 0.0,
+        }
@@ -1,4 +1,6 @@
-from app.crud.crud_base import CRUDBase
-from app.db import supabase
+from app.crud.crud_base import CRUDBase, AsyncCRUDBase
+from app.db import supabase, async_supabase
+from app.cache import table_cache
 
-clubs_crud = CRUDBase("clubs", supabase)
\ No newline at end of file
+clubs_crud = CRUDBase("clubs", supabase)
+async_clubs_crud = AsyncCRUDBase("clubs", async_supabase, cache=table_cache("clubs"))
@@ -1,4 +1,6 @@
 # app/crud/crud_base.py
+import base64
+import json
 from datetime import date, datetime
 from decimal import Decimal
 
@@ -19,8 +21,73 @@ GENERATED_COLUMNS = {
 }
 
 
+# ---------------------------
+# Keyset pagination
+# ---------------------------
+# A page is `limit` rows in `order_by` order that come strictly after the
+# cursor row, so page N costs the same as page 1 (no OFFSET scan). The cursor
+# is the last row's order_by values, base64'd so clients treat it as opaque.
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps([str(v) for v in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list[str]:
+    """Raises ValueError for anything that isn't a cursor issued for this ordering."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("malformed cursor")
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(v, str) for v in values):
+        raise ValueError("malformed cursor")
+    return values
+
+def _quote(value: str) -> str:
+    # PostgREST logic trees split on , ( ) -> quote every value
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def _keyset_filter(order_by: tuple, values: list[str], descending: bool) -> str:
+    """(a, b) after (x, y)  ->  a > x  OR  (a = x AND b > y), as a PostgREST or= tree."""
+    op = "lt" if descending else "gt"
+    terms = []
+    for i, column in enumerate(order_by):
+        eqs = [f"{c}.eq.{_quote(v)}" for c, v in zip(order_by[:i], values[:i])]
+        term = f"{column}.{op}.{_quote(values[i])}"
+        terms.append(f"and({','.join(eqs + [term])})" if eqs else term)
+    return ",".join(terms)
+
+def _page_query(table, limit: int, cursor, columns, order_by: tuple, descending: bool, filters):
+    """
+    filters: [(op, column, value)] with op any PostgREST builder filter
+    ("eq", "gte", "lte", "in_", ...).
+    Returns (query, extra) where extra are order columns added to the
+    projection only to build the next cursor.
+    """
+    columns = list(columns) if columns else ["*"]
+    extra = [c for c in order_by if "*" not in columns and c not in columns]
+    query = table.select(",".join(columns + extra))
+    for op, column, value in filters or ():
+        query = getattr(query, op)(column, value)
+    if cursor:
+        query = query.or_(_keyset_filter(order_by, decode_cursor(cursor, len(order_by)), descending))
+    for column in order_by:
+        query = query.order(column, desc=descending)
+    # one extra row tells us whether another page exists
+    return query.limit(limit + 1), extra
+
+def _page_result(rows: list[dict], limit: int, order_by: tuple, extra: list) -> dict:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][c] for c in order_by])
+    if extra:
+        rows = [{k: v for k, v in r.items() if k not in extra} for r in rows]
+    return {"items": rows, "next_cursor": next_cursor}
+
+
 class CRUDBase:
     def __init__(self, table_name: str, client):
+        self.client = client
         self.table = client.table(table_name)
 
     # synchronous methods (no async / await) -> will keep async endpoints however
@@ -41,6 +108,20 @@ class CRUDBase:
         resp = self.table.select("*").eq(column, value).execute()
         return resp.data
 
+    # all rows whose column is any of values (one round trip instead of one per value)
+    def list_in(self, column: str, values):
+        resp = self.table.select("*").in_(column, list(values)).execute()
+        return resp.data
+
+    def list_page(self, limit: int, cursor: str | None = None, columns=None,
+                  order_by: tuple = ("id",), descending: bool = False, filters=None):
+        """
+        One keyset page: {"items": [...], "next_cursor": str | None}.
+        order_by must end in a unique column (e.g. id) so the cursor is exact.
+        """
+        query, extra = _page_query(self.table, limit, cursor, columns, order_by, descending, filters)
+        return _page_result(query.execute().data or [], limit, order_by, extra)
+
     # maybe add potential route for retrieving the latest summary for a club
 
     def create(self, data: dict):
@@ -51,6 +132,12 @@ class CRUDBase:
         resp = self.table.insert(json_safe_data).execute()
         return resp.data[0] if resp.data else None
 
+    # multi-row insert; returns the inserted rows in input order
+    def create_many(self, rows: list[dict]):
+        json_safe_rows = [make_json_safe({k: v for k, v in r.items() if k not in GENERATED_COLUMNS}) for r in rows]
+        resp = self.table.insert(json_safe_rows).execute()
+        return resp.data or []
+
     def update(self, id: int, data: dict):
         clean = {k: v for k, v in data.items() if k not in GENERATED_COLUMNS}
 
@@ -60,4 +147,89 @@ class CRUDBase:
 
     def delete(self, id: int):
         resp = self.table.delete().eq("id", id).execute()
-        return resp.data
\ No newline at end of file
+        return resp.data
+
+class AsyncCRUDBase:
+    """
+    Same surface as CRUDBase, but awaits an async Supabase client so the
+    routers don't have to park a thread per request in run_in_threadpool.
+
+    With a cache (app/cache.py) reads are served read-through and every write
+    made here drops the table's cached reads.
+    """
+    def __init__(self, table_name: str, client, cache=None):
+        self.client = client
+        self.table = client.table(table_name)
+        self.cache = cache
+
+    async def _read(self, key, query):
+        if self.cache is None:
+            return (await query.execute()).data
+
+        async def load():
+            return (await query.execute()).data
+        return await self.cache.read(key, load)
+
+    def _invalidate(self):
+        if self.cache is not None:
+            self.cache.invalidate()
+
+    async def get_all(self):
+        return await self._read(("get_all",), self.table.select("*"))
+
+    async def get(self, id: int):
+        return await self._read(("get", id), self.table.select("*").eq("id", id).single())
+
+    async def get_by(self, column: str, value):
+        return await self._read(("get_by", column, value), self.table.select("*").eq(column, value).single())
+
+    async def list_by(self, column: str, value, cached: bool = True):
+        query = self.table.select("*").eq(column, value)
+        if not cached:
+            return (await query.execute()).data
+        return await self._read(("list_by", column, value), query)
+
+    async def list_in(self, column: str, values):
+        values = list(values)
+        return await self._read(("list_in", column, tuple(values)), self.table.select("*").in_(column, values))
+
+    async def list_page(self, limit: int, cursor: str | None = None, columns=None,
+                        order_by: tuple = ("id",), descending: bool = False, filters=None):
+        query, extra = _page_query(self.table, limit, cursor, columns, order_by, descending, filters)
+        key = ("list_page", limit, cursor, repr(columns), order_by, descending, repr(filters))
+        return _page_result(await self._read(key, query) or [], limit, order_by, extra)
+
+    async def create(self, data: dict):
+        clean = {k: v for k, v in data.items() if k not in GENERATED_COLUMNS}
+
+        json_safe_data = make_json_safe(clean)
+        try:
+            resp = await self.table.insert(json_safe_data).execute()
+        finally:
+            self._invalidate()
+        return resp.data[0] if resp.data else None
+
+    async def create_many(self, rows: list[dict]):
+        json_safe_rows = [make_json_safe({k: v for k, v in r.items() if k not in GENERATED_COLUMNS}) for r in rows]
+        try:
+            resp = await self.table.insert(json_safe_rows).execute()
+        finally:
+            self._invalidate()
+        return resp.data or []
+
+    async def update(self, id: int, data: dict):
+        clean = {k: v for k, v in data.items() if k not in GENERATED_COLUMNS}
+
+        json_safe_data = make_json_safe(clean)
+        try:
+            resp = await self.table.update(json_safe_data).eq("id", id).execute()
+        finally:
+            self._invalidate()
+        return resp.data
+
+    async def delete(self, id: int):
+        try:
+            resp = await self.table.delete().eq("id", id).execute()
+        finally:
+            self._invalidate()
+        return resp.data
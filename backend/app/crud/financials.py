@@ -1,5 +1,29 @@
-from app.crud.crud_base import CRUDBase, make_json_safe, GENERATED_COLUMNS
-from app.db import supabase
+from datetime import date
+from decimal import Decimal
+
+from app.crud.crud_base import CRUDBase, AsyncCRUDBase, make_json_safe, GENERATED_COLUMNS
+from app.db import supabase, async_supabase
+from app.cache import table_cache
+
+
+# Atomic increments run as database functions (backend/sql/financial_summaries.sql):
+# the read and the write happen in one UPDATE, so parallel transactions can't lose updates.
+
+def _delta_params(club_id: int, day: date, field: str, amount: Decimal) -> dict:
+    return make_json_safe({"p_club_id": club_id, "p_date": day, "p_field": field, "p_amount": Decimal(str(amount))})
+
+def _deltas_param(deltas: list[dict]) -> dict:
+    # same lock order for every caller -> concurrent batches can't deadlock
+    ordered = sorted(deltas, key=lambda d: (str(d["id"]), d["field"]))
+    return {"p_deltas": [make_json_safe({**d, "id": str(d["id"]), "amount": Decimal(str(d["amount"]))}) for d in ordered]}
+
+def _rows_param(rows: list[dict]) -> dict:
+    return {"p_rows": [make_json_safe({k: v for k, v in r.items() if k not in GENERATED_COLUMNS}) for r in rows]}
+
+def _reconcile_params(club_id: int, code_fields: dict, counted, apply: bool, include_statements: bool) -> dict:
+    return {"p_club_id": club_id, "p_code_fields": code_fields, "p_counted": list(counted),
+            "p_apply": apply, "p_include_statements": include_statements}
+
 
 class FinancialsCRUD(CRUDBase):
     """
@@ -20,5 +44,92 @@ class FinancialsCRUD(CRUDBase):
         resp = self.table.update(json_safe_data).eq("id", uuid_str).execute()
         return resp.data[0] if resp.data else None
 
+    def apply_transaction_delta(self, club_id: int, day: date, field: str, amount: Decimal):
+        """
+        Add `amount` to `field` of the club's summary whose period contains `day`,
+        in one round trip. Returns the updated summary, or None if no period matches.
+        """
+        resp = self.client.rpc("apply_transaction_delta", _delta_params(club_id, day, field, amount)).execute()
+        return resp.data[0] if resp.data else None
+
+    def apply_deltas(self, deltas: list[dict]):
+        """
+        [{"id", "field", "amount"}] -> updated rows; all applied in one database
+        transaction, or none.
+        """
+        resp = self.client.rpc("apply_financial_deltas", _deltas_param(deltas)).execute()
+        return resp.data or []
+
+    def upsert_many(self, rows: list[dict]):
+        """
+        Insert or update summaries keyed on (club_id, period_start), one
+        call for the whole list. -> [{"id", "club_id", "period_start",
+        "action": inserted | updated | unchanged | conflict, "error"}]
+        """
+        resp = self.client.rpc("upsert_financial_summaries", _rows_param(rows)).execute()
+        return resp.data or []
+
+    def reconcile_club(self, club_id: int, code_fields: dict, counted, apply: bool = False, include_statements: bool = False):
+        """
+        Recompute the club's totals from its transactions (and write them if
+        `apply`) in one database transaction. -> {"transactions", "summaries",
+        "skipped_statements", "unassigned", "diffs": [...]}
+        """
+        params = _reconcile_params(club_id, code_fields, counted, apply, include_statements)
+        return self.client.rpc("reconcile_club_financials", params).execute().data
+
+
+class AsyncFinancialsCRUD(AsyncCRUDBase):
+    """
+    Async counterpart of FinancialsCRUD.
+    """
+
+    async def update_by_uuid(self, uuid_str: str, data: dict):
+        """
+        Update a financial record by UUID string.
+        """
+        clean = {k: v for k, v in data.items() if k not in GENERATED_COLUMNS}
+
+        json_safe_data = make_json_safe(clean)
+
+        try:
+            resp = await self.table.update(json_safe_data).eq("id", uuid_str).execute()
+        finally:
+            self._invalidate()
+        return resp.data[0] if resp.data else None
+
+    async def apply_transaction_delta(self, club_id: int, day: date, field: str, amount: Decimal):
+        try:
+            resp = await self.client.rpc("apply_transaction_delta", _delta_params(club_id, day, field, amount)).execute()
+        finally:
+            self._invalidate()
+        return resp.data[0] if resp.data else None
+
+    async def apply_deltas(self, deltas: list[dict]):
+        try:
+            resp = await self.client.rpc("apply_financial_deltas", _deltas_param(deltas)).execute()
+        finally:
+            self._invalidate()
+        return resp.data or []
+
+    async def upsert_many(self, rows: list[dict]):
+        try:
+            resp = await self.client.rpc("upsert_financial_summaries", _rows_param(rows)).execute()
+        finally:
+            self._invalidate()
+        return resp.data or []
+
+    async def reconcile_club(self, club_id: int, code_fields: dict, counted, apply: bool = False, include_statements: bool = False):
+        params = _reconcile_params(club_id, code_fields, counted, apply, include_statements)
+        try:
+            resp = await self.client.rpc("reconcile_club_financials", params).execute()
+        finally:
+            if apply:
+                self._invalidate()
+        return resp.data
+
 
-financials_crud = FinancialsCRUD("financial_summaries", supabase)
\ No newline at end of file
+financials_crud = FinancialsCRUD("financial_summaries", supabase)
+async_financials_crud = AsyncFinancialsCRUD(
+    "financial_summaries", async_supabase, cache=table_cache("financial_summaries")
+)
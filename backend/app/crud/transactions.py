@@ -1,4 +1,54 @@
-from app.crud.crud_base import CRUDBase
-from app.db import supabase
+from app.crud.crud_base import CRUDBase, AsyncCRUDBase, make_json_safe
+from app.db import supabase, async_supabase
+from app.cache import table_cache
 
-transactions_crud = CRUDBase("transactions", supabase)
\ No newline at end of file
+
+# Edits and deletes run as database functions (backend/sql/financial_summaries.sql):
+# the transaction row and the summaries it moves between change in one database transaction.
+
+def _change_params(code_fields: dict, counted) -> dict:
+    return {"p_code_fields": code_fields, "p_counted": list(counted)}
+
+
+class TransactionsCRUD(CRUDBase):
+    def update_with_financials(self, id: str, data: dict, code_fields: dict, counted):
+        """
+        Update a transaction and apply the signed financial delta (old
+        contribution out, new in). Returns the updated row, or None.
+        """
+        params = {"p_id": id, "p_changes": make_json_safe(data), **_change_params(code_fields, counted)}
+        resp = self.client.rpc("update_transaction_with_financials", params).execute()
+        return resp.data[0] if resp.data else None
+
+    def delete_with_financials(self, id: str, code_fields: dict, counted):
+        """Delete a transaction and take its amount back out. Returns the deleted row, or None."""
+        params = {"p_id": id, **_change_params(code_fields, counted)}
+        resp = self.client.rpc("delete_transaction_with_financials", params).execute()
+        return resp.data[0] if resp.data else None
+
+
+class AsyncTransactionsCRUD(AsyncCRUDBase):
+    """
+    Async counterpart of TransactionsCRUD.
+    """
+
+    async def update_with_financials(self, id: str, data: dict, code_fields: dict, counted):
+        params = {"p_id": id, "p_changes": make_json_safe(data), **_change_params(code_fields, counted)}
+        try:
+            resp = await self.client.rpc("update_transaction_with_financials", params).execute()
+        finally:
+            # the function writes summaries too
+            table_cache("financial_summaries").invalidate()
+        return resp.data[0] if resp.data else None
+
+    async def delete_with_financials(self, id: str, code_fields: dict, counted):
+        params = {"p_id": id, **_change_params(code_fields, counted)}
+        try:
+            resp = await self.client.rpc("delete_transaction_with_financials", params).execute()
+        finally:
+            table_cache("financial_summaries").invalidate()
+        return resp.data[0] if resp.data else None
+
+
+transactions_crud = TransactionsCRUD("transactions", supabase)
+async_transactions_crud = AsyncTransactionsCRUD("transactions", async_supabase)
@@ -1,13 +1,19 @@
-from supabase import create_client, Client
+from supabase import AsyncClient, Client
 from app.config import get_settings
+from app.pool import get_async_client, get_client
 
 settings = get_settings()
 
-supabase: Client = create_client(settings.supabase_url, settings.supabase_service_key)
+# shared, pooled clients (see app/pool.py)
+supabase: Client = get_client(settings.supabase_url, settings.supabase_service_key)
+async_supabase: AsyncClient = get_async_client(settings.supabase_url, settings.supabase_service_key)
 
 def get_supabase():
     return supabase
 
+def get_async_supabase():
+    return async_supabase
+
 # # # testing
 # response = supabase.table("clubs").select("*").execute()
 # print(response.data)
@@ -0,0 +1,18 @@
+"""
+Booking rules shared by the transactions router, the reconcile job, the
+analytics rollups and the tests. No imports, so anything can use it without
+pulling in the Supabase client.
+"""
+
+# Code mapping: Transaction code -> Financial field name
+CODE_TO_FINANCIAL_FIELD = {
+    "3300": "revenue_donations",
+    "3311": "revenue_fundraising",
+    "3325": "revenue_sponsorship",
+    "5520": "expense_food",
+    "6413": "expense_giveaway",
+    "5751": "expense_uniforms",
+}
+
+# Only these statuses count toward the financial summaries
+COUNTED_STATUSES = ("completed", "approved")
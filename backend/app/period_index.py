@@ -0,0 +1,139 @@
+"""
+In-process index of each club's financial periods.
+
+A transaction is booked against the summary whose [period_start, period_end]
+contains its date. Instead of fetching and parsing every summary of the club on
+each transaction, the periods are loaded once per club into sorted,
+pre-parsed date lists and searched with bisect.
+
+Entries are dropped by the financials router whenever it creates, updates or
+deletes a summary, and otherwise expire after PERIOD_INDEX_TTL seconds (other
+workers' writes). A lookup that finds no period reloads the club once if its
+entry is older than PERIOD_INDEX_MISS_REFRESH seconds, so a period just
+created by another worker is picked up quickly.
+"""
+import asyncio
+import os
+import time
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+
+
+def _as_date(value) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date() if isinstance(value, str) else value
+
+
+class PeriodIndex:
+    """One club's periods, sorted by start."""
+
+    def __init__(self, summaries: list[dict]):
+        rows = sorted(summaries, key=lambda s: _as_date(s["period_start"]))
+        self.records = rows
+        self.starts = [_as_date(s["period_start"]) for s in rows]
+        self.ends = [_as_date(s["period_end"]) for s in rows]
+
+    def __len__(self):
+        return len(self.records)
+
+    def find(self, day: date) -> dict | None:
+        """Summary whose period contains `day` (the latest-starting one if periods overlap)."""
+        i = bisect_right(self.starts, day) - 1
+        if i >= 0 and day <= self.ends[i]:
+            return self.records[i]
+        return None
+
+    def conflicts(self, start: date, end: date, exclude_id=None) -> list[dict]:
+        """Existing summaries whose period overlaps [start, end]."""
+        # every period starting after `end` is clear; of the rest, only the ones ending on/after `start` overlap
+        hi = bisect_right(self.starts, end)
+        return [
+            self.records[i] for i in range(hi)
+            if self.ends[i] >= start and str(self.records[i]["id"]) != str(exclude_id)
+        ]
+
+    def gaps(self) -> list[dict]:
+        """Days between consecutive periods that no period covers."""
+        out, covered_to = [], None
+        for start, end in zip(self.starts, self.ends):
+            if covered_to is not None and start > covered_to + timedelta(days=1):
+                out.append({"start": covered_to + timedelta(days=1), "end": start - timedelta(days=1)})
+            covered_to = end if covered_to is None else max(covered_to, end)
+        return out
+
+    def overlaps(self) -> list[dict]:
+        out = []
+        for i in range(1, len(self.records)):
+            for j in range(i):
+                if self.ends[j] >= self.starts[i]:
+                    out.append({"a": self.records[j]["id"], "b": self.records[i]["id"]})
+        return out
+
+
+class PeriodIndexCache:
+    def __init__(self, loader, ttl: float, miss_refresh: float):
+        """loader(club_id) -> awaitable list of that club's summary rows."""
+        self._loader = loader
+        self.ttl = ttl
+        self.miss_refresh = miss_refresh
+        self._entries: dict[int, tuple[float, PeriodIndex]] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+
+        self.hits = 0
+        self.loads = 0
+        self.invalidations = 0
+
+    async def get(self, club_id: int, max_age: float | None = None) -> PeriodIndex:
+        max_age = self.ttl if max_age is None else max_age
+        entry = self._entries.get(club_id)
+        if entry is not None and time.monotonic() - entry[0] <= max_age:
+            self.hits += 1
+            return entry[1]
+
+        # one load per club at a time; callers that queued behind it reuse the result
+        lock = self._locks.setdefault(club_id, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(club_id)
+            if entry is not None and time.monotonic() - entry[0] <= max_age:
+                self.hits += 1
+                return entry[1]
+            index = PeriodIndex(await self._loader(club_id) or [])
+            self._entries[club_id] = (time.monotonic(), index)
+            self.loads += 1
+            return index
+
+    async def find(self, club_id: int, day) -> dict | None:
+        day = _as_date(day)
+        found = (await self.get(club_id)).find(day)
+        if found is None:
+            found = (await self.get(club_id, max_age=self.miss_refresh)).find(day)
+        return found
+
+    def invalidate(self, club_id: int | None = None):
+        if club_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(club_id, None)
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.loads
+        return {
+            "clubs": len(self._entries),
+            "hits": self.hits,
+            "loads": self.loads,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _financials_loader(club_id: int):
+    from app.crud.financials import async_financials_crud
+    # straight from the database: the index has its own staleness rules
+    return async_financials_crud.list_by("club_id", club_id, cached=False)
+
+
+period_index = PeriodIndexCache(
+    loader=_financials_loader,
+    ttl=float(os.getenv("PERIOD_INDEX_TTL", "300")),
+    miss_refresh=float(os.getenv("PERIOD_INDEX_MISS_REFRESH", "5")),
+)
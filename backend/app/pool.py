@@ -0,0 +1,254 @@
+# app/pool.py
+"""
+Shared, connection-pooled Supabase clients.
+
+Every Supabase client built here rides on one keep-alive httpx connection pool,
+so the CRUD layer (app/db.py), the RAG retrieval path (ai/retrieval.py) and the
+indexer (ai/indexing.py) stop paying for client setup + a fresh TLS handshake
+per call. The async CRUD layer gets its own httpx.AsyncClient pool with the
+same limits.
+
+Tunable via env:
+    SUPABASE_POOL_SIZE          max open connections            (default 20)
+    SUPABASE_POOL_KEEPALIVE     max idle keep-alive connections (default = pool size)
+    SUPABASE_KEEPALIVE_EXPIRY   seconds an idle connection is kept (default 30)
+    SUPABASE_TIMEOUT            default per-request timeout in seconds (default 10)
+    SUPABASE_ASYNC_SHARD_SIZE   connections per async pool shard (default 8)
+"""
+import asyncio
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+import httpx
+from dotenv import load_dotenv
+from supabase import AsyncClient, Client, create_client
+from supabase.lib.client_options import AsyncClientOptions, SyncClientOptions
+
+load_dotenv()
+
+POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "20"))
+POOL_KEEPALIVE = int(os.getenv("SUPABASE_POOL_KEEPALIVE", str(POOL_SIZE)))
+KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+DEFAULT_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+ASYNC_SHARD_SIZE = int(os.getenv("SUPABASE_ASYNC_SHARD_SIZE", "8"))
+
+# per-call timeout override, set with `call_timeout(...)`
+_timeout_override: ContextVar[float | None] = ContextVar("supabase_call_timeout", default=None)
+
+
+class _PoolCounters:
+    """
+    Simple counters about an httpx transport's underlying pool: how many
+    requests went out on an existing keep-alive connection (reused), how many
+    had to open a new one, and how many arrived while every connection was busy
+    and had to queue (waits).
+    """
+
+    def _init_counters(self, max_connections: int):
+        self._max_connections = max_connections
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.reused = 0
+        self.opened = 0
+        self.waits = 0
+
+    def _connections(self) -> list:
+        return self._pool.connections
+
+    def _before_request(self, request: httpx.Request, conns: list, capacity: int, waited: bool = False):
+        override = _timeout_override.get()
+        if override is not None:
+            request.extensions["timeout"] = httpx.Timeout(override).as_dict()
+
+        with self._lock:
+            self.requests += 1
+            idle = any(c.is_idle() for c in conns)
+            full = len(conns) >= capacity
+            if waited or (full and not idle):
+                self.waits += 1
+            if idle or full:
+                self.reused += 1
+            else:
+                self.opened += 1
+
+    def stats(self) -> dict:
+        conns = self._connections()
+        with self._lock:
+            return {
+                "max_connections": self._max_connections,
+                "connections_open": len(conns),
+                "connections_idle": sum(1 for c in conns if c.is_idle()),
+                "requests": self.requests,
+                "reused": self.reused,
+                "opened": self.opened,
+                "waits": self.waits,
+                "reuse_ratio": round(self.reused / self.requests, 4) if self.requests else 0.0,
+            }
+
+
+class _PooledTransport(_PoolCounters, httpx.HTTPTransport):
+    def __init__(self, max_connections: int, **kwargs):
+        super().__init__(**kwargs)
+        self._init_counters(max_connections)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._before_request(request, self._pool.connections, self._max_connections)
+        return super().handle_request(request)
+
+
+class _AsyncPooledTransport(_PoolCounters, httpx.AsyncBaseTransport):
+    """
+    Async pool split into small shards of ASYNC_SHARD_SIZE connections.
+
+    httpcore's async pool rescans every in-flight request against every
+    connection each time one frees up, which is quadratic in concurrency and
+    swamps the event loop long before the network is the bottleneck. Keeping each
+    shard small, routing to the least-loaded shard and making callers beyond
+    POOL_SIZE wait on a semaphore keeps that cost flat.
+    """
+
+    def __init__(self, max_connections: int, keepalive: int, keepalive_expiry: float):
+        self._init_counters(max_connections)
+        n = max(1, -(-max_connections // ASYNC_SHARD_SIZE))
+        size = -(-max_connections // n)
+        self._shard_size = size
+        self._shards = [
+            httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(
+                    max_connections=size,
+                    max_keepalive_connections=max(1, -(-keepalive // n)),
+                    keepalive_expiry=keepalive_expiry,
+                )
+            )
+            for _ in range(n)
+        ]
+        self._inflight = [0] * n
+        self._slots: asyncio.Semaphore | None = None
+
+    def _connections(self) -> list:
+        return [c for shard in self._shards for c in shard._pool.connections]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_connections)
+        waited = self._slots.locked()
+        await self._slots.acquire()
+
+        i = min(range(len(self._shards)), key=self._inflight.__getitem__)
+        self._inflight[i] += 1
+        shard = self._shards[i]
+        try:
+            self._before_request(request, shard._pool.connections, self._shard_size, waited)
+            response = await shard.handle_async_request(request)
+        except BaseException:
+            self._release(i)
+            raise
+        # hold the slot until the body is read, i.e. the connection is free again
+        response.stream = _ReleasingStream(response.stream, lambda: self._release(i))
+        return response
+
+    def _release(self, i: int):
+        self._inflight[i] -= 1
+        self._slots.release()
+
+    async def aclose(self):
+        for shard in self._shards:
+            await shard.aclose()
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._release is not None:
+                self._release()
+                self._release = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=POOL_SIZE,
+        max_keepalive_connections=POOL_KEEPALIVE,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+@lru_cache(maxsize=1)
+def _transport() -> _PooledTransport:
+    return _PooledTransport(max_connections=POOL_SIZE, limits=_limits())
+
+
+@lru_cache(maxsize=1)
+def _async_transport() -> _AsyncPooledTransport:
+    return _AsyncPooledTransport(POOL_SIZE, POOL_KEEPALIVE, KEEPALIVE_EXPIRY)
+
+
+@lru_cache(maxsize=1)
+def get_http_client() -> httpx.Client:
+    """The one pooled httpx client every Supabase client shares."""
+    return httpx.Client(
+        transport=_transport(),
+        timeout=httpx.Timeout(DEFAULT_TIMEOUT),
+        follow_redirects=True,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_async_http_client() -> httpx.AsyncClient:
+    """Async counterpart of get_http_client, used by the AsyncCRUDBase layer."""
+    return httpx.AsyncClient(
+        transport=_async_transport(),
+        timeout=httpx.Timeout(DEFAULT_TIMEOUT),
+        follow_redirects=True,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_client(url: str, key: str) -> Client:
+    """
+    Return a Supabase client for (url, key), built once per process and backed
+    by the shared connection pool.
+    """
+    options = SyncClientOptions(httpx_client=get_http_client())
+    return create_client(url, key, options=options)
+
+
+@lru_cache(maxsize=None)
+def get_async_client(url: str, key: str) -> AsyncClient:
+    """
+    Async Supabase client for (url, key) on the shared async pool.
+    Built synchronously so it can live at module level like `supabase` in app/db.py;
+    the service key is sent as the bearer token, so no auth session is needed.
+    """
+    options = AsyncClientOptions(httpx_client=get_async_http_client())
+    return AsyncClient(url, key, options)
+
+
+@contextmanager
+def call_timeout(seconds: float):
+    """
+    Override the request timeout for Supabase calls made inside this block
+    (only affects the current thread / task).
+    """
+    token = _timeout_override.set(seconds)
+    try:
+        yield
+    finally:
+        _timeout_override.reset(token)
+
+
+def pool_stats() -> dict:
+    """Pool-level counters, handy for sizing POOL_SIZE against the worker count."""
+    return {"sync": _transport().stats(), "async": _async_transport().stats()}
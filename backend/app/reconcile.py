@@ -0,0 +1,278 @@
+"""
+Rebuild financial_summaries totals from the transactions ledger.
+
+For each club the database function reconcile_club_financials
+(sql/financial_summaries.sql) aggregates its transactions per period and
+financial field, diffs them against the stored summaries and, with --apply,
+writes the corrections, all in one database transaction. The club's
+summaries are locked before its ledger is read, so edits and deletes made
+during the run wait and land on top of the corrected totals. Only a
+POST /transactions/ caught between inserting its row and adding its amount
+(two calls) can still be counted twice; re-run the dry run to confirm zero
+drift after a busy run. Clubs are reconciled a few at a time.
+
+The same booking rules as POST /transactions/ apply: completed/approved
+transactions with a mapped code count toward the latest-starting period that
+contains their date.
+
+Summaries loaded from account statements (app/services/json-to-db.py) hold
+the statement's figures, which the ledger doesn't reproduce: --apply would
+replace them with the ledger totals, so they are skipped (and counted in the
+report) unless --include-statements is given.
+
+    cd backend
+    python -m app.reconcile                  # dry run, every club
+    python -m app.reconcile --club-id 3 --apply
+
+POST /admin/reconcile runs the same job in the background of the API
+process; poll GET /admin/reconcile/{job_id}.
+"""
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+
+from app.crud.clubs import async_clubs_crud as clubs_crud
+from app.crud.financials import async_financials_crud as financials_crud
+from app.financial_codes import CODE_TO_FINANCIAL_FIELD, COUNTED_STATUSES
+
+RECONCILE_CONCURRENCY = int(os.getenv("RECONCILE_CONCURRENCY", "4"))
+MAX_REPORTED_DIFFS = 1000
+
+
+def club_diffs(club_id: int, result: dict) -> list[dict]:
+    """The function's diffs in report form (amounts as exact decimal strings, with the delta)."""
+    out = []
+    for d in result["diffs"]:
+        stored, expected = Decimal(str(d["stored"])), Decimal(str(d["expected"]))
+        out.append({
+            "club_id": club_id,
+            "summary_id": str(d["summary_id"]),
+            "period_start": str(d["period_start"]),
+            "period_end": str(d["period_end"]),
+            "field": d["field"],
+            "stored": str(stored),
+            "expected": str(expected),
+            "delta": str(expected - stored),
+        })
+    return out
+
+
+async def _club_ids(club_id: int | None):
+    """Every club id, a page at a time (or just the one asked for)."""
+    if club_id is not None:
+        yield club_id
+        return
+    cursor = None
+    while True:
+        page = await clubs_crud.list_page(500, cursor, columns=["id"], order_by=("id",))
+        for row in page["items"]:
+            yield row["id"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return
+
+
+async def reconcile(club_id: int | None = None, dry_run: bool = True, code_fields: dict | None = None,
+                    include_statements: bool = False, progress=None) -> dict:
+    """
+    Reconcile one club or every club. `progress(clubs_done)` is called after
+    each club. Each club is applied atomically, so a run that stops early
+    (error, cancel) leaves every club either fully corrected or untouched.
+    """
+    if code_fields is None:
+        code_fields = CODE_TO_FINANCIAL_FIELD
+
+    started = time.perf_counter()
+    report = {
+        "dry_run": dry_run,
+        "clubs": 0,
+        "transactions": 0,
+        "summaries": 0,
+        "skipped_statement_summaries": 0,
+        "drifted_summaries": 0,
+        "corrections": 0,
+        "applied": 0,
+        "unassigned_transactions": 0,
+        "errors": [],
+        "diffs": [],
+    }
+    limit = asyncio.Semaphore(RECONCILE_CONCURRENCY)
+
+    async def one(cid: int):
+        async with limit:
+            try:
+                result = await financials_crud.reconcile_club(
+                    cid, code_fields, COUNTED_STATUSES, apply=not dry_run, include_statements=include_statements
+                )
+            except Exception as e:
+                report["errors"].append({"club_id": cid, "error": str(e)})
+                return
+        diffs = club_diffs(cid, result)
+
+        report["clubs"] += 1
+        report["transactions"] += result["transactions"]
+        report["summaries"] += result["summaries"]
+        report["skipped_statement_summaries"] += result["skipped_statements"]
+        report["unassigned_transactions"] += result["unassigned"]
+        report["drifted_summaries"] += len({d["summary_id"] for d in diffs})
+        report["corrections"] += len(diffs)
+        if not dry_run:
+            report["applied"] += len(diffs)
+        room = MAX_REPORTED_DIFFS - len(report["diffs"])
+        report["diffs"].extend(diffs[:max(room, 0)])
+        if progress:
+            progress(report["clubs"])
+
+    # a bounded window of clubs in flight, so ids are streamed too
+    tasks: set[asyncio.Task] = set()
+    try:
+        async for cid in _club_ids(club_id):
+            tasks.add(asyncio.ensure_future(one(cid)))
+            if len(tasks) >= RECONCILE_CONCURRENCY * 4:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        if tasks:
+            await asyncio.wait(tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    return report
+
+
+# ---------------------------
+# Background jobs for /admin/reconcile
+# ---------------------------
+class ReconcileBusy(Exception):
+    def __init__(self, job: "ReconcileJob"):
+        super().__init__(f"reconcile job {job.id} is still {job.status}")
+        self.job = job
+
+
+class ReconcileJob:
+    def __init__(self, club_id: int | None, dry_run: bool, include_statements: bool):
+        self.id = uuid.uuid4().hex
+        self.club_id = club_id
+        self.dry_run = dry_run
+        self.include_statements = include_statements
+        self.status = "queued"        # queued | running | succeeded | failed | cancelled
+        self.clubs_done = 0
+        self.errors: list[dict] = []
+        self.report: dict | None = None
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def progress(self, clubs_done: int):
+        self.clubs_done = clubs_done
+
+    def to_dict(self) -> dict:
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "club_id": self.club_id,
+            "dry_run": self.dry_run,
+            "include_statements": self.include_statements,
+            "clubs_done": self.clubs_done,
+            "errors": list(self.errors),
+            "report": self.report,
+            "created_at": self.created_at,
+            "elapsed_seconds": round(end - self.started_at, 2) if self.started_at else None,
+        }
+
+
+class ReconcileJobs:
+    """
+    Registry of reconcile runs as tasks on the API's event loop (the work is
+    database round trips, so it doesn't need a thread). One job at a time;
+    cancelling stops it, and each club's call is atomic, so every club is
+    left either reconciled or untouched.
+    """
+
+    def __init__(self, history: int = 20):
+        self._history = history
+        self._jobs: OrderedDict[str, ReconcileJob] = OrderedDict()
+
+    def start(self, club_id: int | None = None, dry_run: bool = True, include_statements: bool = False) -> ReconcileJob:
+        for job in self._jobs.values():
+            if job.active:
+                raise ReconcileBusy(job)
+        job = ReconcileJob(club_id, dry_run, include_statements)
+        self._jobs[job.id] = job
+        while len(self._jobs) > self._history:
+            self._jobs.popitem(last=False)
+        job._task = asyncio.create_task(self._execute(job))
+        return job
+
+    async def _execute(self, job: ReconcileJob):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.report = await reconcile(job.club_id, dry_run=job.dry_run,
+                                         include_statements=job.include_statements, progress=job.progress)
+            job.errors.extend(job.report["errors"])
+            job.status = "succeeded"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            print(f"[reconcile] job {job.id} failed: {e!r}")
+            job.errors.append({"club_id": None, "error": repr(e)})
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> ReconcileJob | None:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> ReconcileJob | None:
+        job = self.get(job_id)
+        if job is not None and job.active and job._task is not None:
+            job._task.cancel()
+        return job
+
+    def list(self) -> list[ReconcileJob]:
+        return list(reversed(self._jobs.values()))
+
+
+def _print_report(report: dict):
+    mode = "DRY RUN" if report["dry_run"] else "APPLIED"
+    print(f"[reconcile] {mode}: {report['clubs']} clubs, {report['transactions']:,} transactions, "
+          f"{report['summaries']} summaries in {report['seconds']}s")
+    for d in report["diffs"]:
+        print(f"  club {d['club_id']:>5}  {d['period_start']}..{d['period_end']}  {d['field']:<20} "
+              f"stored {d['stored']:>12}  expected {d['expected']:>12}  delta {d['delta']:>12}")
+    if report["corrections"] > len(report["diffs"]):
+        print(f"  ... {report['corrections'] - len(report['diffs'])} more")
+    print(f"[reconcile] {report['drifted_summaries']} summaries drifted, {report['corrections']} field corrections, "
+          f"{report['applied']} applied")
+    if report["skipped_statement_summaries"]:
+        print(f"[reconcile] {report['skipped_statement_summaries']} summaries loaded from statements skipped "
+              f"(--include-statements to reconcile them too)")
+    if report["unassigned_transactions"]:
+        print(f"[reconcile] {report['unassigned_transactions']} counted transactions fall outside every period")
+    for e in report["errors"]:
+        print(f"[reconcile] club {e['club_id']} failed: {e['error']}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--club-id", type=int, help="only this club (default: every club)")
+    parser.add_argument("--apply", action="store_true", help="write the corrections (default: dry run)")
+    parser.add_argument("--include-statements", action="store_true",
+                        help="also reconcile summaries loaded from account statements (replaces their figures)")
+    args = parser.parse_args()
+
+    result = asyncio.run(reconcile(args.club_id, dry_run=not args.apply, include_statements=args.include_statements))
+    _print_report(result)
+    raise SystemExit(1 if result["errors"] else 0)
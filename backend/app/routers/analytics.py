@@ -0,0 +1,24 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter
+
+from app.analytics import club_rollup
+from app.financial_codes import CODE_TO_FINANCIAL_FIELD
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+@router.get("/club/{club_id}")
+async def get_club_rollup(club_id: int, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    """
+    A club's transaction totals, computed from the transactions themselves:
+    - periods:    per financial period, revenue/expenses by status plus
+                  revenue_total, expenses_total (completed + approved),
+                  pending_revenue and pending_expenses
+    - categories: per category, the counted total of each period (trend lines)
+    - statuses:   count and total per status
+    - rows:       every (period, code, category, status) group with count and total
+    Transactions outside every period are grouped under period_id null.
+    Cached per club until its transactions or periods change.
+    """
+    return await club_rollup(club_id, CODE_TO_FINANCIAL_FIELD, date_from, date_to)
@@ -1,28 +1,60 @@
-from fastapi import APIRouter, HTTPException
+from typing import Any, Optional
 
-# this will allow us to schedule the functions here on a separate thread
-from starlette.concurrency import run_in_threadpool
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from app.cache import etag_json
 from app.schemas.clubs import ClubsCreate, ClubsResponse
-from app.crud.clubs import clubs_crud
+from app.schemas.generic import Page, parse_fields
+# async CRUD -> awaited directly on the event loop, no thread hop
+from app.crud.clubs import async_clubs_crud as clubs_crud
 
 router = APIRouter(prefix='/clubs', tags=['clubs'])
 
-@router.get("/", response_model=list[ClubsResponse])
-async def get_all_clubs():
-    data = await run_in_threadpool(clubs_crud.get_all)
-    return data
+MAX_PAGE_SIZE = 1000
+
+@router.get("/", response_model=Page[ClubsResponse])
+async def get_all_clubs(
+    request: Request,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,name"),
+    status: Optional[str] = None,
+    club_type: Optional[str] = None,
+):
+    """
+    A page of clubs in id order; follow next_cursor (?cursor=) for the rest.
+    Carries an ETag; If-None-Match gets 304 while the clubs table is unchanged.
+    """
+    filters = [("eq", column, value) for column, value in (("status", status), ("club_type", club_type)) if value]
+    try:
+        columns = parse_fields(fields, ClubsResponse.model_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def produce():
+        try:
+            return await clubs_crud.list_page(limit, cursor, columns=columns, order_by=("id",), filters=filters)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    # partial rows don't fit ClubsResponse; send them as they are
+    model = Page[dict[str, Any]] if columns else Page[ClubsResponse]
+    return await etag_json(request, model, ("clubs",), produce)
 
 @router.get("/{clubs_id}", response_model=ClubsResponse)
-async def get_club_by_id(clubs_id: int):
-    club = await run_in_threadpool(clubs_crud.get, clubs_id)
+async def get_club_by_id(clubs_id: int, request: Request):
+    async def produce():
+        club = await clubs_crud.get(clubs_id)
+
+        if club is None:
+            raise HTTPException(status_code=404, detail="Club not found")
+        return club
 
-    if club is None:
-        raise HTTPException(status_code=404, detail="Club not found")
-    return club
+    return await etag_json(request, ClubsResponse, ("clubs",), produce)
 
 @router.post("/", response_model=ClubsResponse)
 async def create_club(new_club: ClubsCreate):
-    created_club = await run_in_threadpool(clubs_crud.create, new_club.model_dump())
+    created_club = await clubs_crud.create(new_club.model_dump())
 
     if created_club is None:
         raise HTTPException(status_code=500, detail="Failed to create club")
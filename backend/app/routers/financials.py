@@ -1,61 +1,241 @@
-from fastapi import APIRouter, HTTPException
-# this will allow us to schedule the functions here on a separate thread
-from starlette.concurrency import run_in_threadpool
-from app.schemas.financials import FinancialsCreate, FinancialsResponse, FinancialsUpdate
-from app.crud.financials import financials_crud
+from datetime import date
+from fastapi import APIRouter, Body, HTTPException, Request
+from postgrest.exceptions import APIError
+from pydantic import ValidationError
+from app.cache import etag_json
+from app.schemas.financials import (
+    FinancialsCreate, FinancialsResponse, FinancialsUpdate,
+    FinancialsBulkResponse,
+)
+# async CRUD -> awaited directly on the event loop, no thread hop
+from app.crud.financials import async_financials_crud as financials_crud
+from app.period_index import period_index, PeriodIndex
 
 router = APIRouter(prefix="/financials", tags=["financials"])
 
+
+# exclusion_violation: financial_summaries_no_overlap (sql/financial_summaries.sql)
+OVERLAP_VIOLATION = "23P01"
+
+
+def _overlap_conflict(e: APIError) -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail={"message": "Period overlaps an existing financial summary", "overlaps": [], "details": e.details},
+    )
+
+
+async def _check_period(club_id: int, start, end, exclude_id=None):
+    """
+    Reject a period that is inverted or overlaps another summary of the club
+    (a transaction date must map to exactly one summary); warn about gaps.
+    The database enforces the overlap rule too (financial_summaries_no_overlap);
+    checking here first gives a 409 that names the clashing periods.
+    """
+    if end < start:
+        raise HTTPException(status_code=422, detail="period_end is before period_start")
+
+    # fresh read: the decision shouldn't rest on another worker's stale view
+    period_index.invalidate(club_id)
+    index = await period_index.get(club_id)
+    clashes = index.conflicts(start, end, exclude_id=exclude_id)
+    if clashes:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "Period overlaps an existing financial summary",
+                "overlaps": [
+                    {"id": str(c["id"]), "period_start": c["period_start"], "period_end": c["period_end"]}
+                    for c in clashes
+                ],
+            },
+        )
+
+    others = [r for r in index.records if str(r["id"]) != str(exclude_id)]
+    proposed = PeriodIndex(others + [{"id": None, "period_start": start, "period_end": end}])
+    for gap in proposed.gaps():
+        print(f"Warning: club {club_id} has no financial period from {gap['start']} to {gap['end']}")
+
+
+@router.get("/coverage/{club_id}")
+async def get_period_coverage(club_id: int):
+    """
+    The club's periods in date order, plus any uncovered gaps or overlaps between them.
+    """
+    index = await period_index.get(club_id)
+    return {
+        "club_id": club_id,
+        "periods": [
+            {"id": str(r["id"]), "period_start": str(s), "period_end": str(e)}
+            for r, s, e in zip(index.records, index.starts, index.ends)
+        ],
+        "gaps": index.gaps(),
+        "overlaps": index.overlaps(),
+    }
+
+
 @router.get("/{club_id}", response_model=FinancialsResponse)
-async def get_club_financial_summary(club_id: int):
+async def get_club_financial_summary(club_id: int, request: Request):
     """
     Get a single financial summary for a club (returns first match).
     """
-    finances = await run_in_threadpool(financials_crud.get_by, "club_id", club_id)
+    async def produce():
+        finances = await financials_crud.get_by("club_id", club_id)
 
-    if finances is None:
-        raise HTTPException(status_code=404, detail="Summary not found")
-    return finances
+        if finances is None:
+            raise HTTPException(status_code=404, detail="Summary not found")
+        return finances
+
+    return await etag_json(request, FinancialsResponse, ("financial_summaries",), produce)
 
 @router.get("/all/{club_id}", response_model=list[FinancialsResponse])
-async def get_all_summaries_for_club(club_id: int):
+async def get_all_summaries_for_club(club_id: int, request: Request):
     """
     Return all financial summaries for a given club.
     """
-    summaries = await run_in_threadpool(financials_crud.list_by, "club_id", club_id)
+    async def produce():
+        summaries = await financials_crud.list_by("club_id", club_id)
+
+        if not summaries:
+            # optional, depending on your preference
+            raise HTTPException(status_code=404, detail="No financial summaries found for this club")
 
-    if not summaries:
-        # optional, depending on your preference
-        raise HTTPException(status_code=404, detail="No financial summaries found for this club")
+        return summaries
 
-    return summaries
+    return await etag_json(request, list[FinancialsResponse], ("financial_summaries",), produce)
 
 @router.post("/", response_model=FinancialsResponse)
 async def create_financial_summary(new_summary: FinancialsCreate):
     """
     Create a new financial summary record.
+    Returns 409 if its period overlaps another summary of the same club.
     """
-    created_summary = await run_in_threadpool(financials_crud.create, new_summary.model_dump())
+    await _check_period(new_summary.club_id, new_summary.period_start, new_summary.period_end)
+
+    try:
+        created_summary = await financials_crud.create(new_summary.model_dump())
+    except APIError as e:
+        # another worker created an overlapping period since our check
+        if e.code == OVERLAP_VIOLATION:
+            raise _overlap_conflict(e)
+        raise
+    finally:
+        period_index.invalidate(new_summary.club_id)
 
     if created_summary is None:
         raise HTTPException(status_code=500, detail="Failed to create financial summary")
     return created_summary
 
+# ---------------------------
+# Bulk upsert
+# ---------------------------
+BULK_UPSERT_BATCH = 500           # rows per upsert_financial_summaries call
+
+
+@router.post("/bulk", response_model=FinancialsBulkResponse)
+async def upsert_financial_summaries(payload: list[dict] = Body(...)):
+    """
+    Insert or update many summaries, keyed on (club_id, period_start).
+
+    Body: a JSON array of FinancialsCreate objects. Every row is validated;
+    invalid rows are reported and skipped. The rest are written in batches of
+    BULK_UPSERT_BATCH, each one database call; rows identical to what is
+    stored are left alone, so sending the same rows again reports them
+    unchanged. A row whose period would overlap another summary of the club
+    (stored, or written earlier in the request) is rejected by the database's
+    overlap constraint and reported as a conflict. A later row with the same
+    (club_id, period_start) as an earlier one wins.
+    """
+    results: list[dict] = []
+    accepted: dict[tuple[int, date], dict] = {}
+    for n, raw in enumerate(payload, start=1):
+        result = {"row": n, "status": "invalid", "errors": []}
+        results.append(result)
+        try:
+            data = FinancialsCreate.model_validate(raw).model_dump()
+        except ValidationError as e:
+            result["errors"] = [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()]
+            continue
+        result.update(club_id=data["club_id"], period_start=data["period_start"])
+        if data["period_end"] < data["period_start"]:
+            result["errors"] = ["period_end is before period_start"]
+            continue
+        key = (data["club_id"], data["period_start"])
+        if key in accepted:
+            accepted[key]["result"].update(status="invalid", errors=[f"superseded by row {n} (same club_id and period_start)"])
+        accepted[key] = {"row": n, "result": result, "data": data}
+
+    pending = list(accepted.values())
+    changed_clubs: set[int] = set()
+    for i in range(0, len(pending), BULK_UPSERT_BATCH):
+        batch = pending[i:i + BULK_UPSERT_BATCH]
+        try:
+            written = await financials_crud.upsert_many([row["data"] for row in batch])
+        except Exception as e:
+            for row in batch:
+                row["result"].update(status="failed", errors=[str(e)])
+            continue
+        for w in written:
+            row = accepted[(w["club_id"], date.fromisoformat(str(w["period_start"])))]
+            if w["action"] == "conflict":
+                row["result"].update(status="conflict", errors=[f"period overlaps another summary of the club: {w['error']}"])
+                continue
+            row["result"].update(status=w["action"], id=w["id"])
+            if w["action"] != "unchanged":
+                changed_clubs.add(w["club_id"])
+    for club_id in changed_clubs:
+        period_index.invalidate(club_id)
+
+    def count(status: str) -> int:
+        return sum(1 for r in results if r["status"] == status)
+
+    return {
+        "received": len(results),
+        "inserted": count("inserted"),
+        "updated": count("updated"),
+        "unchanged": count("unchanged"),
+        "invalid": count("invalid"),
+        "conflicts": count("conflict"),
+        "failed": count("failed"),
+        "rows": results,
+    }
+
 @router.patch("/{financial_id}", response_model=FinancialsResponse)
 async def update_financial_summary(financial_id: str, updates: FinancialsUpdate):
     """
     Update fields of an existing financial summary.
     Uses the financial record's UUID, not the club_id.
+    Changing the period or club is checked for overlaps like a create.
     """
-    updated = await run_in_threadpool(
-        financials_crud.update_by_uuid,
-        financial_id,
-        updates.model_dump(exclude_unset=True)
-    )
+    changes = updates.model_dump(exclude_unset=True)
+
+    current = None
+    if changes.keys() & {"period_start", "period_end", "club_id"}:
+        current = await financials_crud.get_by("id", financial_id)
+        if current is None:
+            raise HTTPException(status_code=404, detail="Financial summary not found")
+        merged = {**current, **changes}
+        await _check_period(
+            merged["club_id"],
+            date.fromisoformat(str(merged["period_start"])),
+            date.fromisoformat(str(merged["period_end"])),
+            exclude_id=financial_id,
+        )
+
+    try:
+        updated = await financials_crud.update_by_uuid(financial_id, changes)
+    except APIError as e:
+        if e.code == OVERLAP_VIOLATION:
+            raise _overlap_conflict(e)
+        raise
 
     if updated is None:
         raise HTTPException(status_code=404, detail="Financial summary not found")
 
+    period_index.invalidate(updated["club_id"])
+    if current is not None and current["club_id"] != updated["club_id"]:
+        period_index.invalidate(current["club_id"])
+
     return updated
 
 @router.delete("/{financial_id}")
@@ -63,19 +243,12 @@ async def delete_financial_summary(financial_id: str):
     """
     Delete a financial summary by its UUID.
     """
-    deleted = await run_in_threadpool(financials_crud.delete, financial_id)
+    deleted = await financials_crud.delete(financial_id)
 
     if not deleted:
         raise HTTPException(status_code=404, detail="Financial summary not found or could not be deleted")
 
-    return {"message": "Financial summary deleted successfully"}
-
-
-
-
-
-
-
-
-
+    for row in deleted:
+        period_index.invalidate(row["club_id"])
 
+    return {"message": "Financial summary deleted successfully"}
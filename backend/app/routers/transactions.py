@@ -1,103 +1,403 @@
-from fastapi import APIRouter, HTTPException
-from starlette.concurrency import run_in_threadpool
-from app.schemas.transactions import TransactionsCreate, TransactionsResponse, TransactionsUpdate
-from app.crud.transactions import transactions_crud
-from app.crud.financials import financials_crud
-from datetime import datetime
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
+from typing import Literal, Optional
+from app.schemas.generic import Page, parse_fields
+from app.schemas.transactions import (
+    TransactionsCreate, TransactionsResponse, TransactionsUpdate,
+    TransactionsBulkResponse,
+)
+# async CRUD -> awaited directly on the event loop, no thread hop
+from app.crud.transactions import async_transactions_crud as transactions_crud
+from app.crud.financials import async_financials_crud as financials_crud
+from app.period_index import period_index
+from app.analytics import rollup_cache
+from app.financial_codes import CODE_TO_FINANCIAL_FIELD, COUNTED_STATUSES
+from datetime import date, datetime
+from decimal import Decimal
+import codecs
+import csv
+import io
+import json
+import zlib
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
-# Code mapping: Transaction code -> Financial field name
-CODE_TO_FINANCIAL_FIELD = {
-    "3300": "revenue_donations",
-    "3311": "revenue_fundraising",
-    "3325": "revenue_sponsorship",
-    "5520": "expense_food",
-    "6413": "expense_giveaway",
-    "5751": "expense_uniforms",
-}
 
+async def find_financial_record_for_date(club_id: int, transaction_date):
+    """
+    Find the financial summary whose period contains the transaction date.
+    Served from the in-process period index (app/period_index.py): a bisect over
+    the club's pre-parsed periods, no network call once the club is loaded.
+    """
+    return await period_index.find(club_id, transaction_date)
+
+
+# ---------------------------
+# Bulk ingestion
+# ---------------------------
+BULK_INSERT_BATCH = 500           # rows per multi-row insert
+_CSV_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%y", "%m/%d/%Y")
 
-def find_financial_record_for_date(club_id: int, transaction_date):
+
+def _coerce_csv_row(row: dict) -> dict:
     """
-    Find the financial record that contains this transaction date.
-    Returns the record if found, None otherwise.
+    Bank-export CSV conventions -> TransactionsCreate fields: MM/DD/YY dates,
+    "N/A" for empty vendor/receipt, "$1,234.50" amounts, any-case status.
+    Unknown columns (id, created_at, ...) are dropped.
     """
-    try:
-        # Get all financials for this club
-        summaries = financials_crud.list_by("club_id", club_id)
-        
-        if not summaries:
+    out = {}
+    for field in TransactionsCreate.model_fields:
+        value = row.get(field)
+        if value is None:
+            continue
+        value = value.strip()
+        if value == "" or value.upper() == "N/A":
+            if field in ("vendor", "receipt_url", "description", "code"):
+                out[field] = None
+            continue
+        out[field] = value
+    if "amount" in out:
+        out["amount"] = out["amount"].replace("$", "").replace(",", "")
+    if "status" in out:
+        out["status"] = out["status"].lower()
+    if "date" in out:
+        for fmt in _CSV_DATE_FORMATS:
+            try:
+                out["date"] = datetime.strptime(out["date"], fmt).date()
+                break
+            except ValueError:
+                continue
+    return out
+
+
+async def _csv_records(request: Request):
+    """
+    Yield dict rows from a streamed text/csv body without buffering it whole.
+    A record ends at a newline outside double quotes, so quoted newlines survive.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    header, pending, buf = None, "", ""
+
+    def parse(record: str):
+        nonlocal header
+        fields = next(csv.reader([record]), [])
+        if header is None:
+            header = [h.strip() for h in fields]
+            return None
+        if not any(f.strip() for f in fields):
             return None
-        
-        # Convert transaction_date to date object if it's a string
-        if isinstance(transaction_date, str):
-            trans_date = datetime.strptime(transaction_date, "%Y-%m-%d").date()
-        else:
-            trans_date = transaction_date
-        
-        # Find the period that contains this date
-        for record in summaries:
-            period_start = record['period_start']
-            period_end = record['period_end']
-            
-            # Convert to date objects if they're strings
-            if isinstance(period_start, str):
-                period_start = datetime.strptime(period_start, "%Y-%m-%d").date()
-            if isinstance(period_end, str):
-                period_end = datetime.strptime(period_end, "%Y-%m-%d").date()
-            
-            if period_start <= trans_date <= period_end:
-                return record
-        
-        return None
-    except Exception as e:
-        print(f"Error finding financial record: {e}")
-        return None
-
-
-def update_financial_with_transaction_sync(financial_record, code: str, amount: str):
-    """
-    Update the financial record by adding the transaction amount to the correct field.
-    Uses the transaction code to determine which field to update.
-    Synchronous version for use in the router.
-    """
-    # Map code to field name
-    field_name = CODE_TO_FINANCIAL_FIELD.get(code)
-    
-    if not field_name:
-        print(f"Warning: No financial field mapping for code '{code}'")
-        return False
-    
-    # Get current value from the record
-    current_value = float(financial_record[field_name])
-    new_value = current_value + float(amount)
-    
-    # Update the field
-    update_data = {
-        field_name: f"{new_value:.2f}"
+        return dict(zip(header, fields))
+
+    async for chunk in request.stream():
+        buf += decoder.decode(chunk)
+        *lines, buf = buf.split("\n")
+        for line in lines:
+            pending += line + "\n"
+            if pending.count('"') % 2 == 0:
+                row = parse(pending.rstrip("\r\n"))
+                pending = ""
+                if row is not None:
+                    yield row
+    pending += buf + decoder.decode(b"", final=True)
+    if pending.strip():
+        row = parse(pending.rstrip("\r\n"))
+        if row is not None:
+            yield row
+
+
+def _validation_errors(e: ValidationError) -> list[str]:
+    return [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()]
+
+
+@router.post("/bulk", response_model=TransactionsBulkResponse)
+async def create_transactions_bulk(request: Request):
+    """
+    Insert many transactions at once and roll their amounts into the financial
+    summaries with one update per affected summary.
+
+    Body: a JSON array of TransactionsCreate objects, or a CSV upload streamed
+    with Content-Type: text/csv (header row; columns named like the
+    TransactionsCreate fields, bank-export formats accepted, see _coerce_csv_row).
+
+    Rows are validated in a single pass; invalid rows are reported and skipped,
+    valid ones are inserted in batches of BULK_INSERT_BATCH. Financial deltas
+    follow the same rules as POST /transactions/ and are summed per
+    (summary, field) and applied in one atomic database call.
+    """
+    content_type = request.headers.get("content-type", "")
+    results: list[dict] = []
+    batch: list[tuple[dict, dict]] = []     # (report row, validated data)
+    inserted: list[tuple[dict, dict]] = []  # (report row, created record)
+
+    async def flush():
+        if not batch:
+            return
+        rows = list(batch)
+        batch.clear()
+        try:
+            created = await transactions_crud.create_many([data for _, data in rows])
+        except Exception as e:
+            print(f"[bulk] insert of {len(rows)} rows failed: {e}")
+            for result, _ in rows:
+                result.update(status="failed", errors=[str(e)])
+            return
+        for (result, _), record in zip(rows, created):
+            result.update(status="inserted", id=record["id"])
+            inserted.append((result, record))
+        for result, _ in rows[len(created):]:
+            result.update(status="failed", errors=[f"insert returned {len(created)} of {len(rows)} rows"])
+
+    async def take(n: int, raw):
+        result = {"row": n, "status": "invalid", "errors": []}
+        results.append(result)
+        try:
+            data = TransactionsCreate.model_validate(raw).model_dump()
+        except ValidationError as e:
+            result["errors"] = _validation_errors(e)
+            return
+        batch.append((result, data))
+        if len(batch) >= BULK_INSERT_BATCH:
+            await flush()
+
+    if "csv" in content_type:
+        n = 0
+        async for raw in _csv_records(request):
+            n += 1
+            await take(n, _coerce_csv_row(raw))
+    else:
+        try:
+            payload = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or text/csv")
+        if not isinstance(payload, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or text/csv")
+        for n, raw in enumerate(payload, start=1):
+            await take(n, raw)
+    await flush()
+    for club_id in {rec["club_id"] for _, rec in inserted}:
+        rollup_cache.invalidate(club_id)
+
+    # Financial deltas, summed per (summary, field)
+    counted = [(r, rec) for r, rec in inserted if rec["status"] in COUNTED_STATUSES]
+    for result, record in inserted:
+        if record["status"] not in COUNTED_STATUSES:
+            result["financial"] = "not_counted"
+
+    deltas: dict[str, dict[str, Decimal]] = {}
+    affected: dict[str, list[tuple[dict, dict, str]]] = {}
+    spans: dict[str, tuple[date, date]] = {}       # summary -> (first, last) transaction date
+    clubs_by_summary: dict[str, int] = {}
+    for result, record in counted:
+        field = CODE_TO_FINANCIAL_FIELD.get(record.get("code") or "")
+        if field is None:
+            result["financial"] = "no_mapping"
+            continue
+        summary = await find_financial_record_for_date(record["club_id"], record["date"])
+        if summary is None:
+            result["financial"] = "no_period"
+            continue
+        fields = deltas.setdefault(summary["id"], {})
+        fields[field] = fields.get(field, Decimal("0")) + Decimal(str(record["amount"]))
+        affected.setdefault(summary["id"], []).append((result, record, field))
+        day = date.fromisoformat(str(record["date"]))
+        low, high = spans.get(summary["id"], (day, day))
+        spans[summary["id"]] = (min(low, day), max(high, day))
+        clubs_by_summary[summary["id"]] = record["club_id"]
+
+    # all deltas in one atomic call; the database adds them to the current values,
+    # each only if its summary still covers the dates it was picked for
+    updated_ids: set[str] = set()
+    applied = False
+    if deltas:
+        try:
+            rows = await financials_crud.apply_deltas([
+                {"id": sid, "field": f, "amount": amount, "club_id": clubs_by_summary[sid],
+                 "from": spans[sid][0], "to": spans[sid][1]}
+                for sid, fields in deltas.items() for f, amount in fields.items()
+            ])
+            updated_ids = {str(r["id"]) for r in rows}
+            applied = True
+        except Exception as e:
+            print(f"[bulk] financial update failed: {e}")
+    for sid, members in affected.items():
+        if str(sid) in updated_ids:
+            for result, _, _ in members:
+                result["financial"] = "applied"
+            continue
+        if not applied:
+            for result, _, _ in members:
+                result["financial"] = "update_failed"
+            continue
+        # the indexed summary was moved or deleted by another worker: the
+        # database finds each transaction's period instead
+        period_index.invalidate(clubs_by_summary[sid])
+        for result, record, field in members:
+            try:
+                row = await financials_crud.apply_transaction_delta(
+                    record["club_id"], record["date"], field, Decimal(str(record["amount"])),
+                )
+            except Exception as e:
+                print(f"[bulk] financial update failed: {e}")
+                result["financial"] = "update_failed"
+                continue
+            if row is None:
+                result["financial"] = "no_period"
+            else:
+                result["financial"] = "applied"
+                updated_ids.add(str(row["id"]))
+
+    return {
+        "received": len(results),
+        "inserted": len(inserted),
+        "invalid": sum(1 for r in results if r["status"] == "invalid"),
+        "failed": sum(1 for r in results if r["status"] == "failed"),
+        "financial_records_updated": len(updated_ids),
+        "rows": results,
     }
-    
-    try:
-        financial_id = financial_record['id']
-        updated = financials_crud.update_by_uuid(financial_id, update_data)
-        return updated is not None
-    except Exception as e:
-        print(f"Error updating financial record: {e}")
-        return False
 
 
-@router.get("/club/{club_id}", response_model=list[TransactionsResponse])
-async def get_transactions_for_club(club_id: int):
+# ---------------------------
+# Listing
+# ---------------------------
+MAX_PAGE_SIZE = 1000
+# id breaks ties between transactions on the same day
+LIST_ORDER = ("date", "id")
+
+
+def _any_of(column: str, value: Optional[str]):
+    """ "completed,approved" -> in filter, "completed" -> eq filter """
+    values = [v.strip() for v in value.split(",") if v.strip()]
+    return ("in_", column, values) if len(values) > 1 else ("eq", column, values[0])
+
+
+def _club_filters(club_id: int, date_from=None, date_to=None, status=None, code=None, category=None) -> list:
+    filters = [("eq", "club_id", club_id)]
+    if date_from is not None:
+        filters.append(("gte", "date", date_from.isoformat()))
+    if date_to is not None:
+        filters.append(("lte", "date", date_to.isoformat()))
+    for column, value in (("status", status), ("code", code), ("category", category)):
+        if value and value.strip(","):
+            filters.append(_any_of(column, value))
+    return filters
+
+
+@router.get("/club/{club_id}", response_model=Page[TransactionsResponse])
+async def get_transactions_for_club(
+    club_id: int,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,date,amount"),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    status: Optional[str] = Query(None, description="One status or a comma-separated list"),
+    code: Optional[str] = Query(None, description="One code or a comma-separated list"),
+    category: Optional[str] = Query(None, description="One category or a comma-separated list"),
+):
     """
-    Get all transactions belonging to a specific club.
+    Get a page of a club's transactions, newest first.
+    Follow next_cursor (?cursor=) for older ones; it is null on the last page.
     """
-    transactions = await run_in_threadpool(transactions_crud.list_by, "club_id", club_id)
+    filters = _club_filters(club_id, date_from, date_to, status, code, category)
 
-    if not transactions:
+    try:
+        columns = parse_fields(fields, TransactionsResponse.model_fields)
+        page = await transactions_crud.list_page(
+            limit, cursor, columns=columns, order_by=LIST_ORDER, descending=True, filters=filters,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not page["items"] and cursor is None and len(filters) == 1:
         raise HTTPException(status_code=404, detail="No transactions found for this club")
 
-    return transactions
+    if columns:
+        # partial rows don't fit TransactionsResponse; send them as they are
+        return JSONResponse(jsonable_encoder(page))
+    return page
+
+
+# ---------------------------
+# Export
+# ---------------------------
+EXPORT_PAGE_SIZE = 1000
+EXPORT_COLUMNS = (
+    "id", "club_id", "date", "amount", "category", "code", "status",
+    "vendor", "description", "receipt_url", "created_at",
+)
+
+
+@router.get("/club/{club_id}/export")
+async def export_transactions_for_club(
+    club_id: int,
+    request: Request,
+    format: Literal["csv", "ndjson"] = "csv",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    status: Optional[str] = Query(None, description="One status or a comma-separated list"),
+    code: Optional[str] = Query(None, description="One code or a comma-separated list"),
+    category: Optional[str] = Query(None, description="One category or a comma-separated list"),
+):
+    """
+    Download a club's whole ledger, oldest first, as CSV or NDJSON.
+    Rows are read EXPORT_PAGE_SIZE at a time (keyset) and streamed as they
+    arrive, so memory stays flat however long the ledger is. Gzipped when the
+    client sends Accept-Encoding: gzip (curl --compressed).
+    """
+    filters = _club_filters(club_id, date_from, date_to, status, code, category)
+
+    # first page up front: a failing query still gets a proper error status
+    page = await transactions_crud.list_page(
+        EXPORT_PAGE_SIZE, columns=EXPORT_COLUMNS, order_by=LIST_ORDER, filters=filters,
+    )
+
+    def encode(rows: list[dict]) -> str:
+        if format == "csv":
+            buf = io.StringIO()
+            writer = csv.writer(buf, lineterminator="\n")
+            writer.writerows([row.get(c) for c in EXPORT_COLUMNS] for row in rows)
+            return buf.getvalue()
+        return "".join(json.dumps(row, default=str) + "\n" for row in rows)
+
+    async def pages():
+        nonlocal page
+        if format == "csv":
+            yield ",".join(EXPORT_COLUMNS) + "\n"
+        while True:
+            if page["items"]:
+                yield encode(page["items"])
+            if page["next_cursor"] is None:
+                return
+            page = await transactions_crud.list_page(
+                EXPORT_PAGE_SIZE, page["next_cursor"], columns=EXPORT_COLUMNS, order_by=LIST_ORDER, filters=filters,
+            )
+
+    gzipped = "gzip" in request.headers.get("accept-encoding", "").lower()
+
+    async def body():
+        # wbits=31 -> gzip container; one compressor for the whole stream
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzipped else None
+        async for text in pages():
+            chunk = text.encode("utf-8")
+            if compressor is None:
+                yield chunk
+            else:
+                out = compressor.compress(chunk)
+                if out:
+                    yield out
+        if compressor is not None:
+            yield compressor.flush()
+
+    extension, media_type = ("csv", "text/csv") if format == "csv" else ("ndjson", "application/x-ndjson")
+    headers = {
+        "Content-Disposition": f'attachment; filename="club-{club_id}-transactions.{extension}"',
+        "Vary": "Accept-Encoding",
+    }
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body(), media_type=f"{media_type}; charset=utf-8", headers=headers)
 
 
 @router.get("/{transaction_id}", response_model=TransactionsResponse)
@@ -105,7 +405,7 @@ async def get_transaction(transaction_id: str):
     """
     Retrieve a single transaction by its ID.
     """
-    transaction = await run_in_threadpool(transactions_crud.get_by, "id", transaction_id)
+    transaction = await transactions_crud.get_by("id", transaction_id)
 
     if transaction is None:
         raise HTTPException(status_code=404, detail="Transaction not found")
@@ -123,35 +423,38 @@ async def create_transaction(new_transaction: TransactionsCreate):
     - A matching financial period exists
     """
     # Create the transaction
-    created = await run_in_threadpool(transactions_crud.create, new_transaction.model_dump())
+    created = await transactions_crud.create(new_transaction.model_dump())
 
     if created is None:
         raise HTTPException(status_code=500, detail="Failed to create transaction")
+    rollup_cache.invalidate(created['club_id'])
 
-    # Auto-update financials if conditions are met
-    if created['status'] in ['completed', 'approved']:
-        # Check if this code maps to a financial field
-        if created.get('code') and created['code'] in CODE_TO_FINANCIAL_FIELD:
-            # Find the financial record for this transaction's date
-            financial_record = await run_in_threadpool(
-                find_financial_record_for_date,
-                created['club_id'],
-                created['date']
-            )
-            
-            if financial_record:
-                # Update the financial record
-                success = await run_in_threadpool(
-                    update_financial_with_transaction_sync,
-                    financial_record,
-                    created['code'],
-                    str(created['amount'])
-                )
-                
-                if not success:
-                    print(f"Warning: Failed to update financial record for transaction {created['id']}")
-            else:
-                print(f"Warning: No financial record found for date {created['date']}")
+    # Auto-update financials if conditions are met: the period comes from the
+    # local index, the Decimal amount is added atomically by summary id, and
+    # the database re-checks that the summary's period still contains the date
+    if created['status'] in COUNTED_STATUSES:
+        field_name = CODE_TO_FINANCIAL_FIELD.get(created.get('code') or "")
+        if field_name:
+            try:
+                amount = Decimal(str(created['amount']))
+                financial_record = await find_financial_record_for_date(created['club_id'], created['date'])
+                updated = None
+                if financial_record is not None:
+                    rows = await financials_crud.apply_deltas([{
+                        "id": financial_record['id'], "field": field_name, "amount": amount,
+                        "club_id": created['club_id'], "from": created['date'], "to": created['date'],
+                    }])
+                    updated = rows[0] if rows else None
+                if updated is None:
+                    # index is stale (period added, moved or removed elsewhere): let the database find the period
+                    period_index.invalidate(created['club_id'])
+                    updated = await financials_crud.apply_transaction_delta(
+                        created['club_id'], created['date'], field_name, amount,
+                    )
+                if updated is None:
+                    print(f"Warning: No financial record found for date {created['date']}")
+            except Exception as e:
+                print(f"Warning: Failed to update financial record for transaction {created['id']}: {e}")
 
     return created
 
@@ -160,16 +463,19 @@ async def create_transaction(new_transaction: TransactionsCreate):
 async def update_transaction(transaction_id: str, updates: TransactionsUpdate):
     """
     Update fields of an existing transaction.
-    Note: This does NOT automatically update financials. Use with caution.
+    Financials follow: the old amount/code/status/date is taken out of its
+    summary and the new one added to its (possibly different) summary, in the
+    same database transaction as the edit.
     """
-    updated = await run_in_threadpool(
-        transactions_crud.update,
-        transaction_id,
-        updates.model_dump(exclude_unset=True)
+    changes = updates.model_dump(exclude_unset=True)
+    updated = await transactions_crud.update_with_financials(
+        transaction_id, changes, CODE_TO_FINANCIAL_FIELD, COUNTED_STATUSES,
     )
 
     if updated is None:
         raise HTTPException(status_code=404, detail="Transaction not found")
+    # a club change also stales the old club, which we don't know here
+    rollup_cache.invalidate(None if "club_id" in changes else updated["club_id"])
 
     return updated
 
@@ -178,11 +484,15 @@ async def update_transaction(transaction_id: str, updates: TransactionsUpdate):
 async def delete_transaction(transaction_id: str):
     """
     Delete a transaction by its ID.
-    Note: This does NOT automatically update financials. You may need to manually adjust.
+    Its amount is taken back out of its financial summary in the same
+    database transaction.
     """
-    deleted = await run_in_threadpool(transactions_crud.delete, transaction_id)
+    deleted = await transactions_crud.delete_with_financials(
+        transaction_id, CODE_TO_FINANCIAL_FIELD, COUNTED_STATUSES,
+    )
 
-    if not deleted:
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Transaction not found or could not be deleted")
+    rollup_cache.invalidate(deleted["club_id"])
 
     return {"message": "Transaction deleted successfully"}
\ No newline at end of file
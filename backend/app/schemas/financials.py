@@ -53,4 +53,30 @@ class FinancialsResponse(FinancialsBase):
     id: UUID
     club_id: int
     revenue_total: Money
-    expenses_total: Money
\ No newline at end of file
+    expenses_total: Money
+
+
+class FinancialsBulkRow(BaseModel):
+    """
+    Outcome of one input row of POST /financials/bulk (row numbers start at 1).
+    status: inserted | updated | unchanged (already stored as given) |
+            invalid (failed validation) | conflict (period overlaps another
+            summary of the club) | failed (write error)
+    """
+    row: int
+    status: str
+    id: Optional[UUID] = None
+    club_id: Optional[int] = None
+    period_start: Optional[date] = None
+    errors: list[str] = []
+
+
+class FinancialsBulkResponse(BaseModel):
+    received: int
+    inserted: int
+    updated: int
+    unchanged: int
+    invalid: int
+    conflicts: int
+    failed: int
+    rows: list[FinancialsBulkRow]
@@ -0,0 +1,27 @@
+from pydantic import BaseModel
+from typing import Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    """
+    One page of a list endpoint. Pass next_cursor back as ?cursor= for the
+    following page; it is None on the last page.
+    """
+    items: list[T]
+    next_cursor: Optional[str] = None
+
+
+def parse_fields(fields: Optional[str], allowed) -> Optional[list[str]]:
+    """
+    "?fields=id,amount" -> ["id", "amount"]; None means every column.
+    Raises ValueError on a name that isn't a column of the response model.
+    """
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in allowed]
+    if unknown:
+        raise ValueError(f"unknown field(s): {', '.join(unknown)}")
+    return names
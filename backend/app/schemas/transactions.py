@@ -1,6 +1,7 @@
 from pydantic import BaseModel, condecimal
 from typing import Optional
 from datetime import date, datetime
+import datetime as dt
 from decimal import Decimal
 from uuid import UUID
 
@@ -50,7 +51,8 @@ class TransactionsUpdate(BaseModel):
     amount: Optional[Money] = None
     category: Optional[str] = None
     description: Optional[str] = None
-    date: Optional[date] = None
+    # dt.date: with a bare `date` the field's own default (None) shadows the type
+    date: Optional[dt.date] = None
     status: Optional[str] = None
     vendor: Optional[str] = None
     receipt_url: Optional[str] = None
@@ -65,6 +67,30 @@ class TransactionsResponse(TransactionsBase):
     created_at: datetime  # timestamptz from Supabase
 
 
+class TransactionsBulkRow(BaseModel):
+    """
+    Outcome of one input row of POST /transactions/bulk (row numbers start at 1,
+    not counting a CSV header).
+    status:    inserted | invalid (failed validation) | failed (insert error)
+    financial: applied | not_counted (status not completed/approved) |
+               no_mapping (code has no financial field) | no_period | update_failed
+    """
+    row: int
+    status: str
+    id: Optional[UUID] = None
+    financial: Optional[str] = None
+    errors: list[str] = []
+
+
+class TransactionsBulkResponse(BaseModel):
+    received: int
+    inserted: int
+    invalid: int
+    failed: int
+    financial_records_updated: int
+    rows: list[TransactionsBulkRow]
+
+
 # Category mapping for updating financials
 # Maps category names (case-insensitive) to financial field names
 CATEGORY_TO_FINANCIAL_FIELD = {
@@ -1,47 +1,88 @@
-import pdfplumber
+"""
+Account summary PDF -> JSON.
+
+Single statement (writes financial_summary_split.json, as before):
+
+    python app/services/acct-sum-to-json.py financial_report.pdf
+
+A semester's worth, one statement per org, parsed across a process pool:
+
+    python app/services/acct-sum-to-json.py statements/ -o statements.ndjson --workers 8
+
+Batch mode writes one NDJSON record per club-period. The club is the file
+name without extension (e.g. statements/42.pdf -> "42"). Page text is cached
+by the file's sha256 under STATEMENT_CACHE_DIR, so re-running over the same
+directory skips pdfplumber entirely. A statement that fails to open or parse
+is reported and skipped; the rest of the batch still runs.
+"""
+import hashlib
 import json
+import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+from pathlib import Path
+
+STATEMENT_CACHE_DIR = os.getenv(
+    "STATEMENT_CACHE_DIR", str(Path(__file__).resolve().parents[2] / "statement_cache")
+)
+# bump when extract_page_texts changes what it stores
+TEXT_CACHE_VERSION = "1"
+
+# ---------------------------
+# Line patterns (compiled once, not per line)
+# ---------------------------
+NUM_PAT_STR = r"(\$?\(?-?\d[\d,]*\.?\d*\)?|-)"
+NUM_PAT = re.compile(NUM_PAT_STR)
+PERIOD_RANGE_PAT = re.compile(r"(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\s*[-–]\s*(?:\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|Current))")
+PERIOD_START_PAT = re.compile(r'(\d{1,2})[/-](\d{1,2})[/-](\d{4})')
+PERIOD_END_PAT = re.compile(r'[-–]\s*(\d{1,2})[/-](\d{1,2})[/-](\d{4})')
+DATE_HEADER_PAT = re.compile(r"\d{1,2}/\d{1,2}/\d{4}\s*-\s*\d{1,2}/\d{1,2}/\d{4}")
+FINANCIAL_LINE_PAT = re.compile(fr'^(\d{{4}})\s+(.*?)\s+{NUM_PAT_STR}\s+{NUM_PAT_STR}\s*$')
+CODE_LINE_PAT = re.compile(r'^(\d{4})\s+(.*)$')
+HAS_CODE_PAT = re.compile(r"\d{4}")
+REVENUE_PAT = re.compile(r"^Revenue$", re.IGNORECASE)
+EXPENDITURES_PAT = re.compile(r"^Expenditures$", re.IGNORECASE)
+SPACES_PAT = re.compile(r'\s{2,}')
+
 
 def parse_periods_from_header(line):
     """
     Extract date ranges and return structured period information.
-    Example: '7/01/2024 - 6/30/2025  7/01/2025 - Current' 
+    Example: '7/01/2024 - 6/30/2025  7/01/2025 - Current'
     Returns: [
         {"label": "2024_2025", "start": "2024-07-01", "end": "2025-06-30"},
         {"label": "2025_Current", "start": "2025-07-01", "end": null}
     ]
     """
     periods = []
-    matches = re.findall(
-        r"(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\s*[-–]\s*(?:\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|Current))",
-        line
-    )
-    
+    matches = PERIOD_RANGE_PAT.findall(line)
+
     for m in matches:
         # Extract start date
-        start_match = re.search(r'(\d{1,2})[/-](\d{1,2})[/-](\d{4})', m)
-        
+        start_match = PERIOD_START_PAT.search(m)
+
         period_info = {}
-        
+
         if start_match:
             month, day, year = start_match.groups()
             period_info["start"] = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-        
+
         # Check if it ends with 'Current'
         if 'Current' in m:
             period_info["end"] = None
             period_info["label"] = f"{year}_Current" if start_match else "period_Current"
         else:
             # Extract end date
-            end_match = re.search(r'[-–]\s*(\d{1,2})[/-](\d{1,2})[/-](\d{4})', m)
+            end_match = PERIOD_END_PAT.search(m)
             if end_match:
                 end_month, end_day, end_year = end_match.groups()
                 period_info["end"] = f"{end_year}-{end_month.zfill(2)}-{end_day.zfill(2)}"
                 period_info["label"] = f"{year}_{end_year}" if start_match else "period"
-        
+
         periods.append(period_info)
-    
+
     return periods if len(periods) == 2 else [
         {"label": "period_1", "start": None, "end": None},
         {"label": "period_2", "start": None, "end": None}
@@ -52,11 +93,10 @@ def parse_financial_line(line):
     Parses lines like: '5000 Supplies $ - $ -'
     Returns code, description, and two values.
     """
-    line = re.sub(r'\s{2,}', ' ', line.strip())
-    num_pat_str = r"(\$?\(?-?\d[\d,]*\.?\d*\)?|-)"
-    
-    m = re.match(fr'^(\d{{4}})\s+(.*?)\s+{num_pat_str}\s+{num_pat_str}\s*$', line)
-    
+    line = SPACES_PAT.sub(' ', line.strip())
+
+    m = FINANCIAL_LINE_PAT.match(line)
+
     if not m:
         parts = line.split()
         if len(parts) >= 4 and parts[0].isdigit() and len(parts[0]) == 4:
@@ -72,11 +112,11 @@ def parse_financial_line(line):
     # Clean values
     val1 = val1.replace("(", "").replace(")", "").replace("$", "").strip()
     val2 = val2.replace("(", "").replace(")", "").replace("$", "").strip()
-    
+
     # Convert "-" to "0" for numeric fields
     val1 = "0" if val1 == "-" else val1
     val2 = "0" if val2 == "-" else val2
-    
+
     return {
         "code": code.strip(),
         "description": desc.replace("(", "").replace(")", "").replace("$", "").strip(),
@@ -85,112 +125,134 @@ def parse_financial_line(line):
     }
 
 
-def extract_financial_summary(pdf_path, json_path="financial_summary_split.json"):
+# ---------------------------
+# Page text (cached by file hash)
+# ---------------------------
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_page_texts(pdf_path, cache_dir=STATEMENT_CACHE_DIR):
     """
-    Extract financial data and prepare it for two separate tables.
+    -> (one string per page, True if it came from the cache)
+    Pass cache_dir=None to always run pdfplumber.
+    """
+    cache_file = None
+    if cache_dir:
+        cache_file = Path(cache_dir) / f"{_file_sha256(pdf_path)}.v{TEXT_CACHE_VERSION}.json"
+        try:
+            with open(cache_file, encoding="utf-8") as f:
+                return json.load(f), True
+        except (OSError, ValueError):
+            pass
+
+    import pdfplumber
+
+    with pdfplumber.open(pdf_path) as pdf:
+        texts = [page.extract_text() or "" for page in pdf.pages]
+
+    if cache_file is not None:
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            # write-then-rename: workers parsing identical files never see a half-written entry
+            tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(texts, f, ensure_ascii=False)
+            os.replace(tmp, cache_file)
+        except OSError as e:
+            print(f"Warning: could not cache page text for {pdf_path}: {e}")
+    return texts, False
+
+
+def parse_statement(page_texts):
+    """
+    Page texts of one statement -> {"period_1": {...}, "period_2": {...}},
+    each {"period_info": {...}, "data": {"Revenue": [...], "Expenditures": [...]}}.
     """
     periods = [{"label": "period_1", "start": None, "end": None},
                {"label": "period_2", "start": None, "end": None}]
-    
+
     period_1_data = {"Revenue": [], "Expenditures": []}
     period_2_data = {"Revenue": [], "Expenditures": []}
-    
+
     revenue_first_parsed = False
     section = None
     dates_parsed = False
 
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text()
-            if not text:
+    for text in page_texts:
+        if not text:
+            continue
+
+        lines = text.split("\n")
+
+        # Parse date periods once
+        if not dates_parsed:
+            date_header_line = next((l for l in lines if DATE_HEADER_PAT.search(l)), None)
+
+            if date_header_line:
+                periods = parse_periods_from_header(date_header_line)
+                dates_parsed = True
+
+        for line in lines:
+            line = line.strip()
+
+            if "Transfer to Next Year" in line:
+                break
+
+            # Detect sections
+            if REVENUE_PAT.match(line):
+                section = "Revenue"
+                continue
+            elif EXPENDITURES_PAT.match(line):
+                section = "Expenditures"
+                continue
+
+            # Handle first revenue line specially
+            line_norm = SPACES_PAT.sub(' ', line.strip())
+            if section == "Revenue" and not revenue_first_parsed:
+                mcode = CODE_LINE_PAT.match(line_norm)
+                if mcode:
+                    code, rest = mcode.groups()
+                    nums = NUM_PAT.findall(rest)
+
+                    if len(nums) >= 2:
+                        v1, v2 = nums[-2], nums[-1]
+                        cut = rest.rfind(v1)
+                        desc = rest[:cut].strip()
+
+                        v1 = "0" if v1.strip() == "-" else v1.strip()
+                        v2 = "0" if v2.strip() == "-" else v2.strip()
+
+                        # Split into two tables
+                        period_1_data[section].append({"code": code.strip(), "description": desc, "value": v1})
+                        period_2_data[section].append({"code": code.strip(), "description": desc, "value": v2})
+
+                        revenue_first_parsed = True
+                        continue
+
+            if not section or not HAS_CODE_PAT.search(line):
                 continue
 
-            lines = text.split("\n")
-
-            # Parse date periods once
-            if not dates_parsed:
-                date_header_line = next((
-                    l for l in lines if re.search(r"\d{1,2}/\d{1,2}/\d{4}\s*-\s*\d{1,2}/\d{1,2}/\d{4}", l)
-                ), None)
-                
-                if date_header_line:
-                    periods = parse_periods_from_header(date_header_line)
-                    print(f"Found periods: {[p['label'] for p in periods]}")
-                    dates_parsed = True
-
-            for line in lines:
-                line = line.strip()
-
-                if "Transfer to Next Year" in line:
-                    break
-
-                # Detect sections
-                if re.match(r"^Revenue$", line, re.IGNORECASE):
-                    section = "Revenue"
-                    continue
-                elif re.match(r"^Expenditures$", line, re.IGNORECASE):
-                    section = "Expenditures"
-                    continue
-                
-                # Handle first revenue line specially
-                line_norm = re.sub(r'\s{2,}', ' ', line.strip())
-                if section == "Revenue" and not revenue_first_parsed:
-                    mcode = re.match(r'^(\d{4})\s+(.*)$', line_norm)
-                    if mcode:
-                        code, rest = mcode.groups()
-                        num_pat = re.compile(r'(\$?\(?-?\d[\d,]*\.?\d*\)?|-)')
-                        nums = num_pat.findall(rest)
-
-                        if len(nums) >= 2:
-                            v1, v2 = nums[-2], nums[-1]
-                            cut = rest.rfind(v1)
-                            desc = rest[:cut].strip()
-                            
-                            v1 = "0" if v1.strip() == "-" else v1.strip()
-                            v2 = "0" if v2.strip() == "-" else v2.strip()
-
-                            parsed = {
-                                "code": code.strip(),
-                                "description": desc,
-                                "value_period_1": v1,
-                                "value_period_2": v2
-                            }
-                            
-                            # Split into two tables
-                            period_1_data[section].append({
-                                "code": parsed["code"],
-                                "description": parsed["description"],
-                                "value": parsed["value_period_1"]
-                            })
-                            period_2_data[section].append({
-                                "code": parsed["code"],
-                                "description": parsed["description"],
-                                "value": parsed["value_period_2"]
-                            })
-                            
-                            revenue_first_parsed = True
-                            continue
-
-                if not section or not re.search(r"\d{4}", line):
-                    continue
-
-                parsed = parse_financial_line(line)
-                if parsed:
-                    # Add to period 1 table
-                    period_1_data[section].append({
-                        "code": parsed["code"],
-                        "description": parsed["description"],
-                        "value": parsed["value_period_1"]
-                    })
-                    # Add to period 2 table
-                    period_2_data[section].append({
-                        "code": parsed["code"],
-                        "description": parsed["description"],
-                        "value": parsed["value_period_2"]
-                    })
-
-    # Save as two separate table structures
-    output = {
+            parsed = parse_financial_line(line)
+            if parsed:
+                # Add to period 1 table
+                period_1_data[section].append({
+                    "code": parsed["code"],
+                    "description": parsed["description"],
+                    "value": parsed["value_period_1"]
+                })
+                # Add to period 2 table
+                period_2_data[section].append({
+                    "code": parsed["code"],
+                    "description": parsed["description"],
+                    "value": parsed["value_period_2"]
+                })
+
+    return {
         "period_1": {
             "period_info": periods[0],
             "data": period_1_data
@@ -201,12 +263,125 @@ def extract_financial_summary(pdf_path, json_path="financial_summary_split.json"
         }
     }
 
+
+def extract_financial_summary(pdf_path, json_path="financial_summary_split.json", cache_dir=STATEMENT_CACHE_DIR):
+    """
+    Extract financial data and prepare it for two separate tables.
+    """
+    texts, _ = extract_page_texts(pdf_path, cache_dir)
+    output = parse_statement(texts)
+    periods = [output["period_1"]["period_info"], output["period_2"]["period_info"]]
+    print(f"Found periods: {[p['label'] for p in periods]}")
+
     with open(json_path, "w", encoding="utf-8") as f:
         json.dump(output, f, indent=4, ensure_ascii=False)
 
     print(f"Extracted data for two separate tables saved to {json_path}")
     print(f"   Period 1: {periods[0]['label']} ({periods[0]['start']} to {periods[0]['end']})")
     print(f"   Period 2: {periods[1]['label']} ({periods[1]['start']} to {periods[1]['end'] or 'Current'})")
+    return output
+
+
+# ---------------------------
+# Batch mode
+# ---------------------------
+def statement_records(club, source, output):
+    """One record per club-period, in the period_info/data shape json-to-db.py reads."""
+    return [
+        {"club": club, "source": source, "period": key, **output[key]}
+        for key in ("period_1", "period_2")
+    ]
+
+
+def _parse_file(path, cache_dir):
+    """Worker: never raises, so one bad statement can't take down the pool."""
+    path = Path(path)
+    started = time.perf_counter()
+    try:
+        texts, cached = extract_page_texts(path, cache_dir)
+        records = statement_records(path.stem, path.name, parse_statement(texts))
+    except Exception as e:
+        return {"file": str(path), "error": f"{type(e).__name__}: {e}"}
+    return {
+        "file": str(path),
+        "records": records,
+        "pages": len(texts),
+        "cached": cached,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def parse_directory(directory, out_path, workers=None, cache_dir=STATEMENT_CACHE_DIR, pattern="*.pdf"):
+    """
+    Parse every statement in `directory` across `workers` processes (default:
+    CPU count) and write NDJSON to `out_path`, in file-name order. Returns a
+    report; failed files are listed in report["failures"], not raised.
+    """
+    files = sorted(Path(directory).glob(pattern))
+    report = {
+        "files": len(files), "parsed": 0, "failed": 0, "records": 0,
+        "pages": 0, "cached_files": 0, "seconds": 0.0, "pages_per_sec": 0.0, "failures": [],
+    }
+    if not files:
+        print(f"Warning: no {pattern} files in {directory}")
+        return report
+
+    started = time.perf_counter()
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_parse_file, str(f), cache_dir): f for f in files}
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                result = future.result()
+            except Exception as e:
+                # the worker process itself died (e.g. out of memory)
+                result = {"file": str(futures[future]), "error": f"{type(e).__name__}: {e}"}
+            results[result["file"]] = result
+
+            if "error" in result:
+                print(f"[{done}/{len(files)}] FAILED {result['file']}: {result['error']}")
+            else:
+                source = "cache" if result["cached"] else f"{result['seconds']:.2f}s"
+                print(f"[{done}/{len(files)}] {result['file']}: {result['pages']} pages ({source})")
+
+    with open(out_path, "w", encoding="utf-8") as out:
+        for f in files:
+            result = results[str(f)]
+            if "error" in result:
+                report["failed"] += 1
+                report["failures"].append({"file": result["file"], "error": result["error"]})
+                continue
+            report["parsed"] += 1
+            report["pages"] += result["pages"]
+            report["cached_files"] += result["cached"]
+            for record in result["records"]:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                report["records"] += 1
+
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    report["pages_per_sec"] = round(report["pages"] / report["seconds"], 1) if report["seconds"] else 0.0
+    return report
+
 
 if __name__ == "__main__":
-    extract_financial_summary("financial_report.pdf")
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default="financial_report.pdf", help="a statement PDF, or a directory of them")
+    parser.add_argument("-o", "--output", help="JSON file (single statement) or NDJSON file (directory)")
+    parser.add_argument("--workers", type=int, default=None, help="processes for a directory (default: CPU count)")
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the page-text cache")
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else STATEMENT_CACHE_DIR
+    if Path(args.path).is_dir():
+        out = args.output or "statements.ndjson"
+        result = parse_directory(args.path, out, args.workers, cache)
+        print(f"\n{result['parsed']}/{result['files']} statements -> {result['records']} records in {out}")
+        print(f"{result['pages']} pages in {result['seconds']}s ({result['pages_per_sec']} pages/sec, "
+              f"{result['cached_files']} statements from cache)")
+        for failure in result["failures"]:
+            print(f"FAILED {failure['file']}: {failure['error']}")
+        raise SystemExit(1 if result["failures"] else 0)
+
+    extract_financial_summary(args.path, args.output or "financial_summary_split.json", cache)
@@ -1,8 +1,34 @@
+"""
+Load parsed account statements into financial_summaries.
+
+Reads the NDJSON that acct-sum-to-json.py writes for a directory of
+statements (one record per club-period), or the single-statement JSON it
+writes for one PDF, maps the line codes to summary fields with CODE_MAP and
+upserts the periods through POST /financials/bulk, keyed on
+(club_id, period_start). The server validates each row with FinancialsCreate
+and skips rows identical to what is stored, so re-running a load is safe.
+
+    python app/services/json-to-db.py statements.ndjson
+    python app/services/json-to-db.py exports/ --workers 8
+    python app/services/json-to-db.py financial_summary_split.json --club-id 3
+
+The club is the record's club_id, else its "club" (the statement's file name)
+when that is a number, else --club-id. A "Current" period has no end date on
+the statement; it is stored as running to the end of its fiscal year (one year
+from its start) unless --current-end says otherwise.
+"""
 import json
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+from pathlib import Path
+
 import requests
 
 # Your FastAPI server URL
-API_URL = "http://localhost:8000/financials/"
+BULK_API_URL = "http://localhost:8000/financials/bulk"
+BATCH_SIZE = 500        # rows per request; a club's periods always share a request
+WORKERS = 4             # requests in flight
 
 # Simple mapping: PDF code -> Schema field name
 CODE_MAP = {
@@ -10,7 +36,7 @@ CODE_MAP = {
     "3300": "revenue_donations",
     "3311": "revenue_fundraising",
     "3325": "revenue_sponsorship",
-    
+
     # Expense codes
     "5520": "expense_food",
     "6413": "expense_giveaway",
@@ -24,16 +50,16 @@ def clean_value(value_string):
     # If it's empty or just a dash, return zero
     if not value_string or value_string.strip() == "-":
         return "0.00"
-    
+
     # Remove commas and dollar signs
     clean = value_string.replace(",", "").replace("$", "").strip()
-    
+
     return clean
 
 def create_record_for_period(period_data, club_id):
     """
     Take data for ONE period and create a record that matches your schema.
-    
+
     period_data looks like:
     {
         "period_info": {"start": "2024-07-01", "end": "2025-06-30"},
@@ -43,7 +69,7 @@ def create_record_for_period(period_data, club_id):
         }
     }
     """
-    
+
     # Start with a blank record - all zeros
     record = {
         "club_id": club_id,
@@ -57,93 +83,188 @@ def create_record_for_period(period_data, club_id):
         "expense_giveaway": "0.00",
         "expense_uniforms": "0.00",
     }
-    
+
     # Fill in Revenue values
     for item in period_data['data']['Revenue']:
         code = item['code']
         value = clean_value(item['value'])
-        
+
         # Special case: cash balance forward
         if code == "3981":
             record["current_balance"] = value
-        
+
         # If this code is in our map, save its value
         if code in CODE_MAP:
             field_name = CODE_MAP[code]
             record[field_name] = value
-    
+
     # Fill in Expense values
     for item in period_data['data']['Expenditures']:
         code = item['code']
         value = clean_value(item['value'])
-        
+
         # If this code is in our map, save its value
         if code in CODE_MAP:
             field_name = CODE_MAP[code]
             record[field_name] = value
-    
+
+    return record
+
+
+# ---------------------------
+# Reading statement files
+# ---------------------------
+def _club_id(record, default):
+    for value in (record.get("club_id"), record.get("club")):
+        if isinstance(value, int) or (isinstance(value, str) and value.strip().isdigit()):
+            return int(value)
+    if default is None:
+        raise ValueError(f"no numeric club_id or club ({record.get('club')!r}); pass --club-id")
+    return default
+
+
+def _close_open_period(record, current_end):
+    if record["period_end"] is None and record["period_start"]:
+        if current_end is not None:
+            record["period_end"] = current_end.isoformat()
+        else:
+            start = date.fromisoformat(record["period_start"])
+            record["period_end"] = (start.replace(year=start.year + 1) - timedelta(days=1)).isoformat()
     return record
 
-def upload_to_api(json_file, club_id):
+
+def read_statements(path, club_id=None, current_end=None):
     """
-    Read the JSON file and upload both periods to your FastAPI.
+    Yield (source, summary record or None, error) for every period in one
+    file: NDJSON (one club-period per line) or a statement JSON
+    ({"period_1": ..., "period_2": ...}). Bad lines are yielded as errors,
+    not raised, so one corrupt record doesn't stop the load.
     """
-    
-    # Load the JSON file
-    with open(json_file, 'r') as f:
+    path = Path(path)
+
+    def one(source, period_data, default_club):
+        try:
+            cid = _club_id(period_data, default_club)
+            return source, _close_open_period(create_record_for_period(period_data, cid), current_end), None
+        except (KeyError, TypeError, ValueError) as e:
+            return source, None, f"{type(e).__name__}: {e}"
+
+    if path.suffix in (".ndjson", ".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for n, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                source = f"{path.name}:{n}"
+                try:
+                    period_data = json.loads(line)
+                except ValueError as e:
+                    yield source, None, f"not JSON: {e}"
+                    continue
+                yield one(source, period_data, club_id)
+        return
+
+    with open(path, encoding="utf-8") as f:
         data = json.load(f)
-    
-    print(f"\nUploading financial data for club {club_id}...")
-    print("=" * 60)
-    
-    # Process Period 1
-    print("\nCreating Period 1...")
-    period_1_record = create_record_for_period(data['period_1'], club_id)
-    
-    response = requests.post(API_URL, json=period_1_record)
-    
-    if response.status_code == 200:
-        result = response.json()
-        print(f"Success! Record ID: {result['id']}")
-        print(f"Period: {result['period_start']} to {result['period_end']}")
-        print(f"Balance: ${result['current_balance']}")
-        print(f"Total Revenue: ${result['revenue_total']}")
-        print(f"Total Expenses: ${result['expenses_total']}")
-    else:
-        print(f"Failed: {response.status_code}")
-        print(f"Error: {response.text}")
-    
-    # Process Period 2
-    print("\nCreating Period 2...")
-    period_2_record = create_record_for_period(data['period_2'], club_id)
-    
-    response = requests.post(API_URL, json=period_2_record)
-    
-    if response.status_code == 200:
-        result = response.json()
-        print(f"Success! Record ID: {result['id']}")
-        print(f"Period: {result['period_start']} to {result['period_end']}")
-        print(f"Balance: ${result['current_balance']}")
-        print(f"Total Revenue: ${result['revenue_total']}")
-        print(f"Total Expenses: ${result['expenses_total']}")
-    else:
-        print(f"Failed: {response.status_code}")
-        print(f"Error: {response.text}")
-    
-    print("\n✨ Done!")
+    # a single statement for one club: the club comes from --club-id or the file name
+    default_club = club_id if club_id is not None else (int(path.stem) if path.stem.isdigit() else None)
+    for key in ("period_1", "period_2"):
+        if key in data:
+            yield one(f"{path.name}:{key}", data[key], default_club)
+
+
+def _batches(records, size):
+    """Batches of about `size` rows that never split a club across requests."""
+    by_club = {}
+    for source, record in records:
+        by_club.setdefault(record["club_id"], []).append((source, record))
+    batch = []
+    for rows in by_club.values():
+        if batch and len(batch) + len(rows) > size:
+            yield batch
+            batch = []
+        batch.extend(rows)
+    if batch:
+        yield batch
+
+
+def load_statements(paths, club_id=None, current_end=None, api_url=BULK_API_URL, batch_size=BATCH_SIZE, workers=WORKERS):
+    """
+    Upsert every period in `paths` (files, or directories of .ndjson/.jsonl/.json).
+    Returns {"inserted", "updated", "unchanged", "invalid", "conflicts",
+    "failed", "unreadable", "problems": [(source, status, errors)]}.
+    """
+    files = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            files += sorted(f for f in p.iterdir() if f.suffix in (".ndjson", ".jsonl", ".json"))
+        else:
+            files.append(p)
+
+    summary = {"inserted": 0, "updated": 0, "unchanged": 0, "invalid": 0,
+               "conflicts": 0, "failed": 0, "unreadable": 0, "problems": []}
+
+    # later files win over earlier ones for the same club and period
+    latest = {}
+    for f in files:
+        try:
+            for source, record, error in read_statements(f, club_id, current_end):
+                if error is not None:
+                    summary["unreadable"] += 1
+                    summary["problems"].append((source, "unreadable", [error]))
+                    continue
+                latest[(record["club_id"], record["period_start"])] = (source, record)
+        except (OSError, ValueError) as e:
+            summary["unreadable"] += 1
+            summary["problems"].append((str(f), "unreadable", [str(e)]))
+
+    print(f"{len(latest)} club-periods from {len(files)} file(s)")
+
+    def send(batch):
+        response = requests.post(api_url, json=[record for _, record in batch], timeout=300)
+        response.raise_for_status()
+        return response.json()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(send, batch): batch for batch in _batches(latest.values(), batch_size)}
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                report = future.result()
+            except Exception as e:
+                summary["failed"] += len(batch)
+                summary["problems"].append((f"{batch[0][0]} .. {batch[-1][0]}", "failed", [str(e)]))
+                continue
+            for key in ("inserted", "updated", "unchanged", "invalid", "conflicts", "failed"):
+                summary[key] += report[key]
+            for row in report["rows"]:
+                if row["status"] in ("invalid", "conflict", "failed"):
+                    summary["problems"].append((batch[row["row"] - 1][0], row["status"], row["errors"]))
+
+    return summary
+
 
 # Run it!
 if __name__ == "__main__":
-    print("Financial Data Uploader")
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="NDJSON/JSON statement files, or directories of them")
+    parser.add_argument("--club-id", type=int, help="club for records that don't carry a numeric one")
+    parser.add_argument("--current-end", type=date.fromisoformat, help="end date (YYYY-MM-DD) for 'Current' periods")
+    parser.add_argument("--api-url", default=BULK_API_URL)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+
+    print("Financial Data Loader")
     print("=" * 60)
-    
-    # Ask for inputs
-    json_file = input("Enter JSON file path (press Enter for 'financial_summary_split.json'): ").strip()
-    if not json_file:
-        json_file = "financial_summary_split.json"
-    
-    club_id = input("Enter club ID (number): ").strip()
-    club_id = int(club_id)
-    
-    # Do the upload
-    upload_to_api(json_file, club_id)
\ No newline at end of file
+    result = load_statements(args.paths, args.club_id, args.current_end, args.api_url, args.batch_size, args.workers)
+
+    for source, status, errors in result["problems"]:
+        print(f"  ✗ {source}: {status} - {'; '.join(errors)}")
+    print("\n" + "=" * 60)
+    print(f"   ✓ {result['inserted']} inserted, {result['updated']} updated, {result['unchanged']} unchanged")
+    if result["invalid"] or result["conflicts"] or result["failed"] or result["unreadable"]:
+        print(f"   ✗ {result['invalid']} invalid, {result['conflicts']} conflicts, "
+              f"{result['failed']} failed, {result['unreadable']} unreadable")
+    sys.exit(1 if result["problems"] else 0)
@@ -0,0 +1,75 @@
+"""
+Background warmup and readiness for app/api.py.
+
+Importing the app stays cheap; the expensive steps (loading the embedding
+model, the first retrieval round trip) run on a daemon thread after startup.
+A step that fails is retried with backoff, so a Supabase blip at boot delays
+readiness instead of leaving the process cold for good. /ready reports the
+timings and flips to 200 once every step has succeeded.
+"""
+import threading
+import time
+
+
+class Warmup:
+    def __init__(self, max_backoff: float = 30.0):
+        self.max_backoff = max_backoff
+        self.timings: dict[str, float] = {}
+        self.errors: dict[str, str] = {}
+        self.attempts: dict[str, int] = {}
+        self.pending: list[str] = []
+        self._started: float | None = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def record(self, name: str, seconds: float):
+        """Add a duration measured elsewhere (e.g. module import) to the report."""
+        with self._lock:
+            self.timings[name] = round(seconds, 3)
+
+    def start(self, steps: list[tuple[str, callable]]):
+        """Run `steps` ([(name, fn)], in order) on a daemon thread."""
+        self.pending = [name for name, _ in steps]
+        self._started = time.perf_counter()
+        threading.Thread(target=self._run, args=(steps,), name="warmup", daemon=True).start()
+
+    def _run(self, steps):
+        for name, fn in steps:
+            delay = 1.0
+            while True:
+                started = time.perf_counter()
+                with self._lock:
+                    self.attempts[name] = self.attempts.get(name, 0) + 1
+                try:
+                    fn()
+                except Exception as e:
+                    with self._lock:
+                        self.errors[name] = repr(e)
+                    print(f"[startup] {name} failed (retrying in {delay:.0f}s):", repr(e))
+                    time.sleep(delay)
+                    delay = min(delay * 2, self.max_backoff)
+                    continue
+                with self._lock:
+                    self.timings[name] = round(time.perf_counter() - started, 3)
+                    self.errors.pop(name, None)
+                    self.pending.remove(name)
+                break
+
+        with self._lock:
+            self.timings["ready_after"] = round(time.perf_counter() - self._started, 3)
+        self._ready.set()
+        print("[startup] ready |", " | ".join(f"{k} {v:.2f}s" for k, v in self.timings.items()))
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "timings_seconds": dict(self.timings),
+                "pending": list(self.pending),
+                "attempts": dict(self.attempts),
+                "errors": dict(self.errors),
+            }
@@ -0,0 +1,107 @@
+"""
+Rollup cost at ledger scale: the vectorized pass in app/analytics.py against
+the straightforward per-row loop (strptime + Decimal + dict accumulation).
+
+Builds --rows synthetic transactions over --periods monthly periods, in the
+column-list shape app.analytics.fetch_columns produces, runs both, and checks
+that every (period, code, category, status) total matches to the cent.
+No Supabase needed.
+
+    cd backend
+    python -m benchmarks.analytics_rollup --rows 200000
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+CODES = {
+    "3300": "revenue_donations",
+    "3311": "revenue_fundraising",
+    "3325": "revenue_sponsorship",
+    "5520": "expense_food",
+    "6413": "expense_giveaway",
+    "5751": "expense_uniforms",
+}
+CATEGORIES = ["Donations", "Fundraising", "Sponsorship", "Food", "Giveaway", "Uniforms", "Misc"]
+STATUSES = ["completed", "approved", "pending", "rejected"]
+
+
+def synthetic(rows: int, periods: int, seed: int = 7):
+    from app.period_index import PeriodIndex
+
+    rng = random.Random(seed)
+    first = date(2020, 1, 1)
+    summaries, start = [], first
+    for i in range(periods):
+        end = (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        summaries.append({"id": f"period-{i}", "period_start": start.isoformat(), "period_end": end.isoformat()})
+        start = end + timedelta(days=1)
+    span = (start - first).days + 30      # some dates fall after the last period
+
+    columns = {"date": [], "amount": [], "code": [], "category": [], "status": []}
+    codes = list(CODES) + [None]
+    for _ in range(rows):
+        columns["date"].append((first + timedelta(days=rng.randrange(span))).isoformat())
+        columns["amount"].append(f"{rng.randint(1, 500_000) / 100:.2f}")
+        columns["code"].append(rng.choice(codes))
+        columns["category"].append(rng.choice(CATEGORIES))
+        columns["status"].append(rng.choice(STATUSES))
+    return columns, PeriodIndex(summaries)
+
+
+def loop_rollup(columns: dict, periods) -> dict:
+    """Per-row reference: {(period_id, code, category, status): (count, Decimal total)}."""
+    out = {}
+    for day, amount, code, category, status in zip(
+        columns["date"], columns["amount"], columns["code"], columns["category"], columns["status"]
+    ):
+        summary = periods.find(datetime.strptime(day, "%Y-%m-%d").date())
+        key = (summary["id"] if summary else None, code, category, status)
+        count, total = out.get(key, (0, Decimal("0")))
+        out[key] = (count + 1, total + Decimal(amount))
+    return out
+
+
+def timed(fn, repeat: int):
+    samples, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--periods", type=int, default=48)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from app.analytics import rollup
+
+    print(f"building {args.rows:,} transactions over {args.periods} periods...")
+    columns, periods = synthetic(args.rows, args.periods)
+
+    loop_s, expected = timed(lambda: loop_rollup(columns, periods), args.repeat)
+    vec_s, result = timed(lambda: rollup(columns, periods, CODES), args.repeat)
+
+    got = {
+        (r["period_id"], r["code"], r["category"], r["status"]): (r["count"], Decimal(r["total"]))
+        for r in result["rows"]
+    }
+    ok = got == expected
+
+    print(f"{'':<12}{'seconds':>10}{'rows/s':>14}")
+    print(f"{'loop':<12}{loop_s:>10.3f}{args.rows / loop_s:>14,.0f}")
+    print(f"{'vectorized':<12}{vec_s:>10.3f}{args.rows / vec_s:>14,.0f}")
+    print(f"speedup {loop_s / vec_s:.1f}x, {len(got)} groups, totals {'match' if ok else 'DIFFER'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Input tokens and latency per turn over a 10-turn /chat conversation, for both
+CHAT_PROMPT_MODE values (see app/api.py):
+  history: PREFACE + PROMPT_TEMPLATE + 5 chunks sent, and kept in history, every turn
+  turn:    PREFACE as system instruction, chunks only on the current message
+
+Offline by default: retrieval returns five fixed ~700-char chunks and Gemini is
+a fake session that counts tokens as chars/4 and sleeps
+--base-ms + --ms-per-1k-tokens per call. With --live, turns go to the real
+Gemini model (GOOGLE_API_KEY) and tokens come from usage_metadata.
+
+The session store's history budget is turned off unless --keep-budget, so
+the numbers show the prompt mode alone.
+
+    cd backend
+    python -m benchmarks.chat_turns
+    python -m benchmarks.chat_turns --live --retrieve
+"""
+import argparse
+import json
+import os
+import time
+
+QUESTIONS = [
+    "how do reimbursements work",
+    "what receipts do I need for that",
+    "how long does it take to get the money back",
+    "can we pay a vendor directly instead",
+    "what is account code 3311 used for",
+    "how do I deposit fundraising money",
+    "are there limits on cash handling at events",
+    "who can sign for the organization's account",
+    "what are the rules for buying food for an event",
+    "thanks, anything else I should know",
+]
+
+def _docs(question: str, retrieve: bool):
+    from benchmarks.fakes import fixed_docs
+
+    if retrieve:
+        from ai.retrieval import retrieve_docs
+        return retrieve_docs(question, 5)
+    return fixed_docs()
+
+
+def run(mode: str, args) -> list[dict]:
+    from app import api
+
+    if args.live:
+        import google.generativeai as genai
+
+        system = api.PREFACE if mode == "turn" else None
+        session = genai.GenerativeModel(api.MODEL_NAME, system_instruction=system).start_chat(history=list(api._SEED_HISTORY))
+    else:
+        system = api.PREFACE if mode == "turn" else ""
+        from benchmarks.fakes import FakeChat
+
+        session = FakeChat(system, api._SEED_HISTORY, args.base_ms, args.ms_per_1k_tokens)
+
+    rows = []
+    for n, question in enumerate(QUESTIONS, 1):
+        prompt = api._turn_prompt(question, _docs(question, args.retrieve), mode=mode)
+        started = time.perf_counter()
+        resp = session.send_message(prompt, generation_config=api.GEN_CFG)
+        ms = (time.perf_counter() - started) * 1000
+        tokens = resp.usage_metadata.prompt_token_count if args.live else session.last_prompt_tokens
+        api._finish_turn(session, question, mode=mode)
+        rows.append({"turn": n, "input_tokens": tokens, "latency_ms": round(ms, 1)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="call Gemini instead of the fake session")
+    parser.add_argument("--retrieve", action="store_true", help="use real retrieval instead of fixed chunks")
+    parser.add_argument("--keep-budget", action="store_true", help="keep CHAT_HISTORY_TURNS / CHAT_HISTORY_TOKENS trimming")
+    parser.add_argument("--base-ms", type=float, default=300.0, help="fake Gemini: fixed latency per call")
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=40.0, help="fake Gemini: latency per 1k input tokens")
+    args = parser.parse_args()
+
+    if not args.live:
+        os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+    from app import api
+
+    if not args.keep_budget:
+        api.chats.max_turns = 0
+        api.chats.max_tokens = 0
+
+    results = {mode: run(mode, args) for mode in ("history", "turn")}
+
+    print(f"{'turn':>4} | {'history tok':>11} {'ms':>8} | {'turn tok':>9} {'ms':>8}")
+    for old, new in zip(results["history"], results["turn"]):
+        print(f"{old['turn']:>4} | {old['input_tokens']:>11} {old['latency_ms']:>8.1f} | {new['input_tokens']:>9} {new['latency_ms']:>8.1f}")
+    summary = {
+        mode: {
+            "total_input_tokens": sum(r["input_tokens"] for r in rows),
+            "last_turn_input_tokens": rows[-1]["input_tokens"],
+            "total_latency_ms": round(sum(r["latency_ms"] for r in rows), 1),
+        }
+        for mode, rows in results.items()
+    }
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Requests/sec of the CRUD layer at 50 / 200 / 1000 concurrent clients:
+  threadpool: CRUDBase (sync) wrapped in run_in_threadpool, what the routers used to do
+  async:      AsyncCRUDBase awaited directly, what the routers do now
+
+Runs against a tiny in-process fake PostgREST with injected latency, so no
+Supabase project is needed.
+
+    cd backend
+    python -m benchmarks.crud_concurrency --latency-ms 30 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+
+ROWS = [{"id": i, "name": f"Club {i}", "email": f"club{i}@sdsu.edu", "club_type": "academic"} for i in range(10)]
+
+
+# ---------------------------
+# Fake PostgREST upstream
+# ---------------------------
+async def _handle(reader, writer, latency: float):
+    body = json.dumps(ROWS).encode()
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            if length:
+                await reader.readexactly(length)
+            await asyncio.sleep(latency)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def start_fake_upstream(latency: float) -> int:
+    """Serve the fake upstream on its own loop/thread; returns the port."""
+    ready = threading.Event()
+    port = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(
+            asyncio.start_server(lambda r, w: _handle(r, w, latency), "127.0.0.1", 0, backlog=4096)
+        )
+        port["value"] = server.sockets[0].getsockname()[1]
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return port["value"]
+
+
+# ---------------------------
+# Load generator
+# ---------------------------
+async def _drive(call, concurrency: int, total: int) -> float:
+    remaining = total
+
+    async def client():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await call()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return total / (time.perf_counter() - start)
+
+
+async def run(concurrency_levels, total: int, latency: float):
+    from starlette.concurrency import run_in_threadpool
+    from app.crud.crud_base import CRUDBase, AsyncCRUDBase
+    from app.pool import get_client, get_async_client, pool_stats
+
+    port = start_fake_upstream(latency)
+    url, key = f"http://127.0.0.1:{port}", "bench-" + "k" * 32
+    sync_crud = CRUDBase("clubs", get_client(url, key))
+    async_crud = AsyncCRUDBase("clubs", get_async_client(url, key))
+
+    # warm both pools
+    await run_in_threadpool(sync_crud.get_all)
+    await async_crud.get_all()
+
+    results = []
+    for c in concurrency_levels:
+        threaded = await _drive(lambda: run_in_threadpool(sync_crud.get_all), c, total)
+        native = await _drive(async_crud.get_all, c, total)
+        results.append({"concurrency": c, "threadpool_rps": round(threaded, 1), "async_rps": round(native, 1)})
+        print(f"{c:>5} clients | threadpool {threaded:9.1f} req/s | async {native:9.1f} req/s | x{native / threaded:.2f}")
+
+    print(json.dumps(pool_stats(), indent=2))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--requests", type=int, default=2000, help="requests per run")
+    parser.add_argument("--latency-ms", type=float, default=30.0, help="injected upstream latency")
+    parser.add_argument("--pool-size", type=int, default=None, help="overrides SUPABASE_POOL_SIZE")
+    args = parser.parse_args()
+
+    if args.pool_size:
+        os.environ["SUPABASE_POOL_SIZE"] = str(args.pool_size)
+
+    asyncio.run(run(args.concurrency, args.requests, args.latency_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+torch (sentence-transformers) vs onnx (int8 onnxruntime) embedding backends.
+
+Parity, both backends loaded side by side:
+  cosine agreement  cos(torch vector, onnx vector) for the same text, queries and passages
+  top-k overlap     |top-k passages (torch) ∩ top-k passages (onnx)| / k per query
+
+Speed and memory, each backend in its own fresh process so peak RSS and load
+time are not polluted by the other:
+  load_seconds, passages/sec (embed_documents), queries/sec + p50 (embed_query), peak_rss_mb
+
+Passages come from the local index (python -m ai.local_index) or, failing
+that, from splitting the PDFs under DATA_DIR. Needs the ONNX export
+(python -m ai.onnx_embeddings).
+
+    cd backend
+    python -m benchmarks.embedding_backends --passages 300 --k 5
+"""
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.retrieval_latency import QUERIES
+
+BACKENDS = ("torch", "onnx")
+
+
+def _load(backend: str):
+    if backend == "onnx":
+        from ai.onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings()
+    from langchain_huggingface import HuggingFaceEmbeddings
+    from ai.settings import EMBED_MODEL
+    return HuggingFaceEmbeddings(model_name=EMBED_MODEL, encode_kwargs={"normalize_embeddings": True})
+
+
+def _passages(limit: int) -> list[str]:
+    from ai.local_index import LocalIndex
+    try:
+        texts = [c["content"] for c in LocalIndex.load().chunks]
+    except FileNotFoundError:
+        from ai.indexing import load_documents, split_documents, sanitize
+        texts = [d.page_content for d in sanitize(split_documents(load_documents()))]
+    if not texts:
+        raise SystemExit("no passages: build the local index or put PDFs under DATA_DIR")
+    return texts[:limit]
+
+
+def _queries() -> list[str]:
+    return ["query: " + q for q in QUERIES]
+
+
+# ---------------------------
+# Speed / memory (child process)
+# ---------------------------
+def measure(backend: str, passages: int, query_runs: int) -> dict:
+    texts = _passages(passages)
+    started = time.perf_counter()
+    model = _load(backend)
+    model.embed_query("query: warmup")
+    load_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    model.embed_documents(texts)
+    docs_per_sec = len(texts) / (time.perf_counter() - started)
+
+    queries, samples = _queries(), []
+    for i in range(query_runs):
+        t0 = time.perf_counter()
+        model.embed_query(queries[i % len(queries)])
+        samples.append(time.perf_counter() - t0)
+
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 2),
+        "passages_per_sec": round(docs_per_sec, 1),
+        "queries_per_sec": round(len(samples) / sum(samples), 1),
+        "query_p50_ms": round(statistics.median(samples) * 1000, 2),
+        # ru_maxrss is KiB on Linux (bytes on macOS)
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+# ---------------------------
+# Parity (both backends in this process)
+# ---------------------------
+def parity(passages: int, k: int) -> dict:
+    texts, queries = _passages(passages), _queries()
+    vectors = {}
+    for backend in BACKENDS:
+        model = _load(backend)
+        vectors[backend] = (
+            np.asarray(model.embed_documents(queries), dtype=np.float32),
+            np.asarray(model.embed_documents(texts), dtype=np.float32),
+        )
+    (tq, tp), (oq, op) = vectors["torch"], vectors["onnx"]
+
+    q_cos = (tq * oq).sum(axis=1)
+    p_cos = (tp * op).sum(axis=1)
+    k = min(k, len(texts))
+    top_t = np.argsort(tq @ tp.T, axis=1)[:, ::-1][:, :k]
+    top_o = np.argsort(oq @ op.T, axis=1)[:, ::-1][:, :k]
+    overlap = [len(set(a) & set(b)) / k for a, b in zip(top_t.tolist(), top_o.tolist())]
+
+    return {
+        "passages": len(texts),
+        "queries": len(queries),
+        "query_cosine_mean": round(float(q_cos.mean()), 4),
+        "query_cosine_min": round(float(q_cos.min()), 4),
+        "passage_cosine_mean": round(float(p_cos.mean()), 4),
+        "passage_cosine_min": round(float(p_cos.min()), 4),
+        f"top{k}_overlap_mean": round(statistics.fmean(overlap), 3),
+        "top1_agreement": round(float((top_t[:, 0] == top_o[:, 0]).mean()), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--passages", type=int, default=300)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--query-runs", type=int, default=100)
+    parser.add_argument("--skip-parity", action="store_true")
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.passages, args.query_runs)))
+        return
+
+    results = {"speed": []}
+    for backend in BACKENDS:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.embedding_backends", "--worker", backend,
+             "--passages", str(args.passages), "--query-runs", str(args.query_runs)],
+            capture_output=True, text=True,
+        )
+        if out.returncode != 0:
+            print(f"[{backend}] failed:\n{out.stderr.strip()}")
+            continue
+        row = json.loads(out.stdout.strip().splitlines()[-1])
+        results["speed"].append(row)
+        print(
+            f"{backend:>5} | load {row['load_seconds']:6.2f}s | {row['passages_per_sec']:7.1f} passages/s | "
+            f"{row['queries_per_sec']:7.1f} queries/s (p50 {row['query_p50_ms']} ms) | peak RSS {row['peak_rss_mb']} MB"
+        )
+
+    if not args.skip_parity:
+        results["parity"] = parity(args.passages, args.k)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
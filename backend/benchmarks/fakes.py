@@ -0,0 +1,296 @@
+"""
+Offline stand-ins shared by the benchmarks:
+
+  FakeChat           just enough of genai.ChatSession (history, token count, latency)
+  FakeGeminiModel    GenerativeModel whose start_chat returns a FakeChat
+  FakeEmbeddings     deterministic unit vectors with injected latency per call
+  fixed_docs()       five ~700-char handbook chunks instead of real retrieval
+  start_fake_supabase(tables, latency)
+                     an in-process PostgREST over plain dicts: select, order,
+                     limit, eq/neq/gt/gte/lt/lte/in/is filters and or=/and=
+                     trees (the keyset cursors of app/crud/crud_base.py),
+                     plus a match_* retrieval RPC
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+EMBED_DIM = 768
+
+CHUNK = (
+    "Student organizations must submit a check request with original itemized receipts "
+    "within 30 days of purchase. Requests are reviewed by the Associated Students "
+    "finance office and paid from the organization's agency account. "
+) * 3
+
+
+# ---------------------------
+# Gemini / retrieval
+# ---------------------------
+class FakeChat:
+    """Just enough of genai.ChatSession: history in, history out, tokens ~ chars/4."""
+
+    def __init__(self, system: str, history: list, base_ms: float, ms_per_1k: float):
+        self.system = system
+        self.history = list(history)
+        self.base_ms = base_ms
+        self.ms_per_1k = ms_per_1k
+        self.last_prompt_tokens = 0
+
+    @staticmethod
+    def _chars(message) -> int:
+        return sum(len(p.get("text", "")) for p in message["parts"])
+
+    def send_message(self, prompt: str, generation_config=None):
+        sent = len(self.system) + sum(self._chars(m) for m in self.history) + len(prompt)
+        self.last_prompt_tokens = sent // 4
+        time.sleep((self.base_ms + self.ms_per_1k * self.last_prompt_tokens / 1000) / 1000)
+        answer = "Here's what I found: submit a check request with itemized receipts within 30 days."
+        self.history += [{"role": "user", "parts": [{"text": prompt}]}, {"role": "model", "parts": [{"text": answer}]}]
+        return answer
+
+
+class FakeGeminiModel:
+    def __init__(self, system: str, base_ms: float, ms_per_1k: float):
+        self.system, self.base_ms, self.ms_per_1k = system, base_ms, ms_per_1k
+
+    def start_chat(self, history=None):
+        return FakeChat(self.system, list(history or []), self.base_ms, self.ms_per_1k)
+
+
+def fixed_docs(count: int = 5):
+    from langchain_core.documents import Document
+
+    return [Document(page_content="passage: " + CHUNK, metadata={"source": "handbook.pdf", "page": i}) for i in range(count)]
+
+
+class FakeEmbeddings:
+    """Deterministic unit vectors per text; each model call costs `latency` seconds."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def embed_query(self, text: str) -> list[float]:
+        import numpy as np
+
+        time.sleep(self.latency)
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+        v = np.random.default_rng(seed).standard_normal(EMBED_DIM)
+        return (v / np.linalg.norm(v)).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_query(t) for t in texts]
+
+
+# ---------------------------
+# Supabase (PostgREST)
+# ---------------------------
+def dataset(clubs: int, transactions: int) -> dict[str, list[dict]]:
+    """Rows shaped like the real tables, enough to pass the response models."""
+    money = lambda cents: f"{cents // 100}.{cents % 100:02d}"
+    tables = {"clubs": [], "financial_summaries": [], "transactions": []}
+    for cid in range(1, clubs + 1):
+        tables["clubs"].append({
+            "id": cid, "name": f"Club {cid}", "email": f"club{cid}@sdsu.edu", "description": None,
+            "status": "active", "club_type": "academic", "link": None,
+        })
+        for year in range(2022, 2026):
+            fields = {f: money((cid * 7919 + year * 104729 + i * 31) % 500_000) for i, f in enumerate((
+                "current_balance", "revenue_donations", "revenue_fundraising", "revenue_sponsorship",
+                "expense_food", "expense_giveaway", "expense_uniforms",
+            ))}
+            tables["financial_summaries"].append({
+                "id": str(uuid.uuid5(uuid.NAMESPACE_OID, f"summary-{cid}-{year}")), "club_id": cid,
+                "period_start": f"{year}-07-01", "period_end": f"{year + 1}-06-30", **fields,
+                "revenue_total": "0.00", "expenses_total": "0.00",
+            })
+    first = date(2022, 7, 1)
+    for n in range(transactions):
+        tables["transactions"].append({
+            "id": str(uuid.uuid5(uuid.NAMESPACE_OID, f"transaction-{n}")), "club_id": 1 + n % clubs,
+            "amount": money(100 + n * 37 % 250_000), "category": "Food", "description": f"purchase {n}",
+            "date": (first + timedelta(days=n % 1000)).isoformat(), "status": "completed",
+            "vendor": None, "receipt_url": None, "code": "5520", "created_at": "2025-01-01T00:00:00+00:00",
+        })
+    return tables
+
+
+def _split(text: str) -> list[str]:
+    """Split a PostgREST logic tree on top-level commas (not inside () or "")."""
+    parts, depth, quoted, start, i = [], 0, False, 0, 0
+    while i < len(text):
+        ch = text[i]
+        if quoted:
+            if ch == "\\":
+                i += 1
+            elif ch == '"':
+                quoted = False
+        elif ch == '"':
+            quoted = True
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+        i += 1
+    parts.append(text[start:])
+    return parts
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return value
+
+
+def _sort_key(cell, value: str | None = None):
+    """Numbers compare as numbers, everything else (dates, uuids, text) as text."""
+    if isinstance(cell, (int, float, Decimal)) and not isinstance(cell, bool):
+        try:
+            return 0, Decimal(str(cell)) if value is None else Decimal(value)
+        except InvalidOperation:
+            pass
+    if value is not None:
+        return 1, value
+    return 1, str(cell).lower() if isinstance(cell, bool) else str(cell)
+
+
+def _condition(column: str, spec: str):
+    """col + "op.value" -> predicate on a row."""
+    op, _, value = spec.partition(".")
+    if op == "not":
+        inner = _condition(column, value)
+        return lambda row: not inner(row)
+    if op == "is":
+        want = {"null": None, "true": True, "false": False}[value]
+        return lambda row: row.get(column) is want
+    if op == "in":
+        wanted = {_unquote(v) for v in _split(value.strip("()"))}
+        return lambda row: row.get(column) is not None and str(row[column]) in wanted
+    value = _unquote(value)
+    compare = {
+        "eq": lambda a, b: a == b, "neq": lambda a, b: a != b,
+        "gt": lambda a, b: a > b, "gte": lambda a, b: a >= b,
+        "lt": lambda a, b: a < b, "lte": lambda a, b: a <= b,
+    }[op]
+    return lambda row: row.get(column) is not None and compare(_sort_key(row[column]), _sort_key(row[column], value))
+
+
+def _tree(kind: str, body: str):
+    """or=(a.gt.1,and(a.eq.1,b.gt.2)) -> predicate."""
+    terms = []
+    for term in _split(body.strip()[1:-1]):
+        if term.startswith(("and(", "or(")):
+            name, _, rest = term.partition("(")
+            terms.append(_tree(name, "(" + rest))
+        else:
+            column, _, spec = term.partition(".")
+            terms.append(_condition(column, spec))
+    combine = all if kind == "and" else any
+    return lambda row: combine(t(row) for t in terms)
+
+
+def _respond(method: str, target: str, headers: dict, tables: dict) -> tuple[int, object]:
+    url = urlsplit(target)
+    path = unquote(url.path).removeprefix("/rest/v1/")
+    params = parse_qsl(url.query)
+
+    if path.startswith("rpc/"):
+        # match_* retrieval RPC: match_count chunks; other RPCs answer an empty set
+        return 200, [
+            {"content": CHUNK, "metadata": {"source": "handbook.pdf", "page": i}, "similarity": 0.9 - i / 100}
+            for i in range(5)
+        ] if path.startswith("rpc/match_") else []
+
+    rows = tables.get(path, [])
+    columns, order, limit, offset = None, [], None, 0
+    for key, value in params:
+        if key == "select":
+            columns = None if value == "*" else value.split(",")
+        elif key == "order":
+            order = [part.split(".") for part in value.split(",")]
+        elif key == "limit":
+            limit = int(value)
+        elif key == "offset":
+            offset = int(value)
+        elif key in ("or", "and"):
+            match = _tree(key, value)
+            rows = [r for r in rows if match(r)]
+        else:
+            match = _condition(key, value)
+            rows = [r for r in rows if match(r)]
+
+    # stable sorts from the last key to the first; nulls last, as PostgREST's default for asc
+    for column, *flags in reversed(order):
+        desc = "desc" in flags
+        present = [r for r in rows if r.get(column) is not None]
+        missing = [r for r in rows if r.get(column) is None]
+        rows = sorted(present, key=lambda r: _sort_key(r[column]), reverse=desc)
+        rows = (missing + rows) if ("nullsfirst" in flags or (desc and "nullslast" not in flags)) else (rows + missing)
+    rows = rows[offset:offset + limit] if limit is not None else rows[offset:]
+    if columns is not None:
+        rows = [{c: r.get(c) for c in columns} for r in rows]
+
+    if "vnd.pgrst.object" in headers.get("accept", ""):
+        if len(rows) != 1:
+            return 406, {"code": "PGRST116", "message": "JSON object requested, multiple (or no) rows returned",
+                         "details": f"The result contains {len(rows)} rows", "hint": None}
+        return 200, rows[0]
+    return 200, rows
+
+
+async def _handle(reader, writer, tables: dict, latency: float):
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            request_line, *lines = head.decode("latin-1").split("\r\n")
+            method, target, _ = request_line.split(" ", 2)
+            headers = {}
+            for line in lines:
+                if ":" in line:
+                    name, value = line.split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            if length:
+                await reader.readexactly(length)
+            await asyncio.sleep(latency)
+            status, payload = _respond(method, target, headers, tables)
+            body = json.dumps(payload).encode()
+            writer.write(
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n".encode()
+                + b"Content-Type: application/json\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def start_fake_supabase(tables: dict, latency: float) -> int:
+    """Serve the fake PostgREST on its own loop/thread; returns the port."""
+    ready = threading.Event()
+    port = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(
+            asyncio.start_server(lambda r, w: _handle(r, w, tables, latency), "127.0.0.1", 0, backlog=4096)
+        )
+        port["value"] = server.sockets[0].getsockname()[1]
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return port["value"]
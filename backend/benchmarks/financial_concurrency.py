@@ -0,0 +1,95 @@
+"""
+Concurrency check for the atomic financial increments (sql/financial_summaries.sql).
+
+Fires --requests POST /transactions/ calls, --concurrency at a time, through the
+ASGI app (no server needed) against the configured Supabase project. Every
+transaction lands in one scratch period, so they all race on the same summary
+row. Afterwards the summary field must have grown by exactly the Decimal sum of
+the amounts: a lost update or float rounding would make it differ.
+
+The scratch period (default 2099-01) and the transactions are deleted again.
+
+    cd backend
+    python -m benchmarks.financial_concurrency --club-id 1 --requests 300
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import date
+from decimal import Decimal
+
+FIELD = "revenue_fundraising"
+CODE = "3311"
+ZERO_FIELDS = (
+    "current_balance", "revenue_donations", "revenue_fundraising", "revenue_sponsorship",
+    "expense_food", "expense_giveaway", "expense_uniforms",
+)
+
+
+async def run(club_id: int, total: int, concurrency: int, period_start: date, period_end: date) -> bool:
+    import httpx
+    from fastapi import FastAPI
+    from app.routers import transactions
+    from app.crud.financials import async_financials_crud
+    from app.crud.transactions import async_transactions_crud
+
+    app = FastAPI()
+    app.include_router(transactions.router)
+
+    summary = await async_financials_crud.create(
+        {"club_id": club_id, "period_start": period_start, "period_end": period_end, **{f: "0" for f in ZERO_FIELDS}}
+    )
+    amounts = [Decimal(random.randint(1, 99_999)) / 100 for _ in range(total)]
+    created_ids: list[str] = []
+    limit = asyncio.Semaphore(concurrency)
+
+    async def create(client, i: int, amount: Decimal):
+        async with limit:
+            resp = await client.post("/transactions/", json={
+                "club_id": club_id,
+                "amount": str(amount),
+                "category": "Fundraising",
+                "description": f"concurrency check #{i}",
+                "date": period_start.isoformat(),
+                "status": "completed",
+                "code": CODE,
+            })
+            resp.raise_for_status()
+            created_ids.append(resp.json()["id"])
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(create(client, i, a) for i, a in enumerate(amounts)))
+            elapsed = time.perf_counter() - started
+
+        after = await async_financials_crud.get_by("id", summary["id"])
+        expected, got = sum(amounts, Decimal("0")), Decimal(str(after[FIELD]))
+        ok = got == expected
+        print(f"{total} creates, {concurrency} in flight: {total / elapsed:.1f} creates/s")
+        print(f"{FIELD}: expected {expected}, got {got} -> {'OK' if ok else 'MISMATCH (lost updates)'}")
+        return ok
+    finally:
+        for i in range(0, len(created_ids), 200):
+            await async_transactions_crud.table.delete().in_("id", created_ids[i:i + 200]).execute()
+        await async_financials_crud.delete(summary["id"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--club-id", type=int, required=True, help="an existing club; the scratch period is attached to it")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--period-start", type=date.fromisoformat, default=date(2099, 1, 1))
+    parser.add_argument("--period-end", type=date.fromisoformat, default=date(2099, 1, 31))
+    args = parser.parse_args()
+
+    ok = asyncio.run(run(args.club_id, args.requests, args.concurrency, args.period_start, args.period_end))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Randomized consistency check for the financial delta maintenance
+(sql/financial_summaries.sql): after any sequence of transaction creates,
+edits and deletes, every summary must equal a from-scratch aggregate of the
+ledger.
+
+Runs --steps random operations (seeded, reproducible with --seed) through the
+ASGI app (no server needed) against the configured Supabase project. Edits
+change amount, code, status, date and club at random, so amounts move between
+periods, in and out of counted statuses and between clubs; some dates fall in
+the gap between periods. Every --check-every steps the scratch summaries are
+compared with app.reconcile's aggregate (a dry run) of the ledger, and the
+first mismatch stops the run with the seed and step to replay it.
+
+The scratch periods (2099-01, 2099-02, 2099-04 for two clubs) and the
+transactions are deleted again. tests/test_financial_deltas.py checks the
+SQL functions themselves against a model (pytest, with DATABASE_URL).
+
+    cd backend
+    python -m benchmarks.financial_consistency --club-id 1 --other-club-id 2 --steps 500
+"""
+import argparse
+import asyncio
+import random
+import sys
+from datetime import date
+from decimal import Decimal
+
+ZERO_FIELDS = (
+    "current_balance", "revenue_donations", "revenue_fundraising", "revenue_sponsorship",
+    "expense_food", "expense_giveaway", "expense_uniforms",
+)
+PERIODS = ((date(2099, 1, 1), date(2099, 1, 31)), (date(2099, 2, 1), date(2099, 2, 28)), (date(2099, 4, 1), date(2099, 4, 30)))
+STATUSES = ("completed", "approved", "pending", "rejected")
+
+
+def _random_fields(rng: random.Random, clubs: list[int], codes: list) -> dict:
+    return {
+        "club_id": rng.choice(clubs),
+        "amount": str(Decimal(rng.randint(1, 99_999)) / 100),
+        "date": date(2099, rng.randint(1, 5), rng.randint(1, 28)).isoformat(),
+        "status": rng.choice(STATUSES),
+        "code": rng.choice(codes),
+        "category": "Consistency check",
+    }
+
+
+async def mismatches(clubs: list[int], code_fields: dict) -> list[dict]:
+    from app.crud.financials import async_financials_crud
+    from app.financial_codes import COUNTED_STATUSES
+    from app.reconcile import club_diffs
+
+    out = []
+    for club_id in clubs:
+        result = await async_financials_crud.reconcile_club(club_id, code_fields, COUNTED_STATUSES)
+        out += [d for d in club_diffs(club_id, result) if d["period_start"] >= PERIODS[0][0].isoformat()]
+    return out
+
+
+async def run(clubs: list[int], steps: int, seed: int, check_every: int) -> bool:
+    import httpx
+    from fastapi import FastAPI
+    from app.routers import transactions
+    from app.financial_codes import CODE_TO_FINANCIAL_FIELD
+    from app.crud.financials import async_financials_crud
+    from app.crud.transactions import async_transactions_crud
+
+    app = FastAPI()
+    app.include_router(transactions.router)
+
+    rng = random.Random(seed)
+    codes = list(CODE_TO_FINANCIAL_FIELD) + [None, "9999"]
+    summaries = [
+        await async_financials_crud.create(
+            {"club_id": club_id, "period_start": start, "period_end": end, **{f: "0" for f in ZERO_FIELDS}}
+        )
+        for club_id in clubs for start, end in PERIODS
+    ]
+    live: list[str] = []
+    created: set[str] = set()
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+            for step in range(1, steps + 1):
+                roll = rng.random()
+                if roll < 0.4 or not live:
+                    resp = await client.post("/transactions/", json={**_random_fields(rng, clubs, codes), "description": f"step {step}"})
+                    resp.raise_for_status()
+                    live.append(resp.json()["id"])
+                    created.add(live[-1])
+                elif roll < 0.8:
+                    changes = {k: v for k, v in _random_fields(rng, clubs, codes).items() if rng.random() < 0.5}
+                    resp = await client.patch(f"/transactions/{rng.choice(live)}", json=changes)
+                    resp.raise_for_status()
+                else:
+                    resp = await client.delete(f"/transactions/{live.pop(rng.randrange(len(live)))}")
+                    resp.raise_for_status()
+
+                if step % check_every == 0 or step == steps:
+                    bad = await mismatches(clubs, CODE_TO_FINANCIAL_FIELD)
+                    if bad:
+                        print(f"MISMATCH after step {step} (seed {seed}):")
+                        for d in bad:
+                            print(f"  club {d['club_id']} {d['period_start']} {d['field']}: stored {d['stored']}, ledger {d['expected']}")
+                        return False
+                    print(f"step {step}: {len(live)} live transactions, summaries match the ledger")
+        return True
+    finally:
+        ids = sorted(created)
+        for i in range(0, len(ids), 200):
+            await async_transactions_crud.table.delete().in_("id", ids[i:i + 200]).execute()
+        for summary in summaries:
+            await async_financials_crud.delete(summary["id"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--club-id", type=int, required=True, help="an existing club; scratch periods are attached to it")
+    parser.add_argument("--other-club-id", type=int, help="a second club, so edits also move transactions between clubs")
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--check-every", type=int, default=50)
+    args = parser.parse_args()
+
+    clubs = [args.club_id] + ([args.other_club_id] if args.other_club_id else [])
+    ok = asyncio.run(run(clubs, args.steps, args.seed, args.check_every))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+p50/p99 latency of the two retrieval engines behind ai.retrieval.retrieve_context:
+the match_banking_handbook RPC and the in-process local index.
+
+Queries are embedded once up front (the query-embedding cache would hide the
+model anyway), so only the search itself is timed. Needs Supabase env vars for
+the RPC run and a built local index (python -m ai.local_index) for the local one.
+
+    cd backend
+    python -m benchmarks.retrieval_latency --runs 200 --k 5
+"""
+import argparse
+import statistics
+import time
+
+QUERIES = [
+    "how do reimbursements work",
+    "how do I submit a check request",
+    "what is account code 3311 used for",
+    "who can sign for the organization's account",
+    "how do I deposit fundraising money",
+    "what are the rules for buying food for an event",
+]
+
+
+def _percentiles(samples: list[float]) -> dict:
+    q = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50_ms": round(q[49] * 1000, 2), "p99_ms": round(q[98] * 1000, 2), "mean_ms": round(statistics.fmean(samples) * 1000, 2)}
+
+
+def run(backend: str, embeddings: list[list[float]], k: int, runs: int) -> dict:
+    from ai import retrieval
+
+    retrieval.RETRIEVAL_BACKEND = backend
+    retrieval._search(embeddings[0], k)  # warm (pool connection / mmap pages)
+
+    samples = []
+    for i in range(runs):
+        started = time.perf_counter()
+        retrieval._search(embeddings[i % len(embeddings)], k)
+        samples.append(time.perf_counter() - started)
+    return _percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--backends", nargs="+", default=["rpc", "local"], choices=["rpc", "local"])
+    args = parser.parse_args()
+
+    from ai.embeddings import embed_query
+
+    embeddings = [embed_query(q) for q in QUERIES]
+    for backend in args.backends:
+        print(f"{backend:>6}: {run(backend, embeddings, args.k, args.runs)}")
+
+
+if __name__ == "__main__":
+    main()
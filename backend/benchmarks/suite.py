@@ -0,0 +1,257 @@
+"""
+Benchmark suite for the request paths: embed_query, retrieve_context prompt
+assembly, the whole /chat handler and the CRUD routes. Each case is timed
+per call (p50/p90/p99) and for throughput at --concurrency callers.
+
+Everything runs in-process against stand-ins with injected latency, so no
+Supabase project, Gemini key or embedding model is needed:
+  Supabase:   a fake PostgREST (tables + match_banking_handbook RPC), --supabase-ms per request
+  embeddings: deterministic unit vectors, --embed-ms per model call (cache hits skip it)
+  Gemini:     a fake chat session, --gemini-ms + --gemini-ms-per-1k-tokens
+(all in benchmarks/fakes.py)
+
+Results are written as JSON (--output). With a baseline (--baseline, saved by
+--save-baseline) every case is compared against it, and a throughput drop or
+p99 rise beyond --tolerance is flagged and makes the run exit 1. Baselines are
+only comparable on the same machine with the same injected latencies; the
+comparison warns when those differ.
+
+    cd backend
+    python -m benchmarks.suite --save-baseline
+    python -m benchmarks.suite                    # compare against it
+    python -m benchmarks.suite --only chat --iterations 500
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# ---------------------------
+# Stand-ins
+# ---------------------------
+def install_fakes(args, port: int):
+    """Point the app at the stand-ins. Must run before app/ai are imported."""
+    os.environ.update({
+        "SUPABASE_URL": f"http://127.0.0.1:{port}",
+        "SUPABASE_SERVICE_ROLE_KEY": "bench-" + "k" * 32,
+        "GOOGLE_API_KEY": "offline-benchmark",
+        "RETRIEVAL_BACKEND": "rpc",
+        "RETRIEVAL_MODE": "dense",
+        "EMBED_CACHE_DIR": "",
+    })
+    if args.crud_cache_ttl is not None:
+        os.environ["CRUD_CACHE_TTL"] = str(args.crud_cache_ttl)
+
+    import ai.embeddings
+    from app import api
+    from benchmarks.fakes import FakeEmbeddings, FakeGeminiModel
+
+    fake = FakeEmbeddings(args.embed_ms / 1000)
+    ai.embeddings.get_embeddings = lambda: fake
+    system = api.PREFACE if api.CHAT_PROMPT_MODE == "turn" else ""
+    api._chat_model = lambda: FakeGeminiModel(system, args.gemini_ms, args.gemini_ms_per_1k_tokens)
+
+
+# ---------------------------
+# Cases
+# ---------------------------
+def build_cases(args) -> dict:
+    """name -> async callable taking the call number."""
+    import httpx
+    from ai.embeddings import embed_query
+    from ai.retrieval import build_prompt, retrieve_context
+    from app import api
+    from benchmarks.chat_turns import QUESTIONS
+    from benchmarks.fakes import fixed_docs
+    from benchmarks.retrieval_latency import QUERIES
+
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://bench")
+    docs = fixed_docs()
+
+    async def get(url: str):
+        resp = await client.get(url)
+        resp.raise_for_status()
+
+    async def post_chat(question: str, session: str):
+        resp = await client.post("/chat", json={"session_id": session, "user_message": question})
+        resp.raise_for_status()
+
+    def club(n: int) -> int:
+        return 1 + n % args.clubs
+
+    return {
+        # a new text every call -> model call + cache insert
+        "embed_query/miss": lambda n: asyncio.to_thread(embed_query, f"{QUERIES[n % len(QUERIES)]} #{n}"),
+        "embed_query/hit": lambda n: asyncio.to_thread(embed_query, QUERIES[0]),
+        "prompt_assembly": lambda n: asyncio.to_thread(
+            lambda: api._turn_prompt(QUERIES[n % len(QUERIES)], docs) + build_prompt(QUERIES[n % len(QUERIES)], docs)
+        ),
+        "retrieve_context": lambda n: asyncio.to_thread(retrieve_context, QUERIES[n % len(QUERIES)], 5),
+        # unique questions miss the answer cache: embed + retrieval + Gemini
+        "chat/miss": lambda n: post_chat(f"{QUESTIONS[n % len(QUESTIONS)]} #{n}", f"bench-{n % 50}"),
+        # the answer cache only serves a session's first turn -> a new session per call
+        "chat/hit": lambda n: post_chat(QUESTIONS[0], f"bench-hit-{n}"),
+        "GET /clubs/": lambda n: get("/clubs/?limit=100"),
+        "GET /clubs/{id}": lambda n: get(f"/clubs/{club(n)}"),
+        "GET /financials/all/{id}": lambda n: get(f"/financials/all/{club(n)}"),
+        "GET /transactions/club/{id}": lambda n: get(f"/transactions/club/{club(n)}?limit=100"),
+    }
+
+
+async def measure(call, iterations: int, concurrency: int, warmup: int) -> dict:
+    for n in range(warmup):
+        await call(-1 - n)
+
+    samples: list[float] = []
+    counter = iter(range(iterations))
+
+    async def caller():
+        for n in counter:
+            started = time.perf_counter()
+            await call(n)
+            samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    q = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "iterations": len(samples),
+        "concurrency": concurrency,
+        "ops_per_sec": round(len(samples) / wall, 1),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 2),
+        "p50_ms": round(q[49] * 1000, 2),
+        "p90_ms": round(q[89] * 1000, 2),
+        "p99_ms": round(q[98] * 1000, 2),
+    }
+
+
+async def run(args) -> dict:
+    cases = build_cases(args)
+    selected = [name for name in cases if not args.only or any(s in name for s in args.only)]
+    results = {}
+    # retrieve_context prints its documents; keep that out of the report, not out of the timing
+    with open(os.devnull, "w") as devnull:
+        for name in selected:
+            try:
+                with contextlib.redirect_stdout(devnull):
+                    results[name] = await measure(cases[name], args.iterations, args.concurrency, args.warmup)
+            except Exception as e:
+                results[name] = {"error": f"{type(e).__name__}: {e}"}
+            print(_row(name, results[name]), flush=True)
+    return results
+
+
+# ---------------------------
+# Reporting / baseline
+# ---------------------------
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def _row(name: str, r: dict, extra: str = "") -> str:
+    if "error" in r:
+        return f"{name:<30} ERROR {r['error']}"
+    return (f"{name:<30}{r['ops_per_sec']:>10.1f}{r['p50_ms']:>10.2f}{r['p90_ms']:>10.2f}"
+            f"{r['p99_ms']:>10.2f}{extra}")
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[dict]:
+    """One entry per case present in both runs; regression when throughput or p99 moves past tolerance."""
+    out = []
+    for name, now in current["cases"].items():
+        before = baseline["cases"].get(name)
+        if before is None or "error" in now or "error" in before:
+            continue
+        ops = now["ops_per_sec"] / before["ops_per_sec"] - 1 if before["ops_per_sec"] else 0.0
+        p99 = now["p99_ms"] / before["p99_ms"] - 1 if before["p99_ms"] else 0.0
+        out.append({
+            "case": name,
+            "ops_per_sec_change": round(ops, 4),
+            "p99_change": round(p99, 4),
+            "regression": ops < -tolerance or p99 > tolerance,
+        })
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", help="run cases whose name contains any of these")
+    parser.add_argument("--iterations", type=int, default=300, help="timed calls per case")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed calls per case first")
+    parser.add_argument("--concurrency", type=int, default=8, help="callers in flight per case")
+    parser.add_argument("--supabase-ms", type=float, default=20.0, help="fake Supabase: latency per request")
+    parser.add_argument("--embed-ms", type=float, default=15.0, help="fake embeddings: latency per model call")
+    parser.add_argument("--gemini-ms", type=float, default=300.0, help="fake Gemini: fixed latency per call")
+    parser.add_argument("--gemini-ms-per-1k-tokens", type=float, default=40.0, help="fake Gemini: latency per 1k input tokens")
+    parser.add_argument("--clubs", type=int, default=200, help="clubs in the fake tables (route ids cycle through them)")
+    parser.add_argument("--transactions", type=int, default=20_000, help="transactions in the fake table")
+    parser.add_argument("--crud-cache-ttl", type=float, default=None, help="overrides CRUD_CACHE_TTL (0 = every read hits Supabase)")
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR / "latest.json")
+    parser.add_argument("--baseline", type=Path, default=RESULTS_DIR / "baseline.json")
+    parser.add_argument("--save-baseline", action="store_true", help="also write these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative throughput drop / p99 rise")
+    args = parser.parse_args()
+
+    from benchmarks.fakes import dataset, start_fake_supabase
+
+    tables = dataset(args.clubs, args.transactions)
+    install_fakes(args, start_fake_supabase(tables, args.supabase_ms / 1000))
+
+    config = {k: getattr(args, k) for k in (
+        "iterations", "warmup", "concurrency", "supabase_ms", "embed_ms", "gemini_ms",
+        "gemini_ms_per_1k_tokens", "clubs", "transactions", "crud_cache_ttl",
+    )}
+    print(f"{'case':<30}{'ops/s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    cases = asyncio.run(run(args))
+    current = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "config": config,
+        "cases": cases,
+    }
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(current, indent=2))
+    print(f"\nresults -> {args.output}")
+
+    regressed = False
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(current, indent=2))
+        print(f"baseline -> {args.baseline}")
+    elif args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("config") != config or baseline.get("machine") != current["machine"]:
+            print("Warning: baseline was recorded with different settings or on another machine; deltas are not comparable")
+        print(f"\nvs baseline {args.baseline} ({baseline.get('commit')}, {baseline.get('created_at')}), tolerance {args.tolerance:.0%}")
+        for d in compare(current, baseline, args.tolerance):
+            flag = "  REGRESSION" if d["regression"] else ""
+            print(f"{d['case']:<30} ops/s {d['ops_per_sec_change']:>+8.1%}   p99 {d['p99_change']:>+8.1%}{flag}")
+            regressed |= d["regression"]
+    else:
+        print(f"no baseline at {args.baseline}; run with --save-baseline to record one")
+
+    errors = [name for name, r in cases.items() if "error" in r]
+    sys.exit(1 if regressed or errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+-- Database functions for financial_summaries, called over PostgREST RPC by
+-- app/crud/financials.py. Idempotent: run the whole file in the Supabase SQL
+-- editor (or psql) after changing it.
+--
+-- Amounts are added with "col = col + amount" inside a single UPDATE, so the
+-- read and the write happen under the row lock: concurrent transactions for
+-- the same period serialize on the row instead of overwriting each other, and
+-- numeric arithmetic keeps every cent.
+
+-- Columns a transaction amount may be added to (see CODE_TO_FINANCIAL_FIELD).
+create or replace function financial_delta_field(p_field text)
+returns text
+language plpgsql
+immutable
+as $$
+begin
+  if p_field not in (
+    'revenue_donations', 'revenue_fundraising', 'revenue_sponsorship',
+    'expense_food', 'expense_giveaway', 'expense_uniforms'
+  ) then
+    raise exception 'unknown financial field: %', p_field using errcode = '22023';
+  end if;
+  return p_field;
+end;
+$$;
+
+
+-- Add p_amount to p_field of the club's summary whose period contains p_date.
+-- Returns the updated row, or no row when no period contains the date.
+create or replace function apply_transaction_delta(
+  p_club_id bigint,
+  p_date date,
+  p_field text,
+  p_amount numeric
+)
+returns setof financial_summaries
+language plpgsql
+as $$
+begin
+  return query execute format(
+    'update financial_summaries
+        set %1$I = coalesce(%1$I, 0) + $1
+      where id = (
+        select id from financial_summaries
+         where club_id = $2 and $3 between period_start and period_end
+         order by period_start desc
+         limit 1
+      )
+      returning *',
+    financial_delta_field(p_field)
+  ) using p_amount, p_club_id, p_date;
+end;
+$$;
+
+
+-- Apply many deltas in one call and one database transaction (all or none).
+-- p_deltas: [{"id": "<summary uuid>", "field": "expense_food", "amount": "12.50"}, ...]
+-- An element may also carry "club_id", "from" and "to" (the dates of the
+-- transactions it sums): it is then applied only if that summary still
+-- belongs to the club and its period covers from..to, so an id picked from a
+-- stale in-process period index can't book an amount to the wrong period.
+-- Returns the updated rows (one per applied delta; ids that don't exist or
+-- fail the check are skipped, for the caller to retry by date).
+-- Callers should sort by id so concurrent batches lock rows in the same order.
+create or replace function apply_financial_deltas(p_deltas jsonb)
+returns setof financial_summaries
+language plpgsql
+as $$
+declare
+  d jsonb;
+begin
+  for d in select value from jsonb_array_elements(p_deltas) loop
+    return query execute format(
+      'update financial_summaries set %1$I = coalesce(%1$I, 0) + $1
+        where id = $2
+          and ($3 is null or (club_id = $3 and $4 >= period_start and $5 <= period_end))
+       returning *',
+      financial_delta_field(d->>'field')
+    ) using (d->>'amount')::numeric, (d->>'id')::uuid,
+            (d->>'club_id')::bigint, (d->>'from')::date, (d->>'to')::date;
+  end loop;
+end;
+$$;
+
+
+-- No two summaries of a club may cover the same day: every transaction date
+-- maps to at most one period. Checked by the database, so concurrent creates
+-- (other workers, bulk loads) can't slip past the API's own overlap check.
+-- Fails if overlapping periods already exist; GET /financials/coverage/{club_id}
+-- lists them.
+create extension if not exists btree_gist;
+
+do $$
+begin
+  if not exists (select 1 from pg_constraint where conname = 'financial_summaries_no_overlap') then
+    alter table financial_summaries
+      add constraint financial_summaries_no_overlap
+      exclude using gist (club_id with =, daterange(period_start, period_end, '[]') with &&);
+  end if;
+end;
+$$;
+
+
+-- The (summary id, field, signed amount) one transaction row contributes, as
+-- an apply_financial_deltas element; null when it contributes nothing
+-- (status not counted, unmapped code, or no period contains its date).
+-- p_code_fields: {"3300": "revenue_donations", ...}, p_counted: {completed,approved}
+-- (both passed in by app/crud/transactions.py so the mapping lives in one place).
+create or replace function transaction_financial_delta(
+  t transactions,
+  p_sign numeric,
+  p_code_fields jsonb,
+  p_counted text[]
+)
+returns jsonb
+language plpgsql
+stable
+as $$
+declare
+  v_field text;
+  v_summary uuid;
+begin
+  if t.id is null or t.status is null or not (t.status = any(p_counted)) then
+    return null;
+  end if;
+  v_field := p_code_fields->>coalesce(t.code, '');
+  if v_field is null then
+    return null;
+  end if;
+  select id into v_summary from financial_summaries
+   where club_id = t.club_id and t.date between period_start and period_end
+   order by period_start desc
+   limit 1;
+  if v_summary is null then
+    return null;
+  end if;
+  return jsonb_build_object('id', v_summary, 'field', v_field, 'amount', p_sign * t.amount);
+end;
+$$;
+
+
+-- Take the old row's contribution out and put the new one in, in one call.
+-- Deltas hitting the same (summary, field) are summed first and applied in id
+-- order, so concurrent edits lock summaries in the same order.
+create or replace function apply_transaction_change(
+  p_old transactions,
+  p_new transactions,
+  p_code_fields jsonb,
+  p_counted text[]
+)
+returns void
+language plpgsql
+as $$
+declare
+  v_deltas jsonb;
+begin
+  select coalesce(jsonb_agg(jsonb_build_object('id', id, 'field', field, 'amount', amount) order by id, field), '[]')
+    into v_deltas
+    from (
+      select d->>'id' as id, d->>'field' as field, sum((d->>'amount')::numeric) as amount
+        from unnest(array[
+               transaction_financial_delta(p_old, -1, p_code_fields, p_counted),
+               transaction_financial_delta(p_new, 1, p_code_fields, p_counted)
+             ]) as d
+       where d is not null
+       group by 1, 2
+      having sum((d->>'amount')::numeric) <> 0
+    ) s;
+  perform apply_financial_deltas(v_deltas);
+end;
+$$;
+
+
+-- PATCH /transactions/{id}: update the row and move its amount between
+-- summaries (old amount/code/status/date out, new in) in one database
+-- transaction. The row lock makes concurrent edits of one transaction queue
+-- up instead of both subtracting the same old amount.
+-- p_changes: the changed columns only, e.g. {"amount": "12.50", "status": "approved"}.
+-- Returns the updated row, or no row if the id doesn't exist.
+create or replace function update_transaction_with_financials(
+  p_id uuid,
+  p_changes jsonb,
+  p_code_fields jsonb,
+  p_counted text[]
+)
+returns setof transactions
+language plpgsql
+as $$
+declare
+  v_old transactions;
+  v_new transactions;
+begin
+  select * into v_old from transactions where id = p_id for update;
+  if not found then
+    return;
+  end if;
+
+  v_new := jsonb_populate_record(v_old, p_changes);
+  update transactions set
+    club_id = v_new.club_id,
+    amount = v_new.amount,
+    category = v_new.category,
+    description = v_new.description,
+    date = v_new.date,
+    status = v_new.status,
+    vendor = v_new.vendor,
+    receipt_url = v_new.receipt_url,
+    code = v_new.code
+   where id = p_id
+  returning * into v_new;
+
+  perform apply_transaction_change(v_old, v_new, p_code_fields, p_counted);
+  return next v_new;
+end;
+$$;
+
+
+-- DELETE /transactions/{id}: delete the row and take its amount back out of
+-- its summary in one database transaction. Returns the deleted row.
+create or replace function delete_transaction_with_financials(
+  p_id uuid,
+  p_code_fields jsonb,
+  p_counted text[]
+)
+returns setof transactions
+language plpgsql
+as $$
+declare
+  v_old transactions;
+begin
+  delete from transactions where id = p_id returning * into v_old;
+  if not found then
+    return;
+  end if;
+
+  perform apply_transaction_change(v_old, null, p_code_fields, p_counted);
+  return next v_old;
+end;
+$$;
+
+
+-- One summary per club and period start: the key POST /financials/bulk
+-- (app/services/json-to-db.py) upserts on. Fails if duplicates already exist;
+-- GET /financials/coverage/{club_id} lists them.
+create unique index if not exists financial_summaries_club_period_start_key
+  on financial_summaries (club_id, period_start);
+
+
+-- Summaries loaded from account statements (upsert_financial_summaries, i.e.
+-- app/services/json-to-db.py) start from the statement's figures, which the
+-- transactions ledger doesn't reproduce; reconcile_club_financials leaves
+-- them alone unless asked to.
+alter table financial_summaries add column if not exists from_statement boolean not null default false;
+
+
+-- Insert or update many summaries in one call, keyed on
+-- (club_id, period_start). Rows whose stored values already match are not
+-- written at all, so re-loading the same statements changes nothing.
+-- p_rows: [{"club_id": 3, "period_start": "2024-07-01", "period_end": ..., "current_balance": ..., ...}]
+-- with unique (club_id, period_start); returns one row per input row with
+-- action inserted | updated | unchanged | conflict (id is null for unchanged
+-- and conflict). A row whose period would overlap another summary of the club
+-- (financial_summaries_no_overlap) is a conflict, with the database's detail
+-- in error; the other rows are still written.
+drop function if exists upsert_financial_summaries(jsonb);
+create or replace function upsert_financial_summaries(p_rows jsonb)
+returns table (id uuid, club_id bigint, period_start date, action text, error text)
+language plpgsql
+as $$
+#variable_conflict use_column
+declare
+  r financial_summaries;
+  v_id uuid;
+  v_inserted boolean;
+begin
+  for r in
+    select * from jsonb_populate_recordset(null::financial_summaries, p_rows) i
+     -- same lock order for every caller -> concurrent loads can't deadlock
+     order by i.club_id, i.period_start
+  loop
+    id := null;
+    club_id := r.club_id;
+    period_start := r.period_start;
+    error := null;
+    begin
+      insert into financial_summaries as f (
+        club_id, period_start, period_end, current_balance,
+        revenue_donations, revenue_fundraising, revenue_sponsorship,
+        expense_food, expense_giveaway, expense_uniforms, from_statement
+      )
+      values (r.club_id, r.period_start, r.period_end, r.current_balance,
+              r.revenue_donations, r.revenue_fundraising, r.revenue_sponsorship,
+              r.expense_food, r.expense_giveaway, r.expense_uniforms, true)
+      on conflict (club_id, period_start) do update set
+        period_end = excluded.period_end,
+        current_balance = excluded.current_balance,
+        revenue_donations = excluded.revenue_donations,
+        revenue_fundraising = excluded.revenue_fundraising,
+        revenue_sponsorship = excluded.revenue_sponsorship,
+        expense_food = excluded.expense_food,
+        expense_giveaway = excluded.expense_giveaway,
+        expense_uniforms = excluded.expense_uniforms,
+        from_statement = true
+      where (f.period_end, f.current_balance, f.revenue_donations, f.revenue_fundraising,
+             f.revenue_sponsorship, f.expense_food, f.expense_giveaway, f.expense_uniforms, f.from_statement)
+            is distinct from
+            (excluded.period_end, excluded.current_balance, excluded.revenue_donations, excluded.revenue_fundraising,
+             excluded.revenue_sponsorship, excluded.expense_food, excluded.expense_giveaway, excluded.expense_uniforms, true)
+      -- xmax = 0 only on a freshly inserted row version
+      returning f.id, (f.xmax = 0) into v_id, v_inserted;
+
+      if v_id is null then
+        action := 'unchanged';
+      else
+        id := v_id;
+        action := case when v_inserted then 'inserted' else 'updated' end;
+      end if;
+    exception when exclusion_violation then
+      get stacked diagnostics error = pg_exception_detail;
+      action := 'conflict';
+    end;
+    return next;
+  end loop;
+end;
+$$;
+
+
+-- Recompute one club's summary totals from its transactions and, with
+-- p_apply, write them, in one database transaction (app/reconcile.py). The
+-- club's summaries are locked before the ledger is read, so deltas from
+-- concurrent edits and deletes wait and land on top of the corrected totals
+-- instead of being counted twice or lost. Same booking rule as
+-- transaction_financial_delta. Summaries loaded from statements are skipped
+-- unless p_include_statements (their figures would be replaced by the ledger's).
+-- Returns {"transactions", "summaries", "skipped_statements", "unassigned",
+--          "diffs": [{"summary_id", "period_start", "period_end", "field", "stored", "expected"}]}
+create or replace function reconcile_club_financials(
+  p_club_id bigint,
+  p_code_fields jsonb,
+  p_counted text[],
+  p_apply boolean default false,
+  p_include_statements boolean default false
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_report jsonb;
+  d jsonb;
+begin
+  if p_apply then
+    perform 1 from financial_summaries where club_id = p_club_id order by id for update;
+  end if;
+
+  with summaries as (
+    select s.id, s.period_start, s.period_end, s.from_statement, to_jsonb(s) as j
+      from financial_summaries s
+     where s.club_id = p_club_id
+  ),
+  booked as (
+    select p.id as summary_id, p_code_fields->>coalesce(t.code, '') as field, t.amount
+      from transactions t
+      left join lateral (
+        select s.id from summaries s
+         where t.date between s.period_start and s.period_end
+         order by s.period_start desc
+         limit 1
+      ) p on true
+     where t.club_id = p_club_id
+       and t.status = any(p_counted)
+       and p_code_fields ? coalesce(t.code, '')
+  ),
+  expected as (
+    select summary_id, field, sum(amount) as amount
+      from booked
+     where summary_id is not null
+     group by 1, 2
+  ),
+  diffs as (
+    select s.id, s.period_start, s.period_end, f.field,
+           coalesce((s.j->>f.field)::numeric, 0) as stored,
+           coalesce(e.amount, 0) as expected
+      from summaries s
+     cross join (select distinct value as field from jsonb_each_text(p_code_fields)) f
+      left join expected e on e.summary_id = s.id and e.field = f.field
+     where p_include_statements or not s.from_statement
+  )
+  select jsonb_build_object(
+    'transactions', (select count(*) from transactions where club_id = p_club_id),
+    'summaries', (select count(*) from summaries),
+    'skipped_statements', (select count(*) from summaries where from_statement and not p_include_statements),
+    'unassigned', (select count(*) from booked where summary_id is null),
+    'diffs', coalesce((
+      select jsonb_agg(jsonb_build_object(
+               'summary_id', id, 'period_start', period_start, 'period_end', period_end,
+               'field', field, 'stored', stored::text, 'expected', expected::text
+             ) order by period_start, field)
+        from diffs
+       where stored <> expected
+    ), '[]')
+  ) into v_report;
+
+  if p_apply then
+    for d in select value from jsonb_array_elements(v_report->'diffs') loop
+      execute format('update financial_summaries set %1$I = $1 where id = $2', financial_delta_field(d->>'field'))
+        using (d->>'expected')::numeric, (d->>'summary_id')::uuid;
+    end loop;
+  end if;
+  return v_report;
+end;
+$$;
@@ -0,0 +1,7 @@
+-- Indexes for the transactions list endpoints (app/routers/transactions.py).
+-- Idempotent: run in the Supabase SQL editor (or psql).
+--
+-- GET /transactions/club/{club_id} pages with a keyset on (date, id) newest
+-- first; this index serves every page with a short range scan, however deep.
+create index if not exists transactions_club_date_id_idx
+  on transactions (club_id, date desc, id desc);
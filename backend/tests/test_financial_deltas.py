@@ -0,0 +1,392 @@
+"""
+Property tests for the financial delta maintenance in sql/financial_summaries.sql:
+after any sequence of transaction creates, edits and deletes, every summary
+must equal a from-scratch aggregate of the ledger.
+
+The pure-Python model below (transaction_financial_delta /
+apply_transaction_change, summed from scratch) is the oracle; the sequences
+are replayed through the SQL functions, so these tests need DATABASE_URL
+(see conftest.py). benchmarks/financial_consistency.py runs the same check
+through the API against a Supabase project.
+
+The concurrency tests race apply_transaction_delta / apply_financial_deltas on
+the same summaries from several connections (benchmarks/financial_concurrency.py
+does the same through the API).
+"""
+import json
+import random
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+from threading import Barrier
+
+import pytest
+from hypothesis import given, settings, strategies as st
+
+from app.financial_codes import CODE_TO_FINANCIAL_FIELD, COUNTED_STATUSES
+
+CLUBS = (1, 2)
+# March and May are not covered: transactions dated there count nowhere
+PERIODS = ((date(2025, 1, 1), date(2025, 1, 31)), (date(2025, 2, 1), date(2025, 2, 28)), (date(2025, 4, 1), date(2025, 4, 30)))
+SUMMARIES = [(club, start, end) for club in CLUBS for start, end in PERIODS]
+
+
+# ---------------------------
+# Model
+# ---------------------------
+def contribution(txn: dict | None):
+    """(summary key, field, signed amount) a transaction adds, or None (transaction_financial_delta)."""
+    if txn is None or txn["status"] not in COUNTED_STATUSES:
+        return None
+    field = CODE_TO_FINANCIAL_FIELD.get(txn["code"] or "")
+    if field is None:
+        return None
+    for club, start, end in SUMMARIES:
+        if club == txn["club_id"] and start <= txn["date"] <= end:
+            return (club, start), field, txn["amount"]
+    return None
+
+
+def apply_change(totals: dict, old: dict | None, new: dict | None) -> None:
+    """Take old's contribution out and put new's in (apply_transaction_change)."""
+    for txn, sign in ((old, -1), (new, 1)):
+        delta = contribution(txn)
+        if delta is not None:
+            key, field, amount = delta
+            totals[key, field] += sign * amount
+
+
+def aggregate(ledger) -> dict:
+    """What the summaries should hold, summed from scratch."""
+    totals = defaultdict(Decimal)
+    for txn in ledger:
+        apply_change(totals, None, txn)
+    return {k: v for k, v in totals.items() if v}
+
+
+# ---------------------------
+# Operation sequences
+# ---------------------------
+FIELDS = {
+    "club_id": st.sampled_from(CLUBS),
+    "amount": st.decimals(min_value="0.01", max_value="99999.99", places=2),
+    "date": st.dates(date(2025, 1, 1), date(2025, 5, 31)),
+    "status": st.sampled_from(COUNTED_STATUSES + ("pending", "rejected")),
+    "code": st.sampled_from(list(CODE_TO_FINANCIAL_FIELD) + [None, "9999"]),
+}
+# ("create", fields) | ("update", which, changed fields) | ("delete", which);
+# `which` picks a live transaction modulo their number
+OPERATIONS = st.lists(
+    st.one_of(
+        st.tuples(st.just("create"), st.fixed_dictionaries(FIELDS)),
+        st.tuples(st.just("update"), st.integers(0, 1000), st.fixed_dictionaries({}, optional=FIELDS)),
+        st.tuples(st.just("delete"), st.integers(0, 1000)),
+    ),
+    max_size=40,
+)
+
+
+def replay(operations, create, update, delete, check):
+    """Run operations against a backend (model or database), calling check(live) after each."""
+    live = []
+    for op in operations:
+        if op[0] == "create":
+            live.append(create(dict(op[1])))
+        elif live and op[0] == "update":
+            i = op[1] % len(live)
+            live[i] = update(live[i], op[2])
+        elif live:
+            delete(live.pop(op[1] % len(live)))
+        check(live)
+
+
+# ---------------------------
+# The SQL functions
+# ---------------------------
+def _stored_totals(conn) -> dict:
+    fields = sorted(set(CODE_TO_FINANCIAL_FIELD.values()))
+    rows = conn.execute(f"select club_id, period_start, {', '.join(fields)} from financial_summaries").fetchall()
+    return {
+        ((club, start), field): value
+        for club, start, *values in rows
+        for field, value in zip(fields, values)
+        if value
+    }
+
+
+def _create_summaries(conn) -> None:
+    with conn.cursor() as cur:
+        cur.executemany(
+            "insert into financial_summaries (club_id, period_start, period_end) values (%s, %s, %s)",
+            SUMMARIES,
+        )
+
+
+@settings(max_examples=40, deadline=None)
+@given(OPERATIONS)
+def test_sql_matches_model_and_aggregate(pg, operations):
+    pg.reset()
+    conn = pg.conn
+    _create_summaries(conn)
+    change_params = (json.dumps(CODE_TO_FINANCIAL_FIELD), list(COUNTED_STATUSES))
+    model = defaultdict(Decimal)
+
+    def create(txn):
+        # as POST /transactions/: insert, then add the amount to its period by date
+        (txn["id"],) = conn.execute(
+            "insert into transactions (club_id, amount, date, status, code) values (%s, %s, %s, %s, %s) returning id",
+            (txn["club_id"], txn["amount"], txn["date"], txn["status"], txn["code"]),
+        ).fetchone()
+        delta = contribution(txn)
+        if delta is not None:
+            conn.execute("select apply_transaction_delta(%s, %s, %s, %s)", (txn["club_id"], txn["date"], delta[1], txn["amount"]))
+        apply_change(model, None, txn)
+        return txn
+
+    def update(old, changes):
+        assert conn.execute(
+            "select * from update_transaction_with_financials(%s, %s::jsonb, %s::jsonb, %s)",
+            (old["id"], json.dumps(changes, default=str), *change_params),
+        ).fetchone() is not None
+        new = {**old, **changes}
+        apply_change(model, old, new)
+        return new
+
+    def delete(old):
+        assert conn.execute(
+            "select * from delete_transaction_with_financials(%s, %s::jsonb, %s)", (old["id"], *change_params)
+        ).fetchone() is not None
+        apply_change(model, old, None)
+
+    def check(live):
+        stored = _stored_totals(conn)
+        assert stored == {k: v for k, v in model.items() if v}
+        assert stored == aggregate(live)
+
+    replay(operations, create, update, delete, check)
+
+
+def test_apply_financial_deltas_checks_the_period(pg):
+    pg.reset()
+    conn = pg.conn
+    _create_summaries(conn)
+    (jan,) = conn.execute(
+        "select id from financial_summaries where club_id = 1 and period_start = '2025-01-01'"
+    ).fetchone()
+
+    def apply(**delta):
+        rows = conn.execute(
+            "select id from apply_financial_deltas(%s::jsonb)",
+            (json.dumps([{"id": str(jan), "field": "expense_food", "amount": "5.00", **delta}]),),
+        ).fetchall()
+        return len(rows)
+
+    assert apply() == 1                                                    # no check requested
+    assert apply(club_id=1, **{"from": "2025-01-03", "to": "2025-01-31"}) == 1
+    assert apply(club_id=2, **{"from": "2025-01-03", "to": "2025-01-03"}) == 0   # another club's summary
+    assert apply(club_id=1, **{"from": "2025-01-30", "to": "2025-02-01"}) == 0   # runs past the period
+    assert conn.execute("select expense_food from financial_summaries where id = %s", (jan,)).fetchone() == (Decimal("10.00"),)
+
+
+def test_overlapping_periods_are_rejected(pg):
+    if not pg.has_overlap_constraint:
+        pytest.skip("btree_gist not available on this server")
+    import psycopg
+
+    pg.reset()
+    _create_summaries(pg.conn)
+    with pytest.raises(psycopg.errors.ExclusionViolation):
+        pg.conn.execute(
+            "insert into financial_summaries (club_id, period_start, period_end) values (1, '2025-01-31', '2025-02-10')"
+        )
+    # another club, and a period in the uncovered gap, are fine
+    pg.conn.execute("insert into financial_summaries (club_id, period_start, period_end) values (3, '2025-01-01', '2025-01-31')")
+    pg.conn.execute("insert into financial_summaries (club_id, period_start, period_end) values (1, '2025-03-01', '2025-03-31')")
+
+
+# ---------------------------
+# Concurrent increments
+# ---------------------------
+def _race(pg, worker, threads: int) -> None:
+    """Run worker(conn, n) on `threads` connections at once; re-raise the first failure."""
+    barrier = Barrier(threads)
+
+    def run(n):
+        with pg.connect() as conn:
+            barrier.wait()
+            worker(conn, n)
+
+    with ThreadPoolExecutor(threads) as pool:
+        for future in [pool.submit(run, n) for n in range(threads)]:
+            future.result()
+
+
+def test_concurrent_deltas_are_not_lost(pg):
+    """Every amount added to one period from many connections must land, to the cent."""
+    pg.reset()
+    _create_summaries(pg.conn)
+    threads, calls = 8, 40
+    amounts = [[Decimal(random.Random(n * 1000 + i).randint(1, 99_999)) / 100 for i in range(calls)] for n in range(threads)]
+    (jan,) = pg.conn.execute(
+        "select id from financial_summaries where club_id = 1 and period_start = '2025-01-01'"
+    ).fetchone()
+
+    def worker(conn, n):
+        for i, amount in enumerate(amounts[n]):
+            if i % 2:
+                conn.execute("select apply_transaction_delta(1, '2025-01-15', 'revenue_fundraising', %s)", (amount,))
+            else:
+                delta = {"id": str(jan), "field": "revenue_fundraising", "amount": str(amount),
+                         "club_id": 1, "from": "2025-01-15", "to": "2025-01-15"}
+                conn.execute("select apply_financial_deltas(%s::jsonb)", (json.dumps([delta]),))
+
+    _race(pg, worker, threads)
+    (stored,) = pg.conn.execute("select revenue_fundraising from financial_summaries where id = %s", (jan,)).fetchone()
+    assert stored == sum(sum(a) for a in amounts)
+
+
+def test_concurrent_batches_do_not_deadlock(pg):
+    """Batches over the same summaries, sorted by id as callers send them, queue up instead of deadlocking."""
+    pg.reset()
+    _create_summaries(pg.conn)
+    ids = sorted(str(i) for (i,) in pg.conn.execute("select id from financial_summaries").fetchall())
+    threads, rounds = 6, 20
+
+    def worker(conn, n):
+        for _ in range(rounds):
+            with conn.transaction():
+                deltas = [{"id": i, "field": "expense_food", "amount": "1.25"} for i in ids]
+                conn.execute("select apply_financial_deltas(%s::jsonb)", (json.dumps(deltas),))
+
+    _race(pg, worker, threads)
+    totals = pg.conn.execute("select distinct expense_food from financial_summaries").fetchall()
+    assert totals == [(Decimal("1.25") * threads * rounds,)]
+
+
+# ---------------------------
+# Reconciliation (reconcile_club_financials)
+# ---------------------------
+def _reconcile(conn, club_id: int, apply: bool, include_statements: bool = False) -> dict:
+    (report,) = conn.execute(
+        "select reconcile_club_financials(%s, %s::jsonb, %s, %s, %s)",
+        (club_id, json.dumps(CODE_TO_FINANCIAL_FIELD), list(COUNTED_STATUSES), apply, include_statements),
+    ).fetchone()
+    return report
+
+
+def _ledger(conn) -> list[dict]:
+    rows = conn.execute("select club_id, amount, date, status, code from transactions").fetchall()
+    return [dict(zip(("club_id", "amount", "date", "status", "code"), row)) for row in rows]
+
+
+def _insert_ledger(conn, seed: int, count: int) -> None:
+    """Transactions written without touching the summaries (i.e. drifted)."""
+    rng = random.Random(seed)
+    codes = list(CODE_TO_FINANCIAL_FIELD) + [None, "9999"]
+    with conn.cursor() as cur:
+        cur.executemany(
+            "insert into transactions (club_id, amount, date, status, code) values (%s, %s, %s, %s, %s)",
+            [
+                (rng.choice(CLUBS), Decimal(rng.randint(1, 99_999)) / 100, date(2025, rng.randint(1, 5), rng.randint(1, 28)),
+                 rng.choice(COUNTED_STATUSES + ("pending",)), rng.choice(codes))
+                for _ in range(count)
+            ],
+        )
+
+
+def test_reconcile_rebuilds_totals_and_skips_statements(pg):
+    pg.reset()
+    conn = pg.conn
+    _create_summaries(conn)
+    _insert_ledger(conn, seed=7, count=200)
+    conn.execute("update financial_summaries set expense_food = 123.45")
+    conn.execute("update financial_summaries set from_statement = true where club_id = 2 and period_start = '2025-04-01'")
+    statement = ((2, date(2025, 4, 1)), "expense_food")
+
+    before = _stored_totals(conn)
+    report = _reconcile(conn, 1, apply=False)
+    assert report["diffs"] and _stored_totals(conn) == before          # dry run writes nothing
+
+    for club in CLUBS:
+        report = _reconcile(conn, club, apply=True)
+        assert report["summaries"] == len(PERIODS)
+        assert report["skipped_statements"] == (1 if club == 2 else 0)
+    expected = aggregate(_ledger(conn))
+    stored = _stored_totals(conn)
+    assert stored[statement] == Decimal("123.45")                      # statement figures kept
+    assert {k: v for k, v in stored.items() if k[0] != statement[0]} == {k: v for k, v in expected.items() if k[0] != statement[0]}
+    assert _reconcile(conn, 1, apply=False)["diffs"] == []
+
+    _reconcile(conn, 2, apply=True, include_statements=True)
+    assert _stored_totals(conn) == expected
+
+
+def test_reconcile_during_concurrent_edits(pg):
+    """Edits racing an applying reconcile must not be counted twice or lost."""
+    pg.reset()
+    _create_summaries(pg.conn)
+    _insert_ledger(pg.conn, seed=11, count=60)
+    ids = [str(i) for (i,) in pg.conn.execute("select id from transactions").fetchall()]
+    change_params = (json.dumps(CODE_TO_FINANCIAL_FIELD), list(COUNTED_STATUSES))
+
+    def worker(conn, n):
+        if n < 2:
+            for _ in range(40):
+                for club in CLUBS:
+                    _reconcile(conn, club, apply=True)
+            return
+        rng = random.Random(n)
+        for _ in range(100):
+            changes = {"amount": str(Decimal(rng.randint(1, 99_999)) / 100),
+                       "status": rng.choice(COUNTED_STATUSES + ("pending",)),
+                       "date": date(2025, rng.randint(1, 5), rng.randint(1, 28)).isoformat()}
+            conn.execute("select update_transaction_with_financials(%s, %s::jsonb, %s::jsonb, %s)",
+                         (rng.choice(ids), json.dumps(changes), *change_params))
+
+    _race(pg, worker, 8)
+    assert _stored_totals(pg.conn) == aggregate(_ledger(pg.conn))
+
+
+# ---------------------------
+# Statement loads (upsert_financial_summaries)
+# ---------------------------
+def _upsert(conn, rows: list[dict]) -> list[tuple]:
+    return conn.execute(
+        "select club_id, period_start, action from upsert_financial_summaries(%s::jsonb) order by club_id, period_start",
+        (json.dumps(rows, default=str),),
+    ).fetchall()
+
+
+def _statement_rows(club: int, food: str = "10.00") -> list[dict]:
+    return [{"club_id": club, "period_start": start, "period_end": end, "expense_food": food} for start, end in PERIODS]
+
+
+def test_upsert_inserts_updates_and_skips_unchanged(pg):
+    pg.reset()
+    conn = pg.conn
+    assert {a for _, _, a in _upsert(conn, _statement_rows(1))} == {"inserted"}
+    assert {a for _, _, a in _upsert(conn, _statement_rows(1))} == {"unchanged"}
+    changed = _statement_rows(1)
+    changed[1]["expense_food"] = "11.00"
+    assert [a for _, _, a in _upsert(conn, changed)] == ["unchanged", "updated", "unchanged"]
+    assert conn.execute("select bool_and(from_statement), count(*) from financial_summaries").fetchone() == (True, 3)
+
+
+def test_upsert_reports_overlapping_periods_as_conflicts(pg):
+    if not pg.has_overlap_constraint:
+        pytest.skip("btree_gist not available on this server")
+
+    pg.reset()
+    conn = pg.conn
+    _upsert(conn, _statement_rows(1))
+    rows = [
+        {"club_id": 1, "period_start": "2025-01-15", "period_end": "2025-02-14"},   # overlaps Jan and Feb
+        {"club_id": 1, "period_start": "2025-03-01", "period_end": "2025-03-31"},   # fills the gap
+        {"club_id": 1, "period_start": "2025-03-20", "period_end": "2025-03-25"},   # overlaps the row above
+    ]
+    assert _upsert(conn, rows) == [
+        (1, date(2025, 1, 15), "conflict"),
+        (1, date(2025, 3, 1), "inserted"),
+        (1, date(2025, 3, 20), "conflict"),
+    ]
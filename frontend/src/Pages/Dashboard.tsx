@@ -26,7 +26,7 @@ export default function Dashboard() {
         }
         
         // Fetch recent transactions
-        const allTransactions = await transactionsAPI.getByClubId(CLUB_ID);
+        const allTransactions = await transactionsAPI.getAllByClubId(CLUB_ID);
         const sorted = allTransactions.sort((a, b) => 
           new Date(b.date).getTime() - new Date(a.date).getTime()
         );
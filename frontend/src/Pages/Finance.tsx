@@ -49,7 +49,7 @@ export default function Finance() {
         setSelectedPeriod(sortedData[0]); // Default to most recent
         
         // Fetch transactions
-        const transactionsData = await transactionsAPI.getByClubId(CLUB_ID);
+        const transactionsData = await transactionsAPI.getAllByClubId(CLUB_ID);
         // Sort by date (most recent first)
         const sortedTransactions = transactionsData.sort((a, b) => 
           new Date(b.date).getTime() - new Date(a.date).getTime()
@@ -147,7 +147,7 @@ export default function Finance() {
       await transactionsAPI.create(transactionData);
       
       // Refresh data
-      const updatedTransactions = await transactionsAPI.getByClubId(CLUB_ID);
+      const updatedTransactions = await transactionsAPI.getAllByClubId(CLUB_ID);
       const sortedTransactions = updatedTransactions.sort((a, b) => 
         new Date(b.date).getTime() - new Date(a.date).getTime()
       );
@@ -20,21 +20,25 @@ export default function ChatDock() {
   const [isFocused, setIsFocused] = useState(false);
 
   /**
-   * Helper function for sending messages to backend, now includes sessionId.
+   * Streams the reply from /chat/stream (Server-Sent Events).
+   * Calls onDelta with the text received so far as each chunk arrives.
    */
-  const sendToGemini = async (userText: string, currentSessionId: string): Promise<string> => {
+  const streamFromGemini = async (
+    userText: string,
+    currentSessionId: string,
+    onDelta: (textSoFar: string) => void
+  ): Promise<string> => {
     try {
-      const response = await fetch("http://localhost:8000/chat", {
+      const response = await fetch("http://localhost:8000/chat/stream", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        // --- UPDATED PAYLOAD to include sessionId ---
         body: JSON.stringify({ 
           user_message: userText, 
           session_id: currentSessionId 
         }),
       });
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         let errorDetail = `HTTP error! Status: ${response.status}`;
         try {
           const errorData = await response.json();
@@ -45,9 +49,43 @@ export default function ChatDock() {
         throw new Error(errorDetail);
       }
 
-      const data = await response.json();
-      if (!data.response) throw new Error("Empty response from Gemini");
-      return data.response;
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let text = "";
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // SSE events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+          const rawEvent = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+
+          let event = "message";
+          let data = "";
+          for (const line of rawEvent.split("\n")) {
+            if (line.startsWith("event: ")) event = line.slice(7);
+            else if (line.startsWith("data: ")) data += line.slice(6);
+          }
+          const payload = data ? JSON.parse(data) : {};
+
+          if (event === "delta") {
+            text += payload.text;
+            onDelta(text);
+          } else if (event === "done") {
+            text = payload.response ?? text;
+          } else if (event === "error") {
+            throw new Error(payload.detail || "Error generating response.");
+          }
+        }
+      }
+
+      if (!text) throw new Error("Empty response from Gemini");
+      return text;
 
     } catch (error: any) {
       console.error("Error fetching chat response:", error);
@@ -64,12 +102,20 @@ export default function ChatDock() {
     setLoading(true);
     setInput(""); // Clear input immediately
 
-    // Query Gemini backend with the unique session ID
-    const botText = await sendToGemini(trimmedInput, sessionId);
+    // Render the bot reply progressively: the spinner shows until the first chunk,
+    // then the last bot message grows as deltas arrive.
+    let started = false;
+    const showBotText = (text: string) => {
+      const isFirst = !started;
+      started = true;
+      setLoading(false);
+      const botMessage: Message = { type: "bot", text };
+      setMessages(prev => isFirst ? [...prev, botMessage] : [...prev.slice(0, -1), botMessage]);
+    };
 
-    const botMessage: Message = { type: "bot", text: botText };
-    setMessages(prev => [...prev, botMessage]);
-    setLoading(false);
+    // Query Gemini backend with the unique session ID
+    const botText = await streamFromGemini(trimmedInput, sessionId, showBotText);
+    showBotText(botText);
   };
 
   const handleKeyDown = (e: React.KeyboardEvent<HTMLInputElement>) => {
@@ -73,6 +73,12 @@ interface TransactionResponse {
   created_at: string;
 }
 
+// One page of a list endpoint; pass next_cursor back as `cursor` for the next one
+interface Page<T> {
+  items: T[];
+  next_cursor: string | null;
+}
+
 interface TransactionCreate {
   club_id: number;
   amount: number;
@@ -155,9 +161,30 @@ export const chatAPI = {
 
 // Transactions API calls
 export const transactionsAPI = {
-  // Get all transactions for a club
-  getByClubId: async (clubId: number): Promise<TransactionResponse[]> => {
-    return apiFetch<TransactionResponse[]>(`/transactions/club/${clubId}`);
+  // Get a page of a club's transactions (newest first)
+  getByClubId: async (
+    clubId: number,
+    params: { limit?: number; cursor?: string; date_from?: string; date_to?: string; status?: string } = {}
+  ): Promise<Page<TransactionResponse>> => {
+    const query = new URLSearchParams(
+      Object.entries(params).filter(([, v]) => v !== undefined).map(([k, v]) => [k, String(v)])
+    ).toString();
+    return apiFetch<Page<TransactionResponse>>(`/transactions/club/${clubId}${query ? `?${query}` : ''}`);
+  },
+
+  // Get all of a club's transactions (newest first), following next_cursor page by page
+  getAllByClubId: async (
+    clubId: number,
+    params: { date_from?: string; date_to?: string; status?: string } = {}
+  ): Promise<TransactionResponse[]> => {
+    const items: TransactionResponse[] = [];
+    let cursor: string | undefined;
+    do {
+      const page = await transactionsAPI.getByClubId(clubId, { ...params, limit: 1000, cursor });
+      items.push(...page.items);
+      cursor = page.next_cursor ?? undefined;
+    } while (cursor);
+    return items;
   },
 
   // Create new transaction
@@ -182,5 +209,6 @@ export type {
   ChatInput, 
   ChatResponse,
   TransactionResponse,
-  TransactionCreate 
+  TransactionCreate,
+  Page
 };
\ No newline at end of file